@@ -0,0 +1,78 @@
+"""Compression ratio and speed of the history encoder on a mixed clipboard corpus.
+
+Compares the old plain zlib.compress at the default level against the tuned
+encoder (raw small items, preset dictionary) at levels 1, 6 and 9.
+Run from the repository root:  python -m benchmarks.bench_compression
+"""
+import random
+import time
+import zlib
+from clipboard import inmemory
+
+
+def make_corpus(rng, count=4000):
+    words = ("the function returns value error config user request server client data "
+             "import self def class return none true false print list dict").split()
+    hosts = ["api.example.com", "github.com", "docs.python.org", "stackoverflow.com"]
+    corpus = []
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.3:
+            corpus.append(" ".join(rng.choice(words) for _ in range(rng.randint(1, 6))))
+        elif kind < 0.5:
+            corpus.append(f"https://{rng.choice(hosts)}/{rng.choice(words)}/{rng.randint(1, 99999)}?ref={rng.choice(words)}")
+        elif kind < 0.7:
+            corpus.append(f"def {rng.choice(words)}_{i}(self, {rng.choice(words)}):\n"
+                          f"    return self.{rng.choice(words)}({rng.choice(words)}={rng.randint(0, 9)})\n")
+        elif kind < 0.85:
+            corpus.append(f'{{"user": "{rng.choice(words)}{i}", "status": "{rng.choice(words)}", '
+                          f'"count": {rng.randint(0, 1000)}, "ok": {rng.choice(["true", "false"])}}}')
+        elif kind < 0.97:
+            corpus.append("\n".join(f"2024-01-01 12:{m:02d}:00 INFO {rng.choice(words)} {rng.choice(words)} ok"
+                                    for m in range(rng.randint(2, 40))))
+        else:
+            corpus.append("lorem ipsum dolor sit amet " * rng.randint(200, 4000))
+    return corpus
+
+
+def measure(corpus, encode):
+    raw = stored = 0
+    started = time.perf_counter_ns()
+    for text in corpus:
+        record, raw_size = encode(text)
+        raw += raw_size
+        stored += len(record)
+    return raw, stored, (time.perf_counter_ns() - started) / raw
+
+
+def main():
+    rng = random.Random(11)
+    training, corpus = make_corpus(rng, 1000), make_corpus(rng)
+
+    def baseline(text):
+        raw_content = text.encode("utf-8", errors="ignore")
+        return zlib.compress(raw_content), len(raw_content)
+
+    print(f"{'encoder':>16} {'ratio':>7} {'short ratio':>12} {'ns/byte':>8}")
+    short = [text for text in corpus if len(text) <= inmemory.DICTIONARY_MAX_INPUT]
+    rows = [("baseline", baseline, None)]
+    zdict = inmemory.train_compression_dictionary(training)
+    for level in (1, 6, 9):
+        rows.append((f"tuned level {level}", inmemory.compress_text, level))
+    for name, encode, level in rows:
+        if level is not None:
+            inmemory.configure_compression(level=level)
+            if not inmemory._dictionaries:
+                inmemory.install_compression_dictionary(zdict)
+        raw, stored, ns_per_byte = measure(corpus, encode)
+        short_raw, short_stored, _ = measure(short, encode)
+        print(f"{name:>16} {raw / stored:>7.2f} {short_raw / short_stored:>12.2f} {ns_per_byte:>8.2f}")
+
+    for text in corpus[:200]:
+        record, _ = inmemory.compress_text(text)
+        assert inmemory.decompress_record(record).decode("utf-8") == text, "round trip failed"
+    print(f"dictionary: {len(zdict)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Load test of the local socket API: request throughput and latency under many clients.
+
+Starts a ClipboardServer over a history of HISTORY_ITEMS entries and runs
+CLIENTS client processes, each with its own connection, sending a mix of
+list, get, search and stats requests. Run from the repository root:
+python -m benchmarks.bench_daemon [clients] [requests per client]
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from clipboard import inmemory
+from clipboard.client import ClipboardClient
+from clipboard.daemon import ClipboardServer
+
+HISTORY_ITEMS = 5000
+CLIENTS = 32
+REQUESTS = 300
+WORDS = "alpha beta gamma delta config server request error python clipboard history".split()
+
+
+def run_client(path, requests, seed, ids, results):
+    rng = random.Random(seed)
+    latencies = {}
+    with ClipboardClient(path, timeout=30) as client:
+        started = time.perf_counter()
+        for _ in range(requests):
+            kind = rng.random()
+            begin = time.perf_counter()
+            if kind < 0.4:
+                name = "list"
+                client.list(20)
+            elif kind < 0.7:
+                name = "get"
+                client.get(rng.choice(ids))
+            elif kind < 0.95:
+                name = "search"
+                client.search(rng.choice(WORDS) + " " + rng.choice(WORDS)[:3], limit=20)
+            else:
+                name = "stats"
+                client.stats()
+            latencies.setdefault(name, []).append(time.perf_counter() - begin)
+        elapsed = time.perf_counter() - started
+    results.put((elapsed, latencies))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else CLIENTS
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else REQUESTS
+    rng = random.Random(4)
+    inmemory.configure_eviction(max_items=HISTORY_ITEMS)
+    for i in range(HISTORY_ITEMS):
+        inmemory.add_clipboard_item(f"item {i}: " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 80))))
+    ids = [item.item_id for item in inmemory.get_clipboard_items()]
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.sock")
+    server = ClipboardServer(path).start()
+    results = multiprocessing.Queue()
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=run_client, args=(path, requests, seed, ids, results)) for seed in range(clients)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    wall = time.perf_counter() - started
+    for process in processes:
+        process.join()
+    server.shutdown()
+    server.server_close()
+
+    merged = {}
+    for _, latencies in outcomes:
+        for name, values in latencies.items():
+            merged.setdefault(name, []).extend(values)
+    total = sum(len(values) for values in merged.values())
+    everything = [value for values in merged.values() for value in values]
+    print(f"{clients} clients x {requests} requests over {HISTORY_ITEMS} items: "
+          f"{total / wall:.0f} requests/s in {wall:.2f}s")
+    print(f"{'request':>8} {'count':>7} {'p50':>9} {'p99':>9}")
+    for name, values in sorted(merged.items()) + [("all", everything)]:
+        print(f"{name:>8} {len(values):>7} {percentile(values, 0.5) * 1e3:>7.2f}ms {percentile(values, 0.99) * 1e3:>7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Repeated copies under deduplication: memory, compression work and accounting.
+
+Checks that the running byte counter and eviction stats stay exact while a
+small set of snippets is copied over and over, in memory and then with the
+on-disk history, which must also come back without duplicates after a
+restart. Run from the repository root:  python -m benchmarks.bench_dedup
+"""
+import random
+import tempfile
+import time
+from clipboard import inmemory
+
+
+def exact_usage():
+    return sum(len(item.content) for item in inmemory.get_clipboard_items())
+
+
+def check_history(label):
+    stats = inmemory.get_clipboard_stats()
+    items = inmemory.get_clipboard_items()
+    assert stats["bytes"] == exact_usage(), f"{label}: byte counter drifted"
+    assert stats["items"] == len(items) <= 51, f"{label}: item count drifted"
+    assert len({inmemory.get_decompressed_text(item) for item in items}) == len(items), f"{label}: duplicates stored"
+    return stats
+
+
+def run_persistent(rng, snippets, copies):
+    """The same workload with --history-dir, then a reopen of the files as on the next start."""
+    inmemory.clear_clipboard()
+    deduplicated = inmemory.get_clipboard_stats()["deduplicated"]
+    with tempfile.TemporaryDirectory() as directory:
+        inmemory.enable_persistent_store(directory, max_items=51)
+        try:
+            for i in range(copies):
+                inmemory.add_clipboard_item(rng.choice(snippets))
+                if i % 997 == 0:
+                    check_history("persistent")
+            stats = check_history("persistent")
+            newest = [item.content for item in inmemory.get_clipboard_items()]
+            inmemory.disable_persistent_store()
+            inmemory.enable_persistent_store(directory, max_items=51)
+            check_history("reopened")
+            assert [item.content for item in inmemory.get_clipboard_items()] == newest, "reopened history differs"
+        finally:
+            inmemory.disable_persistent_store()
+    print(f"persistent: {copies} copies, deduplicated: {stats['deduplicated'] - deduplicated}, "
+          f"items: {stats['items']}, bytes: {stats['bytes']}, reopened without duplicates")
+
+
+def main():
+    rng = random.Random(3)
+    snippets = [f"snippet {i}: " + "lorem ipsum dolor sit amet " * rng.randint(1, 400) for i in range(80)]
+    compress_calls = 0
+    original_encode = inmemory.encode_text_stream
+
+    def counting_encode(chunks, max_size=None):
+        nonlocal compress_calls
+        compress_calls += 1
+        return original_encode(chunks, max_size)
+
+    inmemory.encode_text_stream = counting_encode
+    inmemory.configure_eviction(max_items=51, max_bytes=64 * 1024)
+    copies = 20000
+    started = time.perf_counter()
+    try:
+        for i in range(copies):
+            inmemory.add_clipboard_item(rng.choice(snippets))
+            if i % 997 == 0:
+                assert inmemory.get_clipboard_memory_usage() == exact_usage()
+    finally:
+        inmemory.encode_text_stream = original_encode
+    elapsed = time.perf_counter() - started
+
+    stats = inmemory.get_clipboard_stats()
+    assert stats["bytes"] == exact_usage(), "byte counter drifted"
+    assert stats["items"] == len(inmemory.get_clipboard_items()) <= 51
+    assert stats["added"] + stats["deduplicated"] == copies
+    assert stats["added"] - stats["evictions"] == stats["items"], "eviction accounting drifted"
+    assert compress_calls == stats["added"], "repeated copies were compressed again"
+    assert len({item.content for item in inmemory.get_clipboard_items()}) == stats["items"], "duplicate blobs stored"
+
+    print(f"{copies} copies of {len(snippets)} snippets in {elapsed:.2f}s")
+    print(f"compressions: {compress_calls}, deduplicated: {stats['deduplicated']}, "
+          f"evictions: {stats['evictions']}, items: {stats['items']}, bytes: {stats['bytes']}")
+    run_persistent(rng, snippets, copies // 4)
+
+
+if __name__ == "__main__":
+    main()
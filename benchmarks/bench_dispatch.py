@@ -0,0 +1,92 @@
+"""Idle wakeups of the Tk thread and hotkey-to-visible latency of the popup.
+
+The Tk thread runs mainloop, as in the app, while the benchmark drives the
+popup from another thread; a wakeup from another thread only gets through
+while mainloop runs. Needs a display; on a headless machine run it under Xvfb:
+xvfb-run -a python -m benchmarks.bench_dispatch
+"""
+import statistics
+import threading
+import time
+from queue import Queue
+from clipboard import inmemory
+from clipboard.manager import ClipboardMonitor, ScriptedChangeSource
+from clipboard.ui import ClipboardManagerUI
+
+IDLE_SECONDS = 5
+TOGGLES = 20
+BURST = 200
+TIMEOUT_SECONDS = 120
+
+
+def wait(until, timeout=5.0):
+    """Sleep on the benchmark thread until `until()` holds; the Tk thread keeps running mainloop."""
+    deadline = time.perf_counter() + timeout
+    while not until() and time.perf_counter() < deadline:
+        time.sleep(0.001)
+
+
+def measure(ui, results):
+    # The first wakeup from another thread ends the dispatcher's catch-up timer.
+    ui.run_on_ui(lambda: None)
+    wakeups = ui.dispatcher.wakeups
+    time.sleep(IDLE_SECONDS)
+    results["idle_wakeups"] = (ui.dispatcher.wakeups - wakeups) / IDLE_SECONDS
+
+    for _ in range(TOGGLES):
+        opened = len(ui.toggle_latencies)
+        ui.toggle_popup()
+        wait(lambda: len(ui.toggle_latencies) > opened)
+        ui.toggle_popup()
+        wait(lambda: not ui.popup_visible)
+    results["latencies"] = [seconds * 1000 for seconds in ui.toggle_latencies]
+
+    ui.toggle_popup()
+    wait(lambda: ui.popup_visible)
+    refreshes = 0
+    original = ui.fetch_clipboard_items
+
+    def counting_fetch():
+        nonlocal refreshes
+        refreshes += 1
+        original()
+
+    ui.fetch_clipboard_items = counting_fetch
+    for i in range(BURST):
+        inmemory.add_clipboard_item(f"burst {i}")
+        ui.update_items()
+    time.sleep(0.5)
+    results["refreshes"] = refreshes
+
+
+def run(ui, results):
+    try:
+        measure(ui, results)
+    except Exception as e:
+        results["error"] = e
+    finally:
+        ui.run_on_ui(ui.root.quit)
+
+
+def main():
+    for i in range(20):
+        inmemory.add_clipboard_item(f"entry {i}")
+    ui = ClipboardManagerUI(ClipboardMonitor(ScriptedChangeSource([])), Queue())
+    results = {}
+    threading.Thread(target=run, args=(ui, results), daemon=True).start()
+    ui.root.after(TIMEOUT_SECONDS * 1000, ui.root.quit)
+    ui.root.mainloop()
+    ui.root.destroy()
+
+    if "error" in results:
+        raise results["error"]
+    latencies = results.get("latencies")
+    if not latencies:
+        raise SystemExit("no hotkey-to-visible samples were recorded; the popup never opened")
+    print(f"idle: {results['idle_wakeups']:.2f} dispatcher wakeups/s (the old after(100) poll woke 10/s)")
+    print(f"hotkey to visible: median {statistics.median(latencies):.2f} ms, max {max(latencies):.2f} ms")
+    print(f"burst of {BURST} clipboard changes caused {results['refreshes']} refresh(es)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Compare full-payload change checks against change-token fingerprints.
+
+Run from the repository root:  python -m benchmarks.bench_fingerprint
+"""
+import timeit
+from clipboard.inmemory import content_fingerprint
+
+SIZES = [10, 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024, 50 * 1024 * 1024]
+
+
+def make_payload(size):
+    line = "2024-01-01 12:00:00,INFO,worker-7,processed batch ok\n"
+    return (line * (size // len(line) + 1))[:size]
+
+
+def best_of(stmt, repeat=5):
+    number = 1
+    while min(timeit.repeat(stmt, number=number, repeat=1)) < 0.05 and number < 100000:
+        number *= 10
+    return min(timeit.repeat(stmt, number=number, repeat=repeat)) / number
+
+
+def main():
+    print(f"{'size':>12} {'compare+strip':>15} {'fingerprint':>13} {'token cmp':>11}")
+    for size in SIZES:
+        prev = make_payload(size)
+        current = "".join([prev])[:size - 1] + prev[-1]
+        prev_token = content_fingerprint(prev)
+        token = content_fingerprint(current)
+
+        old = best_of(lambda: current != prev and current.strip())
+        new = best_of(lambda: content_fingerprint(current))
+        cmp = best_of(lambda: token != prev_token and current and not current.isspace())
+        print(f"{size:>12} {old * 1e6:>13.1f}us {new * 1e6:>11.1f}us {cmp * 1e6:>9.3f}us")
+
+
+if __name__ == "__main__":
+    main()
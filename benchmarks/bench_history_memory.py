@@ -0,0 +1,74 @@
+"""Per-entry memory overhead of the history layout, before and after slot arrays.
+
+"before" is the previous layout: an OrderedDict of ClipboardItem tuples, each
+holding its own bytes blob and float timestamp. "after" is SlotHistory.
+Overhead is the traced allocation minus the payload bytes themselves.
+Run from the repository root:  python -m benchmarks.bench_history_memory
+"""
+import random
+import time
+import tracemalloc
+from collections import OrderedDict
+from clipboard.history import SlotHistory
+from clipboard.inmemory import ClipboardItem, compress_text
+
+SIZES = [10_000, 100_000]
+
+
+def make_payloads(count):
+    rng = random.Random(5)
+    words = "copy paste clipboard history value config server user error import".split()
+    return [compress_text(" ".join(rng.choice(words) for _ in range(rng.randint(2, 60))))[0]
+            for _ in range(count)]
+
+
+def fill_before(payloads):
+    history = OrderedDict()
+    for item_id, payload in enumerate(payloads, 1):
+        history[item_id] = ClipboardItem(bytes(payload), time.time(), item_id)
+    return history
+
+
+def fill_after(payloads):
+    history = SlotHistory()
+    for payload in payloads:
+        history.append(payload, time.time())
+    return history
+
+
+def traced(fill, payloads):
+    tracemalloc.start()
+    started = time.perf_counter()
+    history = fill(payloads)
+    elapsed = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return history, size, elapsed
+
+
+def main():
+    print(f"{'entries':>8} {'layout':>7} {'bytes/entry':>12} {'overhead/entry':>15} {'fill':>8} {'get':>9} {'evict all':>10}")
+    for count in SIZES:
+        payloads = make_payloads(count)
+        payload_bytes = sum(map(len, payloads))
+        ids = random.Random(1).sample(range(1, count + 1), 1000)
+        for name, fill in (("before", fill_before), ("after", fill_after)):
+            history, size, fill_time = traced(fill, payloads)
+            started = time.perf_counter()
+            for item_id in ids:
+                history.get(item_id)
+            get_time = (time.perf_counter() - started) / len(ids)
+            started = time.perf_counter()
+            if name == "before":
+                while history:
+                    history.popitem(last=False)
+            else:
+                while len(history):
+                    history.pop_oldest()
+            evict_time = time.perf_counter() - started
+            print(f"{count:>8} {name:>7} {size / count:>12.1f} {(size - payload_bytes) / count:>15.1f} "
+                  f"{fill_time * 1e3:>6.0f}ms {get_time * 1e9:>7.0f}ns {evict_time * 1e3:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
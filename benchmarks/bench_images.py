@@ -0,0 +1,82 @@
+"""Image capture through a scripted clipboard: capture latency, blob eviction and thumbnail cost.
+
+The scripted change source stands in for the clipboard and hands out PNG
+and BMP screenshots. Thumbnails are built the way the preview workers
+build them. Run from the repository root:  python -m benchmarks.bench_images
+"""
+import io
+import random
+import statistics
+import threading
+import time
+from PIL import Image
+from clipboard import inmemory
+from clipboard.manager import BinaryContent, ClipboardMonitor, ScriptedChangeSource
+from clipboard.render_cache import RenderCache, is_image_item
+
+
+class _CaptureRecorder:
+    def __init__(self, scripted):
+        self.scripted = scripted
+
+    def update_items(self):
+        self.scripted.record_capture()
+
+
+def make_screenshot(rng, size, fmt):
+    """A flat background with a noisy photo-like region that does not compress."""
+    image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    photo_size = (size[0] // 2, size[1] // 2)
+    image.paste(Image.frombytes("RGB", photo_size, rng.randbytes(photo_size[0] * photo_size[1] * 3)), (40, 40))
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def main():
+    rng = random.Random(2)
+    inmemory.configure_eviction(max_items=200, max_bytes=64 * 1024 * 1024, max_blob_bytes=8 * 1024 * 1024)
+    script = []
+    for i in range(60):
+        if i % 3:
+            # A screenshot takes tens of milliseconds to store; the next copy must not replace it unread.
+            script.append((0.3 if i % 3 == 1 else 0.05, f"text copy {i}"))
+        else:
+            fmt, mime = ("PNG", "image/png") if i % 2 else ("BMP", "image/bmp")
+            script.append((0.3, BinaryContent(mime, make_screenshot(rng, (1600, 900), fmt))))
+
+    source = ScriptedChangeSource(script)
+    monitor = ClipboardMonitor(source)
+    monitor.add_listener(_CaptureRecorder(source))
+    thread = threading.Thread(target=monitor.start_monitoring, daemon=True)
+    thread.start()
+    while not source.exhausted:
+        time.sleep(0.05)
+    time.sleep(0.5)
+    monitor.stop_monitoring()
+
+    stats = inmemory.get_clipboard_stats()
+    assert stats["items"] == len(script) - stats["evicted_blob"], "copies were missed"
+    assert stats["blob_bytes"] <= 8 * 1024 * 1024, "blob budget exceeded"
+    assert stats["bytes"] == sum(len(item.content) for item in inmemory.get_clipboard_items())
+    texts = [item for item in inmemory.get_clipboard_items() if not inmemory.is_binary_item(item)]
+    assert len(texts) == 40, "screenshots pushed out text items"
+
+    cache = RenderCache(thumbnail_size=(150, 60))
+    images = [item for item in inmemory.get_clipboard_items() if is_image_item(item)]
+    started = time.perf_counter()
+    for item in images:
+        cache.thumbnail(item)
+    thumbnail_time = (time.perf_counter() - started) / len(images)
+    assert all(cache.thumbnails[item.item_id].size[0] <= 150 for item in images)
+
+    latencies = sorted(source.latencies)
+    print(f"captures: {len(latencies)}, median latency {statistics.median(latencies) * 1e3:.1f}ms, "
+          f"max {latencies[-1] * 1e3:.1f}ms")
+    print(f"images kept: {stats['blob_items']} ({stats['blob_bytes'] / 1024:.0f} KB), "
+          f"evicted by blob budget: {stats['evicted_blob']}, text items kept: {len(texts)}")
+    print(f"thumbnail build: {thumbnail_time * 1e3:.1f}ms per 1600x900 image on the worker thread")
+
+
+if __name__ == "__main__":
+    main()
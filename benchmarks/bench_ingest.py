@@ -0,0 +1,71 @@
+"""Memory high-water mark of ingesting large clipboard payloads.
+
+"old" holds the pasted string, encodes all of it and compresses that copy in
+one call, which is what add_clipboard_item used to do. "str" is the current
+add_clipboard_item, which still starts from a full string as pyperclip
+returns one. "stream" is add_clipboard_stream fed 1 MB chunks, as the
+wl-paste/xclip reader produces them. Peaks are tracemalloc peaks and include
+the pasted string where the path needs one.
+Run from the repository root:  python -m benchmarks.bench_ingest [sizes in MB]
+"""
+import sys
+import time
+import tracemalloc
+import zlib
+from clipboard import inmemory
+
+SIZES_MB = [1, 10, 50, 100, 200]
+CHUNK_BYTES = 1024 * 1024
+
+
+BLOCK = "".join(f"2024-01-01 12:{i % 60:02d}:{i % 7:02d} INFO worker-{i % 13} request {i} handled ok ✓\n"
+                for i in range(64))
+
+
+def make_chunks(size):
+    """Yield about `size` bytes of log-like text without ever building all of it."""
+    repeats = CHUNK_BYTES // len(BLOCK.encode())
+    produced = number = 0
+    while produced < size:
+        chunk = f"chunk {number}\n" + BLOCK * repeats
+        produced += len(chunk.encode())
+        number += 1
+        yield chunk
+
+
+def old_path(content):
+    raw_content = content.encode("utf-8", errors="ignore")
+    return zlib.compress(raw_content)
+
+
+def measure(run):
+    inmemory.clear_clipboard()
+    tracemalloc.start()
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES_MB
+    inmemory.configure_ingestion(max_item_size=0)
+    inmemory.configure_eviction(max_bytes=1024 * 1024 * 1024)
+    print(f"{'payload':>8} {'path':>7} {'peak':>9} {'peak/payload':>13} {'time':>7}")
+    for size_mb in sizes:
+        size = size_mb * 1024 * 1024
+        runs = [
+            ("old", lambda: old_path("".join(make_chunks(size)))),
+            ("str", lambda: inmemory.add_clipboard_item("".join(make_chunks(size)))),
+            ("stream", lambda: inmemory.add_clipboard_stream(make_chunks(size))),
+        ]
+        for name, run in runs:
+            peak, elapsed = measure(run)
+            print(f"{size_mb:>6}MB {name:>7} {peak / 2**20:>7.1f}MB {peak / size:>13.2f} {elapsed:>6.2f}s")
+    inmemory.clear_clipboard()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Compare wakeups per minute and capture latency of the clipboard change sources.
+
+Run from the repository root:  python -m benchmarks.bench_monitor
+"""
+import statistics
+import threading
+import time
+from clipboard.manager import ClipboardMonitor, PollingChangeSource, ScriptedChangeSource
+
+
+class _CaptureRecorder:
+    def __init__(self, scripted):
+        self.scripted = scripted
+
+    def update_items(self):
+        self.scripted.record_capture()
+
+
+def make_script(copies=20, idle=1.5, burst=0.05):
+    """Bursts of quick copies separated by idle gaps."""
+    script = []
+    for i in range(copies):
+        delay = burst if i % 4 else idle
+        script.append((delay, f"copy {i}"))
+    return script
+
+
+def run(source, scripted):
+    monitor = ClipboardMonitor(source)
+    monitor.add_listener(_CaptureRecorder(scripted))
+    thread = threading.Thread(target=monitor.start_monitoring, daemon=True)
+    started = time.perf_counter()
+    thread.start()
+    while not scripted.exhausted:
+        time.sleep(0.05)
+    time.sleep(0.5)
+    elapsed = time.perf_counter() - started
+    monitor.stop_monitoring()
+    return elapsed
+
+
+def report(name, source, scripted, elapsed):
+    latencies = scripted.latencies or [float("nan")]
+    print(f"{name:>10}: {source.wakeups / elapsed * 60:8.1f} wakeups/min, "
+          f"captured {len(scripted.latencies)}/{len(scripted.script)}, "
+          f"median latency {statistics.median(latencies) * 1000:7.2f} ms, "
+          f"max {max(latencies) * 1000:7.2f} ms")
+
+
+def main():
+    script = make_script()
+
+    scripted = ScriptedChangeSource(script)
+    elapsed = run(scripted, scripted)
+    report("event", scripted, scripted, elapsed)
+
+    scripted = ScriptedChangeSource(script)
+    poller = PollingChangeSource(paste=scripted.paste)
+    elapsed = run(poller, scripted)
+    report("polling", poller, scripted, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Click-to-key-injection latency of the paste path, and duplicate captures after a paste.
+
+Stand-in backends replace the clipboard and the keyboard: the clipboard is
+a dict that the monitor polls like pyperclip, and the keyboard records when
+the paste key goes down. Each "click" does what copy_to_clipboard does:
+decompress the item, paste it and move it to the top. The monitor then
+polls the clipboard, which must not store the pasted item again.
+Run from the repository root:  python -m benchmarks.bench_paste
+"""
+import random
+import statistics
+import time
+from clipboard import inmemory
+from clipboard.manager import ClipboardMonitor, PollingChangeSource
+from clipboard.paste import PasteEngine
+
+HISTORY = 500
+CLICKS = 300
+SIZES = {"short": 40, "code": 4 * 1024, "large": 1024 * 1024}
+
+
+class StandInKeyboard:
+    """Records the time the paste key is pressed, like a pynput Controller would send it."""
+
+    def __init__(self):
+        self.injected_at = None
+
+    def press(self, key):
+        if key == "v":
+            self.injected_at = time.perf_counter()
+
+    def release(self, key):
+        pass
+
+
+def make_text(rng, size):
+    words = "copy paste clipboard history value config server user error import return".split()
+    text = " ".join(rng.choice(words) for _ in range(size // 6 + 1))
+    return f"{rng.random()} {text[:size]}"
+
+
+def run(label, size, rng):
+    inmemory.clear_clipboard()
+    inmemory.configure_eviction(max_items=HISTORY, max_bytes=1 << 40)
+    for _ in range(HISTORY):
+        inmemory.add_clipboard_item(make_text(rng, size))
+
+    clipboard = {"text": ""}
+    keyboard = StandInKeyboard()
+    engine = PasteEngine(write_text=lambda text: clipboard.__setitem__("text", text), keyboard=keyboard,
+                         modifier="ctrl")
+    source = PollingChangeSource(paste=lambda: clipboard["text"], min_interval=0, max_interval=0)
+    monitor = ClipboardMonitor(source)
+
+    latencies = []
+    stats = inmemory.get_clipboard_stats()
+    stored = stats["added"] + stats["deduplicated"]
+    for _ in range(CLICKS):
+        # The newest item is what the clipboard already holds, so pasting it would change nothing.
+        item = rng.choice(inmemory.get_clipboard_items()[1:])
+        clicked_at = time.perf_counter()
+        content = inmemory.get_decompressed_text(item)
+        engine.paste(content, clicked_at)
+        latencies.append(keyboard.injected_at - clicked_at)
+        inmemory.mark_clipboard_item_used(item.item_id)
+        monitor.capture(source.wait_for_change())
+
+    stats = inmemory.get_clipboard_stats()
+    restored = stats["added"] + stats["deduplicated"] - stored
+    latencies.sort()
+    print(f"{label:>6}: click to injection median {statistics.median(latencies) * 1000:7.3f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.3f} ms, "
+          f"re-stored after paste {restored}/{CLICKS}, history {len(inmemory.get_clipboard_items())}/{HISTORY}")
+
+
+def main():
+    rng = random.Random(4)
+    for label, size in SIZES.items():
+        run(label, size, rng)
+
+
+if __name__ == "__main__":
+    main()
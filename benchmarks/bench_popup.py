@@ -0,0 +1,84 @@
+"""Hotkey-to-first-paint latency for cold (popup built on demand) and warm (pre-built) opens.
+
+The Tk thread runs mainloop, as in the app, and the hotkey is sent from
+another thread, so the latency includes the hop to the Tk thread. Needs a
+display; on a headless machine run it under Xvfb:
+xvfb-run -a python -m benchmarks.bench_popup
+"""
+import statistics
+import threading
+import time
+from queue import Queue
+from clipboard import inmemory
+from clipboard.manager import ClipboardMonitor, ScriptedChangeSource
+from clipboard.ui import ClipboardManagerUI
+
+OPENS = 20
+TIMEOUT_SECONDS = 120
+
+
+def wait(until, timeout=5.0):
+    """Sleep on the benchmark thread until `until()` holds; the Tk thread keeps running mainloop."""
+    deadline = time.perf_counter() + timeout
+    while not until() and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    if not until():
+        raise TimeoutError("the popup did not respond to the hotkey")
+
+
+def open_and_close(ui):
+    opened = len(ui.toggle_latencies)
+    ui.toggle_popup()
+    wait(lambda: len(ui.toggle_latencies) > opened)
+    wait(lambda: ui._fade_job is None)
+    ui.toggle_popup()
+    wait(lambda: not ui.popup_visible)
+    return ui.toggle_latencies[-1] * 1000
+
+
+def drop_popup(ui):
+    ui.popup.destroy()
+    ui.popup = None
+    ui.render_cache.clear()
+
+
+def measure(ui, results):
+    # Lets the pre-built popup from startup finish before the first cold open drops it.
+    ui.run_on_ui(lambda: None)
+    for _ in range(OPENS):
+        ui.run_on_ui(lambda: drop_popup(ui))
+        results["cold"].append(open_and_close(ui))
+    for _ in range(OPENS):
+        results["warm"].append(open_and_close(ui))
+
+
+def run(ui, results):
+    try:
+        measure(ui, results)
+    except Exception as e:
+        results["error"] = e
+    finally:
+        ui.run_on_ui(ui.root.quit)
+
+
+def main():
+    for i in range(50):
+        inmemory.add_clipboard_item(f"entry {i}: " + "copied text " * i)
+    ui = ClipboardManagerUI(ClipboardMonitor(ScriptedChangeSource([])), Queue())
+    results = {"cold": [], "warm": []}
+    threading.Thread(target=run, args=(ui, results), daemon=True).start()
+    ui.root.after(TIMEOUT_SECONDS * 1000, ui.root.quit)
+    ui.root.mainloop()
+    ui.root.destroy()
+
+    if "error" in results:
+        raise results["error"]
+    for name in ("cold", "warm"):
+        samples = results[name]
+        if len(samples) < OPENS:
+            raise SystemExit(f"only {len(samples)} of {OPENS} {name} opens were timed")
+        print(f"{name}: median {statistics.median(samples):.2f} ms, max {max(samples):.2f} ms to first paint")
+
+
+if __name__ == "__main__":
+    main()
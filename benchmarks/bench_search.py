@@ -0,0 +1,58 @@
+"""Per-keystroke search latency over a 100k-entry history.
+
+Run from the repository root:  python -m benchmarks.bench_search
+"""
+import random
+import statistics
+import time
+from clipboard.search import SearchIndex
+
+ENTRIES = 100_000
+KEYSTROKE_BUDGET_MS = 16.0
+WORDS = ("import", "return", "select", "from", "where", "error", "warning", "https", "example",
+         "docker", "kubectl", "config", "password", "token", "invoice", "meeting", "tomorrow",
+         "python", "function", "request", "response", "status", "deploy", "branch", "commit")
+
+
+def make_history(rng):
+    history = {}
+    for item_id in range(1, ENTRIES + 1):
+        words = rng.choices(WORDS, k=rng.randint(2, 30))
+        words.append(f"id{rng.randint(0, 999999)}")
+        history[item_id] = " ".join(words)
+    return history
+
+
+def main():
+    rng = random.Random(7)
+    history = make_history(rng)
+    index = SearchIndex(get_text=history.get)
+
+    started = time.perf_counter()
+    for item_id, text in history.items():
+        index.add(item_id, text)
+    build = time.perf_counter() - started
+    print(f"indexed {ENTRIES} entries in {build:.2f}s ({build / ENTRIES * 1e6:.1f} us/add)")
+
+    over_budget = False
+    for query, mode in (("kubectl config", "substring"), ("deplo", "prefix"),
+                        ("id4242", "substring"), ("pasword tokn", "fuzzy")):
+        timings = []
+        for end in range(1, len(query) + 1):
+            started = time.perf_counter()
+            index.search(query[:end], mode)
+            timings.append((time.perf_counter() - started) * 1000)
+        worst = max(timings)
+        over_budget |= worst > KEYSTROKE_BUDGET_MS
+        print(f"{mode:>9} {query!r:>18}: median {statistics.median(timings):6.2f} ms, "
+              f"worst {worst:6.2f} ms per keystroke")
+
+    started = time.perf_counter()
+    for item_id in range(1, 1001):
+        index.remove(item_id)
+    print(f"evicted 1000 entries in {(time.perf_counter() - started) * 1000:.1f} ms")
+    print(f"keystroke budget {KEYSTROKE_BUDGET_MS} ms: {'EXCEEDED' if over_budget else 'ok'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Import cost before clipboard capture starts, measured with `python -X importtime`.
+
+Everything `main` imports at module level runs before the monitor thread
+starts, so that cumulative import time is checked against a budget. The
+GUI and automation imports that are now deferred are reported for
+comparison. Run from the repository root:
+python -m benchmarks.bench_startup
+"""
+import subprocess
+import sys
+
+STARTUP_BUDGET_MS = 150.0
+RUNS = 5
+DEFERRED = ("clipboard.ui", "customtkinter", "pynput", "PIL.Image")
+
+
+def import_times(statement):
+    """Return {module: cumulative microseconds} for a fresh interpreter running `statement`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cumulative.isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    startup = min(import_times("import main").get("main", 0) for _ in range(RUNS)) / 1000
+    print(f"imports before capture starts: {startup:.1f} ms (budget {STARTUP_BUDGET_MS:.0f} ms)")
+
+    for module in DEFERRED:
+        try:
+            cost = min(import_times(f"import {module}").get(module, 0) for _ in range(RUNS)) / 1000
+            print(f"  deferred {module:<14} {cost:8.1f} ms")
+        except subprocess.CalledProcessError:
+            print(f"  deferred {module:<14}   not importable here")
+
+    if startup > STARTUP_BUDGET_MS:
+        print("startup import budget EXCEEDED")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Popup list update cost per clipboard insert and per scroll step.
+
+Needs a display; on a headless machine run it under Xvfb:
+xvfb-run -a python -m benchmarks.bench_ui
+"""
+import statistics
+import time
+from queue import Queue
+from clipboard import inmemory
+from clipboard.manager import ClipboardMonitor, ScriptedChangeSource
+from clipboard.ui import ClipboardManagerUI
+
+HISTORY = 3000
+INSERTS = 200
+OPENS = 10
+LARGE_ENTRY = 20 * 1024 * 1024
+
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def timed(ui, action):
+    started = time.perf_counter()
+    action()
+    ui.root.update_idletasks()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    inmemory.configure_eviction(max_items=HISTORY + INSERTS)
+    for i in range(HISTORY):
+        inmemory.add_clipboard_item(f"history entry {i}\n" + "some copied text " * (i % 40))
+
+    ui = ClipboardManagerUI(ClipboardMonitor(ScriptedChangeSource([])), Queue())
+    ui.show_popup()
+    ui.root.update()
+    ui.fetch_clipboard_items()
+    ui.root.update()
+    widgets = count_widgets(ui.popup)
+
+    insert_times = []
+    for i in range(INSERTS):
+        inmemory.add_clipboard_item(f"new entry {i}")
+        insert_times.append(timed(ui, ui.fetch_clipboard_items))
+
+    scroll_times = [timed(ui, lambda index=index: ui.scroll_to(index)) for index in range(0, HISTORY, 7)]
+
+    assert count_widgets(ui.popup) == widgets, "widget count changed while updating"
+    print(f"{len(ui.item_ids)} items shown with {widgets} widgets")
+    print(f"insert: median {statistics.median(insert_times):.2f} ms, max {max(insert_times):.2f} ms")
+    print(f"scroll: median {statistics.median(scroll_times):.2f} ms, max {max(scroll_times):.2f} ms")
+
+    for i in range(OPENS):
+        inmemory.add_clipboard_item(f"large entry {i}\n" + "x" * LARGE_ENTRY)
+        ui.render_cache.clear()
+        ui.close_popup()
+        ui.show_popup()
+        opened = len(ui.open_blocked_times)
+        while len(ui.open_blocked_times) == opened:
+            ui.root.update()
+    blocked = [seconds * 1000 for seconds in ui.open_blocked_times]
+    print(f"main thread blocked per cold popup open: median {statistics.median(blocked):.2f} ms, "
+          f"max {max(blocked):.2f} ms")
+    ui.root.destroy()
+
+
+if __name__ == "__main__":
+    main()
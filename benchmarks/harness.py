@@ -0,0 +1,168 @@
+"""Timing, baseline files and regression checks shared by the benchmark suite.
+
+A baseline is a JSON file holding, for every case, the per-operation time of
+each measured round. Two baselines are compared case by case with a
+one-sided Mann-Whitney U test: a case regresses when its rounds are slower
+with p below `alpha` and its median moved by more than `threshold`.
+"""
+import datetime
+import gc
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import NamedTuple
+
+FORMAT_VERSION = 1
+
+
+class Measurement(NamedTuple):
+    samples: list
+    extra: dict
+
+
+class Comparison(NamedTuple):
+    name: str
+    base_median: float
+    new_median: float
+    change: float
+    p_value: float
+    verdict: str
+
+
+def measure(operation, rounds, ops=1, setup=None):
+    """Time `operation` over `rounds` rounds and return the seconds per op of each round.
+
+    `setup` runs untimed before every round; `ops` is how many operations one
+    call of `operation` performs.
+    """
+    samples = []
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        gc.collect()
+        started = time.perf_counter()
+        operation()
+        samples.append((time.perf_counter() - started) / ops)
+    return samples
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def make_baseline(results):
+    """Wrap {case name: Measurement} in a baseline document with the machine details."""
+    return {
+        "version": FORMAT_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": {name: {"samples": result.samples, "median": statistics.median(result.samples),
+                           "extra": result.extra}
+                    for name, result in results.items()},
+    }
+
+
+def save_baseline(baseline, path):
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path} has baseline format {baseline.get('version')}, expected {FORMAT_VERSION}")
+    return baseline
+
+
+def mann_whitney_greater(base, new):
+    """One-sided p-value that samples in `new` tend to be larger than in `base`.
+
+    Uses the normal approximation with a tie and continuity correction, which
+    is close enough from about eight rounds per side.
+    """
+    pooled = sorted([(value, 0) for value in base] + [(value, 1) for value in new])
+    total = len(pooled)
+    rank_sum = 0.0
+    tie_term = 0
+    start = 0
+    while start < total:
+        end = start
+        while end + 1 < total and pooled[end + 1][0] == pooled[start][0]:
+            end += 1
+        average_rank = (start + end) / 2 + 1
+        rank_sum += average_rank * sum(side for _, side in pooled[start:end + 1])
+        tied = end - start + 1
+        tie_term += tied ** 3 - tied
+        start = end + 1
+    n_new, n_base = len(new), len(base)
+    u = rank_sum - n_new * (n_new + 1) / 2
+    mean = n_new * n_base / 2
+    variance = n_new * n_base / 12 * ((total + 1) - tie_term / (total * (total - 1)))
+    if variance <= 0:
+        return 0.0 if u > mean else 1.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(base, new, alpha=0.01, threshold=0.05):
+    """Compare two baselines and return a Comparison per case they share."""
+    comparisons = []
+    for name, result in new["results"].items():
+        previous = base["results"].get(name)
+        if previous is None:
+            continue
+        base_median, new_median = previous["median"], result["median"]
+        change = new_median / base_median - 1 if base_median else 0.0
+        slower = mann_whitney_greater(previous["samples"], result["samples"])
+        faster = mann_whitney_greater(result["samples"], previous["samples"])
+        if slower < alpha and change > threshold:
+            verdict, p_value = "REGRESSION", slower
+        elif faster < alpha and change < -threshold:
+            verdict, p_value = "improved", faster
+        else:
+            verdict, p_value = "", min(slower, faster)
+        comparisons.append(Comparison(name, base_median, new_median, change, p_value, verdict))
+        # Deterministic extras (bytes per item and the like) regress on the threshold alone.
+        for key, value in result.get("extra", {}).items():
+            old_value = previous.get("extra", {}).get(key)
+            if not old_value or not isinstance(value, (int, float)):
+                continue
+            extra_change = value / old_value - 1
+            extra_verdict = "REGRESSION" if extra_change > threshold else "improved" if extra_change < -threshold else ""
+            comparisons.append(Comparison(f"{name}:{key}", old_value, value, extra_change, float("nan"), extra_verdict))
+    return comparisons
+
+
+def format_seconds(value):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if value >= scale:
+            return f"{value / scale:.2f} {unit}"
+    return f"{value / 1e-9:.0f} ns"
+
+
+def print_results(results):
+    for name, result in results.items():
+        samples = result.samples
+        spread = statistics.stdev(samples) / statistics.mean(samples) * 100 if len(samples) > 1 and any(samples) else 0.0
+        extra = "".join(f"  {key}={value:.1f}" for key, value in result.extra.items())
+        print(f"{name:<44} {format_seconds(statistics.median(samples)):>10}/op  ±{spread:4.1f}%{extra}")
+
+
+def print_comparisons(comparisons):
+    for c in comparisons:
+        is_extra = ":" in c.name
+        old = f"{c.base_median:.1f}" if is_extra else format_seconds(c.base_median)
+        new = f"{c.new_median:.1f}" if is_extra else format_seconds(c.new_median)
+        p_value = "" if math.isnan(c.p_value) else f"p={c.p_value:.4f}"
+        print(f"{c.name:<52} {old:>10} -> {new:>10}  {c.change * 100:+6.1f}%  {p_value:<9} {c.verdict}")
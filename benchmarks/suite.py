@@ -0,0 +1,315 @@
+"""Benchmark suite for the hot paths, with saved baselines and regression checks.
+
+Cases cover the history store (add, evict, memory usage, decompress) across
+history sizes and payload distributions, the monitor loop reading from a
+fake pyperclip, and the popup's populate_items/refresh path. The UI cases
+need a display and are skipped without one; on a headless machine run the
+suite under Xvfb.
+
+Run from the repository root:
+    python -m benchmarks.suite run [--quick] [--only store.add] [--save baseline.json]
+    python -m benchmarks.suite compare baseline.json [current.json]
+    xvfb-run -a python -m benchmarks.suite run --only ui
+
+`compare` runs the suite when no current results are given and exits with
+status 1 if any case regressed. Cases share the process-wide history (and
+its compression dictionary), so compare runs made with the same --quick and
+--only selection on the same machine.
+"""
+import argparse
+import fnmatch
+import os
+import random
+import sys
+from typing import Callable, NamedTuple
+from clipboard import inmemory
+from clipboard.manager import ClipboardMonitor, PollingChangeSource
+from benchmarks.harness import (Measurement, compare, load_baseline, make_baseline, measure, print_comparisons,
+                                print_results, save_baseline)
+
+SIZES = (100, 1000, 10000)
+QUICK_SIZES = (100, 1000)
+DISTRIBUTIONS = ("short", "code", "mixed")
+ROUNDS = 10
+QUICK_ROUNDS = 8
+ADDS_PER_ROUND = 200
+MEMORY_CALLS_PER_ROUND = 1000
+CAPTURES_PER_ROUND = 200
+IDLE_POLLS = 10
+MONITOR_HISTORY = 1000
+UI_HISTORY = 3000
+
+WORDS = ("copy paste clipboard history value config server user error import return self item "
+         "request response token session cache index update delete").split()
+
+
+class Case(NamedTuple):
+    name: str
+    run: Callable
+
+
+class FakePyperclip:
+    """Stands in for the pyperclip module: `paste` replays a script of clipboard contents."""
+
+    def __init__(self):
+        self.contents = iter(())
+        self.current = ""
+
+    def load(self, contents):
+        self.contents = iter(contents)
+
+    def copy(self, text):
+        self.current = text
+
+    def paste(self):
+        self.current = next(self.contents, self.current)
+        return self.current
+
+
+def make_payload(rng, distribution, serial):
+    """One clipboard entry; `serial` keeps entries unique so none are deduplicated."""
+    kind = distribution
+    if distribution == "mixed":
+        kind = rng.choices(("short", "code", "large"), weights=(80, 15, 5))[0]
+    if kind == "short":
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 12)))
+    elif kind == "code":
+        lines = []
+        for _ in range(rng.randint(30, 120)):
+            name, other = rng.choice(WORDS), rng.choice(WORDS)
+            lines.append(" " * 4 * rng.randint(0, 3) + f"{name}_{rng.randint(0, 99)} = {other}({name}, {rng.random():.3f})")
+        text = "\n".join(lines)
+    else:
+        count = rng.randint(64, 256) * 1024 // 80
+        text = "\n".join(f"2026-01-{rng.randint(1, 28):02d} INFO {rng.choice(WORDS)} {rng.randint(0, 1 << 32):x} "
+                         f"{' '.join(rng.choice(WORDS) for _ in range(6))}" for _ in range(count))
+    return f"{serial} {text}"
+
+
+class PayloadStream:
+    def __init__(self, distribution, seed=7):
+        self.rng = random.Random(seed)
+        self.distribution = distribution
+        self.serial = 0
+
+    def take(self, count):
+        payloads = []
+        for _ in range(count):
+            self.serial += 1
+            payloads.append(make_payload(self.rng, self.distribution, self.serial))
+        return payloads
+
+
+def _fill(size, stream):
+    """Empty the history, then fill it to `size` items with the byte cap out of the way."""
+    inmemory.clear_clipboard()
+    inmemory.configure_eviction(max_items=size, max_bytes=1 << 40)
+    for payload in stream.take(size):
+        inmemory.add_clipboard_item(payload)
+
+
+def store_add(size, distribution, rounds):
+    """Steady state: the history is full, so every add also evicts the oldest item."""
+    stream = PayloadStream(distribution)
+    _fill(size, stream)
+    batches = []
+
+    def setup():
+        batches.append(stream.take(ADDS_PER_ROUND))
+
+    def operation():
+        for payload in batches[-1]:
+            inmemory.add_clipboard_item(payload)
+    return Measurement(measure(operation, rounds, ADDS_PER_ROUND, setup), {})
+
+
+def store_evict(size, distribution, rounds):
+    """One eviction pass dropping a tenth of the history; timed per evicted item."""
+    stream = PayloadStream(distribution)
+    _fill(size, stream)
+    overflow = max(1, size // 10)
+
+    def setup():
+        inmemory.MAX_ITEMS = size + overflow
+        for payload in stream.take(overflow):
+            inmemory.add_clipboard_item(payload)
+        inmemory.MAX_ITEMS = size
+
+    return Measurement(measure(inmemory.manage_memory, rounds, overflow, setup), {})
+
+
+def store_memory_usage(size, distribution, rounds):
+    stream = PayloadStream(distribution)
+    _fill(size, stream)
+
+    def operation():
+        for _ in range(MEMORY_CALLS_PER_ROUND):
+            inmemory.get_clipboard_memory_usage()
+    samples = measure(operation, rounds, MEMORY_CALLS_PER_ROUND)
+    count = len(inmemory.get_clipboard_items())
+    return Measurement(samples, {"stored_bytes_per_item": inmemory.get_clipboard_memory_usage() / count})
+
+
+def store_decompress(size, distribution, rounds):
+    """Full-text decompression of every item in the history, per item."""
+    stream = PayloadStream(distribution)
+    _fill(size, stream)
+    items = inmemory.get_clipboard_items()
+
+    def operation():
+        for item in items:
+            inmemory.get_decompressed_text(item)
+    return Measurement(measure(operation, rounds, len(items)), {})
+
+
+def monitor_loop(distribution, idle_polls, rounds):
+    """The monitor loop body over a fake pyperclip: `idle_polls` unchanged reads before each new copy."""
+    stream = PayloadStream(distribution)
+    _fill(MONITOR_HISTORY, stream)
+    clipboard = FakePyperclip()
+    source = PollingChangeSource(paste=clipboard.paste, min_interval=0, max_interval=0)
+    monitor = ClipboardMonitor(source)
+    clipboard.load(stream.take(1))
+    monitor.capture(source.wait_for_change())
+
+    def setup():
+        script = []
+        for payload in stream.take(CAPTURES_PER_ROUND):
+            script.extend([clipboard.current] * idle_polls)
+            script.append(payload)
+        clipboard.load(script)
+
+    def operation():
+        for _ in range(CAPTURES_PER_ROUND):
+            monitor.capture(source.wait_for_change())
+    return Measurement(measure(operation, rounds, CAPTURES_PER_ROUND, setup), {})
+
+
+_ui = None
+
+
+def _popup():
+    """Build the popup once and share it between the UI cases."""
+    global _ui
+    if _ui is None:
+        from queue import Queue
+        from clipboard.manager import ScriptedChangeSource
+        from clipboard.ui import ClipboardManagerUI
+        _ui = ClipboardManagerUI(ClipboardMonitor(ScriptedChangeSource([])), Queue())
+        _ui.show_popup()
+        _ui.root.update()
+    return _ui
+
+
+def ui_populate(rounds):
+    """Rebinding every card: scrolling by a full page so no card keeps its item."""
+    from clipboard.ui import VISIBLE_CARDS
+    _fill(UI_HISTORY, PayloadStream("mixed"))
+    ui = _popup()
+    ui.fetch_clipboard_items()
+    pages = list(range(0, len(ui.item_ids) - VISIBLE_CARDS, VISIBLE_CARDS))
+
+    def operation():
+        for first_index in pages:
+            ui.first_index = first_index
+            ui.populate_items()
+            ui.root.update_idletasks()
+    return Measurement(measure(operation, rounds, len(pages)), {})
+
+
+def ui_refresh(rounds):
+    """What update_items leads to once the dispatcher's coalescing delay has passed: one new item on top."""
+    stream = PayloadStream("mixed")
+    _fill(UI_HISTORY, stream)
+    ui = _popup()
+    ui.first_index = 0
+    ui.fetch_clipboard_items()
+    batches = []
+
+    def setup():
+        batches.append(stream.take(ADDS_PER_ROUND // 10))
+
+    def operation():
+        for payload in batches[-1]:
+            inmemory.add_clipboard_item(payload)
+            ui.refresh_items()
+            ui.root.update_idletasks()
+    return Measurement(measure(operation, rounds, ADDS_PER_ROUND // 10, setup), {})
+
+
+def build_cases(quick=False):
+    sizes = QUICK_SIZES if quick else SIZES
+    cases = []
+    for distribution in DISTRIBUTIONS:
+        for size in sizes:
+            label = f"{distribution}/{size}"
+            cases.append(Case(f"store.add[{label}]", lambda r, s=size, d=distribution: store_add(s, d, r)))
+            cases.append(Case(f"store.evict[{label}]", lambda r, s=size, d=distribution: store_evict(s, d, r)))
+            cases.append(Case(f"store.memory_usage[{label}]",
+                              lambda r, s=size, d=distribution: store_memory_usage(s, d, r)))
+            cases.append(Case(f"store.decompress[{label}]", lambda r, s=size, d=distribution: store_decompress(s, d, r)))
+        cases.append(Case(f"monitor.capture[{distribution}]", lambda r, d=distribution: monitor_loop(d, 0, r)))
+        cases.append(Case(f"monitor.idle_polls[{distribution}]",
+                          lambda r, d=distribution: monitor_loop(d, IDLE_POLLS, r)))
+    cases.append(Case("ui.populate_items", ui_populate))
+    cases.append(Case("ui.refresh_items", ui_refresh))
+    return cases
+
+
+def run_suite(only=None, quick=False, rounds=None):
+    rounds = rounds or (QUICK_ROUNDS if quick else ROUNDS)
+    results = {}
+    for case in build_cases(quick):
+        if only and not any(fnmatch.fnmatch(case.name, f"{pattern}*") for pattern in only):
+            continue
+        if case.name.startswith("ui.") and not os.environ.get("DISPLAY"):
+            print(f"{case.name}: skipped, needs a display (run under xvfb-run -a)", file=sys.stderr)
+            continue
+        print(f"{case.name} ...", file=sys.stderr)
+        results[case.name] = case.run(rounds)
+    inmemory.clear_clipboard()
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.split("\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the suite and optionally save a baseline")
+    run_parser.add_argument("--save", help="write the results to this JSON file")
+    compare_parser = commands.add_parser("compare", help="flag cases that got significantly slower")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current", nargs="?", help="saved results to compare; runs the suite without it")
+    compare_parser.add_argument("--alpha", type=float, default=0.01, help="significance level (default 0.01)")
+    compare_parser.add_argument("--threshold", type=float, default=0.05,
+                                help="smallest relative slowdown reported (default 0.05)")
+    compare_parser.add_argument("--save", help="also write the fresh results to this JSON file")
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("--only", action="append", help="run cases whose name starts with this glob (repeatable)")
+        sub.add_argument("--quick", action="store_true", help="smaller histories and fewer rounds")
+        sub.add_argument("--rounds", type=int, help=f"timed rounds per case (default {ROUNDS})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "compare" and args.current:
+        current = load_baseline(args.current)
+    else:
+        results = run_suite(args.only, args.quick, args.rounds)
+        print_results(results)
+        current = make_baseline(results)
+        if args.save:
+            save_baseline(current, args.save)
+            print(f"Saved {len(results)} results to {args.save}")
+    if args.command == "run":
+        return 0
+
+    comparisons = compare(load_baseline(args.baseline), current, args.alpha, args.threshold)
+    print_comparisons(comparisons)
+    regressions = [c for c in comparisons if c.verdict == "REGRESSION"]
+    print(f"{len(regressions)} regression(s) in {len(comparisons)} compared result(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Command-line client for a running clipboard manager.
+
+    python -m clipboard.cli list [-n 20]
+    python -m clipboard.cli get ID [-o FILE]
+    python -m clipboard.cli search QUERY [--mode substring|prefix|fuzzy]
+    python -m clipboard.cli push [TEXT]    (reads stdin without TEXT)
+    python -m clipboard.cli clear | stats | toggle
+    python -m clipboard.cli metrics [--format json|prometheus]
+    python -m clipboard.cli profile [--tracemalloc]    (run twice: start, then stop and write the stats)
+"""
+import argparse
+import json
+import sys
+import time
+from clipboard.client import ClipboardClient
+from clipboard.protocol import METRICS_FORMATS, SEARCH_MODES, ProtocolError
+
+
+def _print_items(items):
+    for item in items:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(item.timestamp))
+        if item.mime == "text/plain":
+            summary = " ".join(item.data.decode("utf-8", errors="ignore").split())
+        else:
+            summary = f"[{item.mime}]"
+        print(f"{item.item_id:>8}  {stamp}  {summary}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m clipboard.cli", description="Query a running clipboard manager")
+    parser.add_argument("--socket", help="socket of the running instance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="show the newest items")
+    list_parser.add_argument("-n", "--limit", type=int, default=20)
+    get_parser = commands.add_parser("get", help="print an item")
+    get_parser.add_argument("item_id", type=int)
+    get_parser.add_argument("-o", "--output", help="write the item to a file instead of stdout")
+    search_parser = commands.add_parser("search", help="search the history")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--mode", choices=SEARCH_MODES, default="substring")
+    search_parser.add_argument("-n", "--limit", type=int, default=20)
+    push_parser = commands.add_parser("push", help="add text (or stdin) to the history")
+    push_parser.add_argument("text", nargs="?")
+    push_parser.add_argument("--mime", default="text/plain")
+    commands.add_parser("clear", help="clear the history")
+    commands.add_parser("stats", help="show history counters")
+    commands.add_parser("toggle", help="show or hide the popup")
+    metrics_parser = commands.add_parser("metrics", help="show latency histograms (start with --metrics)")
+    metrics_parser.add_argument("--format", choices=METRICS_FORMATS, default="json")
+    profile_parser = commands.add_parser("profile", help="start or stop cProfile on the UI thread")
+    profile_parser.add_argument("--tracemalloc", action="store_true", help="toggle tracemalloc instead")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        client = ClipboardClient(args.socket)
+    except OSError as e:
+        print(f"Error connecting to the clipboard manager: {e}", file=sys.stderr)
+        return 1
+
+    with client:
+        try:
+            if args.command == "list":
+                _print_items(client.list(args.limit))
+            elif args.command == "get":
+                item = client.get(args.item_id)
+                if item is None:
+                    print(f"No item {args.item_id}", file=sys.stderr)
+                    return 1
+                if args.output:
+                    with open(args.output, "wb") as f:
+                        f.write(item.data)
+                else:
+                    sys.stdout.buffer.write(item.data)
+            elif args.command == "search":
+                _print_items(client.search(args.query, args.mode, args.limit))
+            elif args.command == "push":
+                client.push(args.text if args.text is not None else sys.stdin.buffer.read(), args.mime)
+            elif args.command == "clear":
+                client.clear()
+            elif args.command == "stats":
+                print(json.dumps(client.stats(), indent=2))
+            elif args.command == "toggle":
+                client.toggle()
+            elif args.command == "metrics":
+                sys.stdout.write(client.metrics(args.format))
+            elif args.command == "profile":
+                print(client.profile("tracemalloc" if args.tracemalloc else "cprofile"))
+        except (OSError, ProtocolError) as e:
+            print(f"Error talking to the clipboard manager: {e}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import json
+import socket
+from clipboard.protocol import (GET_REQUEST, LIST_REQUEST, METRICS_FORMATS, OP_CLEAR, OP_GET, OP_LIST, OP_METRICS,
+                                OP_PROFILE, OP_PUSH, OP_SEARCH, OP_STATS, OP_TOGGLE, PROFILERS, PUSH_REQUEST,
+                                SEARCH_MODES, SEARCH_REQUEST, STATUS_NOT_FOUND, STATUS_OK, UNIX_SOCKETS, ProtocolError,
+                                check_peer, check_socket_owner, recv_frame, send_frame, unpack_items)
+
+PREVIEW_BYTES = 200
+
+
+class ClipboardClient:
+    """A connection to the running clipboard manager's Unix socket.
+
+    One connection carries any number of requests, answered in order.
+    """
+
+    def __init__(self, path=None, timeout=5.0):
+        if not UNIX_SOCKETS:
+            raise OSError("The local API needs Unix sockets, which this platform does not have")
+        if path is None:
+            from clipboard.daemon import default_socket_path
+            path = default_socket_path()
+        check_socket_owner(path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(path)
+            check_peer(self.sock)
+        except OSError:
+            self.sock.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def request(self, opcode, payload=b""):
+        """Send one request and return the reply payload, or None if the item was not found."""
+        send_frame(self.sock, opcode, payload)
+        frame = recv_frame(self.sock)
+        if frame is None:
+            raise ProtocolError("Clipboard manager closed the connection")
+        status, reply = frame
+        if status == STATUS_NOT_FOUND:
+            return None
+        if status != STATUS_OK:
+            raise ProtocolError(reply.decode("utf-8", errors="ignore"))
+        return reply
+
+    def list(self, limit=20, preview_bytes=PREVIEW_BYTES):
+        """Return the newest items with at most `preview_bytes` of their text."""
+        return unpack_items(self.request(OP_LIST, LIST_REQUEST.pack(limit, preview_bytes)))
+
+    def get(self, item_id):
+        """Return an item with its full data, or None if it is gone."""
+        reply = self.request(OP_GET, GET_REQUEST.pack(item_id))
+        return unpack_items(reply)[0] if reply is not None else None
+
+    def search(self, query, mode="substring", limit=20, preview_bytes=PREVIEW_BYTES):
+        """Return matching items, best first, with previews."""
+        payload = SEARCH_REQUEST.pack(SEARCH_MODES.index(mode), limit, preview_bytes) + query.encode("utf-8")
+        return unpack_items(self.request(OP_SEARCH, payload))
+
+    def push(self, data, mime="text/plain"):
+        """Add text or binary data to the history."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        encoded_mime = mime.encode("ascii")
+        self.request(OP_PUSH, PUSH_REQUEST.pack(len(encoded_mime)) + encoded_mime + data)
+
+    def clear(self):
+        """Clear the history."""
+        self.request(OP_CLEAR)
+
+    def stats(self):
+        """Return the history counters as a dict."""
+        return json.loads(self.request(OP_STATS))
+
+    def toggle(self):
+        """Show or hide the popup of the running instance."""
+        self.request(OP_TOGGLE)
+
+    def metrics(self, fmt="json"):
+        """Return the running instance's metrics as "json" or "prometheus" text."""
+        return self.request(OP_METRICS, bytes([METRICS_FORMATS.index(fmt)])).decode()
+
+    def profile(self, kind="cprofile"):
+        """Start or stop a profiler in the running instance and return its status message."""
+        return self.request(OP_PROFILE, bytes([PROFILERS.index(kind)])).decode()
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,213 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+from clipboard import metrics
+from clipboard.inmemory import (add_clipboard_blob, add_clipboard_item, clear_clipboard, get_clipboard_item,
+                                get_clipboard_items, get_clipboard_stats, get_decompressed_prefix, get_item_data,
+                                get_item_mime, is_binary_item, search_clipboard_items)
+from clipboard.protocol import (GET_REQUEST, LIST_REQUEST, METRICS_FORMATS, OP_CLEAR, OP_GET, OP_LIST, OP_METRICS,
+                                OP_PROFILE, OP_PUSH, OP_SEARCH, OP_STATS, OP_TOGGLE, PROFILERS, PUSH_REQUEST,
+                                SEARCH_MODES, SEARCH_REQUEST, STATUS_ERROR, STATUS_NOT_FOUND, STATUS_OK, ProtocolError,
+                                RemoteItem, check_peer, check_socket_owner, pack_items, recv_frame, send_frame)
+
+SOCKET_NAME = "clipboard-manager.sock"
+
+
+def default_socket_path():
+    """Return the per-user socket path, in XDG_RUNTIME_DIR when it is set.
+
+    Otherwise the socket goes in a directory under the temp dir that only
+    this user can enter; PermissionError is raised if that name is taken by
+    anything else.
+    """
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(os.environ["XDG_RUNTIME_DIR"], SOCKET_NAME)
+    directory = os.path.join(tempfile.gettempdir(), f"clipboard-manager-{os.getuid()}")
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"{directory} is not a private directory owned by this user")
+    return os.path.join(directory, SOCKET_NAME)
+
+
+def instance_running(path):
+    """Return True if another clipboard manager of this user is answering on the socket."""
+    try:
+        check_socket_owner(path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1.0)
+            sock.connect(path)
+            check_peer(sock)
+        return True
+    except OSError:
+        return False
+
+
+class _NotFound(Exception):
+    pass
+
+
+def _preview(item, preview_bytes):
+    if is_binary_item(item):
+        return RemoteItem(item.item_id, item.timestamp, get_item_mime(item), b"")
+    text = get_decompressed_prefix(item, preview_bytes)
+    return RemoteItem(item.item_id, item.timestamp, "text/plain", text.encode("utf-8", errors="ignore"))
+
+
+class _ClientHandler(socketserver.BaseRequestHandler):
+    """Serves one client connection; requests on a connection are answered in order."""
+
+    def handle(self):
+        try:
+            check_peer(self.request)
+        except OSError:
+            return
+        while True:
+            try:
+                frame = recv_frame(self.request)
+            except (OSError, ProtocolError):
+                return
+            if frame is None:
+                return
+            opcode, payload = frame
+            try:
+                status, reply = STATUS_OK, self.server.dispatch(opcode, payload)
+            except _NotFound:
+                status, reply = STATUS_NOT_FOUND, b""
+            except Exception as e:
+                status, reply = STATUS_ERROR, str(e).encode("utf-8", errors="ignore")
+            try:
+                send_frame(self.request, status, reply)
+            except OSError:
+                return
+
+
+class ClipboardServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix-socket API over the clipboard history: list, get, search, push, clear, stats, toggle,
+    metrics and profile.
+
+    Each client connection gets its own thread; the history functions do
+    their own locking. `monitor` listeners are notified after a push or
+    clear so an in-process UI refreshes, and `on_toggle` shows the popup
+    when another launch or the CLI asks for it. `run_on_ui` runs a callable
+    on the Tk thread and returns its result; cProfile needs it, since a
+    profiler only sees the thread that started it.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, path, monitor=None, on_toggle=None, run_on_ui=None):
+        self.path = path
+        self.monitor = monitor
+        self.on_toggle = on_toggle
+        self.run_on_ui = run_on_ui
+        self.requests_served = 0
+        self.handlers = {
+            OP_LIST: self._list,
+            OP_GET: self._get,
+            OP_SEARCH: self._search,
+            OP_PUSH: self._push,
+            OP_CLEAR: self._clear,
+            OP_STATS: self._stats,
+            OP_TOGGLE: self._toggle,
+            OP_METRICS: self._metrics,
+            OP_PROFILE: self._profile,
+        }
+        if os.path.lexists(path) and not instance_running(path):
+            # Refuses to remove anything but a stale socket of this user.
+            check_socket_owner(path)
+            os.remove(path)
+        old_umask = os.umask(0o077)
+        try:
+            super().__init__(path, _ClientHandler)
+        finally:
+            os.umask(old_umask)
+
+    def dispatch(self, opcode, payload):
+        """Run one request and return the reply payload."""
+        handler = self.handlers.get(opcode)
+        if handler is None:
+            raise ProtocolError(f"Unknown opcode: {opcode}")
+        self.requests_served += 1
+        return handler(payload)
+
+    def _list(self, payload):
+        limit, preview_bytes = LIST_REQUEST.unpack(payload)
+        return pack_items([_preview(item, preview_bytes) for item in get_clipboard_items(limit or None)])
+
+    def _get(self, payload):
+        (item_id,) = GET_REQUEST.unpack(payload)
+        item = get_clipboard_item(item_id)
+        if item is None:
+            raise _NotFound()
+        return pack_items([RemoteItem(item.item_id, item.timestamp, get_item_mime(item), get_item_data(item))])
+
+    def _search(self, payload):
+        mode, limit, preview_bytes = SEARCH_REQUEST.unpack_from(payload)
+        query = payload[SEARCH_REQUEST.size:].decode("utf-8", errors="ignore")
+        items = search_clipboard_items(query, SEARCH_MODES[mode], limit)
+        return pack_items([_preview(item, preview_bytes) for item in items])
+
+    def _push(self, payload):
+        (mime_length,) = PUSH_REQUEST.unpack_from(payload)
+        start = PUSH_REQUEST.size
+        mime = payload[start:start + mime_length].decode("ascii")
+        data = payload[start + mime_length:]
+        if mime == "text/plain":
+            add_clipboard_item(data.decode("utf-8", errors="ignore"))
+        else:
+            add_clipboard_blob(data, mime)
+        self._notify()
+        return b""
+
+    def _clear(self, payload):
+        clear_clipboard()
+        self._notify()
+        return b""
+
+    def _stats(self, payload):
+        stats = get_clipboard_stats()
+        stats["requests_served"] = self.requests_served
+        return json.dumps(stats).encode()
+
+    def _toggle(self, payload):
+        if self.on_toggle is None:
+            raise ProtocolError("This instance runs without a popup")
+        self.on_toggle()
+        return b""
+
+    def _metrics(self, payload):
+        return metrics.render(METRICS_FORMATS[payload[0] if payload else 0]).encode()
+
+    def _profile(self, payload):
+        kind = PROFILERS[payload[0] if payload else 0]
+        if kind == "tracemalloc":
+            return metrics.toggle_tracemalloc().encode()
+        if self.run_on_ui is None:
+            raise ProtocolError("cProfile follows the Tk thread; this instance runs without a popup")
+        return self.run_on_ui(metrics.toggle_profiler).encode()
+
+    def _notify(self):
+        if self.monitor is not None:
+            self.monitor.notify_listeners()
+
+    def start(self):
+        """Serve requests on a daemon thread."""
+        threading.Thread(target=self.serve_forever, name="clipboard-ipc", daemon=True).start()
+        return self
+
+    def server_close(self):
+        super().server_close()
+        try:
+            check_socket_owner(self.path)
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,106 @@
+from concurrent.futures import Future
+from queue import Empty
+from typing import Callable, NamedTuple
+import threading
+import tkinter as tk
+
+DISPATCH_EVENT = "<<ClipboardDispatch>>"
+COALESCE_MS = 30
+CATCH_UP_MS = 100
+
+
+class TogglePopup(NamedTuple):
+    requested_at: float
+
+
+class ClipboardChanged(NamedTuple):
+    pass
+
+
+class PreviewReady(NamedTuple):
+    item_id: int
+
+
+class RunOnUIThread(NamedTuple):
+    function: Callable
+    future: Future
+
+
+class UIDispatcher:
+    """Hands messages from other threads to the Tk thread without polling.
+
+    `post` queues a message and, if the Tk thread is not already due to
+    drain the queue, wakes it with a virtual event. Bursts of
+    ClipboardChanged messages are coalesced into a single refresh that
+    runs COALESCE_MS after the first one.
+
+    A wakeup from another thread only gets through while the main loop
+    runs. Until one has, a catch-up timer drains whatever is queued every
+    CATCH_UP_MS, so messages whose wakeup failed before the main loop
+    started (or while Tk is only pumped by `update`) are not stranded.
+    """
+
+    def __init__(self, root, queue, handler, on_clipboard_changed):
+        self.root = root
+        self.queue = queue
+        self.handler = handler
+        self.on_clipboard_changed = on_clipboard_changed
+        self.wakeups = 0
+        self.coalesced = 0
+        self._wakeup_pending = threading.Event()
+        self._refresh_scheduled = False
+        self._tk_thread = threading.current_thread()
+        self._woken_from_thread = False
+        self.root.bind(DISPATCH_EVENT, self._drain)
+        self.root.after_idle(self._catch_up)
+
+    def post(self, message):
+        """Queue a message for the Tk thread; safe to call from any thread."""
+        self.queue.put(message)
+        if self._wakeup_pending.is_set():
+            return
+        self._wakeup_pending.set()
+        try:
+            self.root.event_generate(DISPATCH_EVENT, when="tail")
+        except (RuntimeError, tk.TclError):
+            # The main loop is not running yet (or is gone); _catch_up picks the message up.
+            self._wakeup_pending.clear()
+        else:
+            if threading.current_thread() is not self._tk_thread:
+                self._woken_from_thread = True
+
+    def _catch_up(self):
+        if not self.queue.empty():
+            self._drain()
+        if not self._woken_from_thread:
+            self.root.after(CATCH_UP_MS, self._catch_up)
+
+    def _drain(self, event=None):
+        self._wakeup_pending.clear()
+        self.wakeups += 1
+        while True:
+            try:
+                message = self.queue.get_nowait()
+            except Empty:
+                break
+            try:
+                if isinstance(message, ClipboardChanged):
+                    self._schedule_refresh()
+                else:
+                    self.handler(message)
+            except Exception as e:
+                print(f"Error processing queue: {e}")
+
+    def _schedule_refresh(self):
+        if self._refresh_scheduled:
+            self.coalesced += 1
+            return
+        self._refresh_scheduled = True
+        self.root.after(COALESCE_MS, self._refresh)
+
+    def _refresh(self):
+        self._refresh_scheduled = False
+        try:
+            self.on_clipboard_changed()
+        except Exception as e:
+            print(f"Error refreshing clipboard items: {e}")
@@ -0,0 +1,219 @@
+from array import array
+from itertools import accumulate, compress
+from operator import add
+import threading
+
+COMPACT_MIN_DEAD = 1024
+COMPACT_MIN_BYTES = 1024 * 1024
+
+
+class SlotHistory:
+    """In-memory clipboard history kept in parallel arrays instead of one object per item.
+
+    Slot i holds ids[i], timestamps[i] and a (offsets[i], lengths[i]) span of
+    the shared blob arena. Ids grow monotonically and slots are only ever
+    appended, so the arrays stay sorted by id: iteration walks them backwards
+    and eviction advances `live_start`. Every id gets a slot when it is
+    handed out, so ids are dense and `slots[item_id - slot_base_id]` finds
+    an item's slot in O(1), or -1 once it is gone. Moving an item to the top
+    appends it again under a new id and leaves a dead slot behind. Dead slots
+    and their arena bytes are dropped by an amortized compaction once they
+    outweigh the live ones; it renumbers the slot of every surviving id.
+    """
+
+    DEAD = -1
+
+    def __init__(self, first_id=1):
+        self.ids = array("Q")
+        self.timestamps = array("d")
+        self.offsets = array("q")
+        self.lengths = array("I")
+        self.arena = bytearray()
+        self.slots = array("i")
+        self.slot_base_id = first_id
+        self.next_id = first_id
+        self.live_start = 0
+        self.live_count = 0
+        self.live_bytes = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return self.live_count
+
+    def _position(self, item_id):
+        index = item_id - self.slot_base_id
+        if 0 <= index < len(self.slots):
+            position = self.slots[index]
+            if position >= 0:
+                return position
+        return None
+
+    def _record(self, position):
+        offset, length = self.offsets[position], self.lengths[position]
+        # Slicing the bytearray itself would copy the payload once more before bytes() does. The
+        # temporary view is released as soon as tobytes returns, before the arena can grow again.
+        return memoryview(self.arena)[offset:offset + length].tobytes(), self.timestamps[position], self.ids[position]
+
+    def append(self, payload: bytes, timestamp: float) -> int:
+        """Store a compressed payload and return its item id."""
+        with self.lock:
+            item_id = self.next_id
+            self.next_id += 1
+            self.slots.append(len(self.ids))
+            self.ids.append(item_id)
+            self.timestamps.append(timestamp)
+            self.offsets.append(len(self.arena))
+            self.lengths.append(len(payload))
+            self.arena += payload
+            self.live_count += 1
+            self.live_bytes += len(payload)
+            return item_id
+
+    def move_to_top(self, item_id, timestamp):
+        """Re-append an item as the newest one and return its new id, or None if it is gone."""
+        with self.lock:
+            position = self._position(item_id)
+            if position is None:
+                return None
+            offset, length = self.offsets[position], self.lengths[position]
+            self._kill(position)
+            new_id = self.next_id
+            self.next_id += 1
+            self.slots.append(len(self.ids))
+            self.ids.append(new_id)
+            self.timestamps.append(timestamp)
+            self.offsets.append(offset)
+            self.lengths.append(length)
+            self.live_count += 1
+            self.live_bytes += length
+            self._maybe_compact()
+            return new_id
+
+    def items(self, limit=None):
+        """Return (payload, timestamp, item_id) tuples, newest first."""
+        with self.lock:
+            records = []
+            for position in range(len(self.ids) - 1, self.live_start - 1, -1):
+                if limit is not None and len(records) >= limit:
+                    break
+                if self.offsets[position] != self.DEAD:
+                    records.append(self._record(position))
+            return records
+
+    def item_ids(self, limit=None):
+        """Return the ids of the live items, newest first, without copying their payloads."""
+        with self.lock:
+            ids = []
+            for position in range(len(self.ids) - 1, self.live_start - 1, -1):
+                if limit is not None and len(ids) >= limit:
+                    break
+                if self.offsets[position] != self.DEAD:
+                    ids.append(self.ids[position])
+            return ids
+
+    def record_heads(self, size):
+        """Return the first `size` bytes of every live payload, oldest first."""
+        with self.lock, memoryview(self.arena) as view:
+            return [view[offset:offset + min(size, length)].tobytes()
+                    for offset, length in zip(self.offsets[self.live_start:], self.lengths[self.live_start:])
+                    if offset != self.DEAD]
+
+    def get(self, item_id):
+        """Return the (payload, timestamp, item_id) tuple for an id, or None if it is gone."""
+        with self.lock:
+            position = self._position(item_id)
+            return self._record(position) if position is not None else None
+
+    def oldest_timestamp(self):
+        """Returns the timestamp of the oldest live item, or None if empty."""
+        with self.lock:
+            self._skip_dead()
+            return self.timestamps[self.live_start] if self.live_count else None
+
+    def memory_usage(self):
+        """Returns the compressed size of the live items."""
+        return self.live_bytes
+
+    def _kill(self, position):
+        self.slots[self.ids[position] - self.slot_base_id] = -1
+        self.offsets[position] = self.DEAD
+        self.live_count -= 1
+        self.live_bytes -= self.lengths[position]
+
+    def _skip_dead(self):
+        while self.live_start < len(self.ids) and self.offsets[self.live_start] == self.DEAD:
+            self.live_start += 1
+
+    def discard(self, item_id):
+        """Drop one item wherever it is in the history; returns False if it was already gone."""
+        with self.lock:
+            position = self._position(item_id)
+            if position is None:
+                return False
+            self._kill(position)
+            self._maybe_compact()
+            return True
+
+    def pop_oldest(self):
+        """Drop the oldest live item and return its id."""
+        with self.lock:
+            if not self.live_count:
+                return None
+            # _skip_dead and _kill inlined: this runs once per evicted item.
+            offsets, position = self.offsets, self.live_start
+            while offsets[position] == self.DEAD:
+                position += 1
+            item_id = self.ids[position]
+            self.slots[item_id - self.slot_base_id] = -1
+            offsets[position] = self.DEAD
+            self.live_count -= 1
+            self.live_bytes -= self.lengths[position]
+            self.live_start = position + 1
+            self._maybe_compact()
+            return item_id
+
+    def clear(self):
+        """Drop every item; ids keep counting up."""
+        with self.lock:
+            self.ids = array("Q")
+            self.timestamps = array("d")
+            self.offsets = array("q")
+            self.lengths = array("I")
+            self.arena = bytearray()
+            self.slots = array("i")
+            self.slot_base_id = self.next_id
+            self.live_start = 0
+            self.live_count = 0
+            self.live_bytes = 0
+
+    def _maybe_compact(self):
+        dead = len(self.ids) - self.live_count
+        wasted = len(self.arena) - self.live_bytes
+        if (dead >= COMPACT_MIN_DEAD and dead > self.live_count) or (
+                wasted >= COMPACT_MIN_BYTES and wasted > self.live_bytes):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the arrays and arena without dead slots, keeping ids and order.
+
+        The copying runs in C through itertools rather than per slot in Python.
+        """
+        with self.lock:
+            start = self.live_start
+            live = [offset != self.DEAD for offset in self.offsets[start:]]
+            ids = array("Q", compress(self.ids[start:], live))
+            timestamps = array("d", compress(self.timestamps[start:], live))
+            lengths = array("I", compress(self.lengths[start:], live))
+            old_offsets = list(compress(self.offsets[start:], live))
+            with memoryview(self.arena) as view:
+                arena = bytearray().join(map(view.__getitem__, map(slice, old_offsets, map(add, old_offsets, lengths))))
+            offsets = array("q", accumulate(lengths, initial=0))
+            offsets.pop()
+            self.ids, self.timestamps, self.offsets, self.lengths = ids, timestamps, offsets, lengths
+            self.arena = arena
+            self.live_start = 0
+            self.slot_base_id = ids[0] if ids else self.next_id
+            slots = array("i", [-1]) * (self.next_id - self.slot_base_id)
+            for position, item_id in enumerate(ids):
+                slots[item_id - self.slot_base_id] = position
+            self.slots = slots
@@ -1,5 +1,5 @@
-from pynput import keyboard
 import threading
+import time
 
 class HotkeyListener:
     def __init__(self, on_activate_callback):
@@ -7,12 +7,15 @@ class HotkeyListener:
         self.is_win_pressed = False
         
     def start(self):
+        from pynput import keyboard
+
         def on_press(key):
             try:
                 if key == keyboard.Key.cmd:
                     self.is_win_pressed = True
                 elif self.is_win_pressed and key.char == 'o':
-                    threading.Thread(target=self.on_activate_callback, daemon=True).start()
+                    pressed_at = time.perf_counter()
+                    threading.Thread(target=self.on_activate_callback, args=(pressed_at,), daemon=True).start()
             except AttributeError:
                 pass
 
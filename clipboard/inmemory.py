@@ -1,45 +1,836 @@
-from collections import deque
+from collections import Counter, OrderedDict, deque
 from typing import NamedTuple
+import codecs
+import hashlib
+import os
+import re
+import struct
+import threading
 import time
 import zlib
+from clipboard import metrics
+from clipboard.history import SlotHistory
+from clipboard.search import INDEX_MAX_CHARS, SearchIndex, index_grams
 
 class ClipboardItem(NamedTuple):
     content: str
     timestamp: float
+    item_id: int = 0
 
-clipboard_data = deque(maxlen=51)
+class EncodedText(NamedTuple):
+    record: bytes
+    raw_size: int
+    digest: bytes
+    head: str
+    blank: bool
+    truncated: bool
+
+clipboard_data = SlotHistory()
+MAX_ITEMS = 51
 MAX_MEMORY_USAGE = 50 * 1024 * 1024
+MAX_ITEM_AGE = None
+MAX_BLOB_MEMORY = 32 * 1024 * 1024
+MAX_ITEM_SIZE = 64 * 1024 * 1024
+OVERSIZE_POLICY = "truncate"
+LRU_ON_PASTE = True
+FINGERPRINT_CHUNK_CHARS = 1024 * 1024
+COMPRESSION_LEVEL = 6
+MIN_COMPRESS_SIZE = 64
+STREAM_THRESHOLD = 1024 * 1024
+STREAM_CHUNK_CHARS = 256 * 1024
+USE_DICTIONARY = True
+DICTIONARY_SIZE = 16 * 1024
+DICTIONARY_MAX_INPUT = 4096
+DICTIONARY_RETRAIN_EVERY = 1000
+DICTIONARY_SAMPLES = 256
+DICTIONARY_KEEP = 2
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_ZLIB_DICT = 2
+CODEC_BLOB = 3
+CODEC_BLOB_ZLIB = 4
+PRECOMPRESSED_MIMES = {"image/png", "image/jpeg", "image/gif", "image/webp"}
+DICT_VERSION = struct.Struct("<H")
+persistent_store = None
+_dictionaries = {}
+_dictionary_version = 0
+_dictionary_dir = None
+_dictionary_samples = deque(maxlen=DICTIONARY_SAMPLES)
+_adds_since_training = 0
+_training = False
+_lock = threading.RLock()
+_ids_by_digest = {}
+_digests_by_id = {}
+_blob_sizes = OrderedDict()
+_blob_memory = 0
+_stats = {"added": 0, "deduplicated": 0, "raw_bytes_added": 0, "stored_bytes_added": 0,
+          "evicted_count": 0, "evicted_bytes": 0, "evicted_age": 0, "evicted_blob": 0,
+          "truncated": 0, "skipped": 0}
+
+def _indexed_text(item_id: int):
+    # Only the first INDEX_MAX_CHARS characters are indexed, so only they are decompressed.
+    item = get_clipboard_item(item_id)
+    return get_decompressed_prefix(item, INDEX_MAX_CHARS * 4) if item is not None else None
+
+search_index = SearchIndex(get_text=_indexed_text)
+
+def configure_eviction(max_items=None, max_bytes=None, max_age=None, lru_on_paste=None, max_blob_bytes=None):
+    """Sets the eviction caps; `max_age` is in seconds and 0 disables the age cap."""
+    global MAX_ITEMS, MAX_MEMORY_USAGE, MAX_ITEM_AGE, LRU_ON_PASTE, MAX_BLOB_MEMORY
+    if max_items is not None:
+        MAX_ITEMS = max_items
+    if max_bytes is not None:
+        MAX_MEMORY_USAGE = max_bytes
+    if max_age is not None:
+        MAX_ITEM_AGE = max_age or None
+    if lru_on_paste is not None:
+        LRU_ON_PASTE = lru_on_paste
+    if max_blob_bytes is not None:
+        MAX_BLOB_MEMORY = max_blob_bytes
+    manage_memory()
+
+def configure_ingestion(max_item_size=None, oversize_policy=None):
+    """Sets the per-item size ceiling in bytes (0 for none) and whether larger text is "truncate"d or "skip"ped.
+
+    Binary items over the ceiling are always skipped.
+    """
+    global MAX_ITEM_SIZE, OVERSIZE_POLICY
+    if max_item_size is not None:
+        MAX_ITEM_SIZE = max_item_size
+    if oversize_policy is not None:
+        if oversize_policy not in ("truncate", "skip"):
+            raise ValueError(f"Unknown oversize policy: {oversize_policy}")
+        OVERSIZE_POLICY = oversize_policy
+
+def configure_compression(level=None, min_size=None, use_dictionary=None):
+    """Sets the zlib level, the size below which text is stored raw, and dictionary use."""
+    global COMPRESSION_LEVEL, MIN_COMPRESS_SIZE, USE_DICTIONARY
+    if level is not None:
+        COMPRESSION_LEVEL = level
+    if min_size is not None:
+        MIN_COMPRESS_SIZE = min_size
+    if use_dictionary is not None:
+        USE_DICTIONARY = use_dictionary
+
+def train_compression_dictionary(samples, size: int = DICTIONARY_SIZE) -> bytes:
+    """Builds a zlib preset dictionary from the substrings that recur across samples.
+
+    Tokens that appear in more than one sample are kept, most frequent last
+    so they sit closest to the data in zlib's window.
+    """
+    document_counts = Counter()
+    for text in samples:
+        document_counts.update(set(re.findall(r"\S{3,}\s?", text)))
+    pieces = []
+    total = 0
+    for token, seen in document_counts.most_common():
+        if seen < 2:
+            break
+        encoded = token.encode("utf-8", errors="ignore")
+        if total + len(encoded) > size:
+            continue
+        pieces.append(encoded)
+        total += len(encoded)
+    return b"".join(reversed(pieces))
+
+def install_compression_dictionary(zdict: bytes) -> int:
+    """Makes zdict the dictionary for new records and returns its version.
+
+    Older versions are kept while records still refer to them (see
+    _prune_dictionaries). With a persistent store the dictionary is also
+    written next to the history.
+    """
+    global _dictionary_version
+    with _lock:
+        version = max(_dictionaries, default=0) + 1
+        if _dictionary_dir is not None:
+            # Durable before any record can refer to it, or a crash could leave records nothing decodes.
+            from clipboard.persistent import sync_directory
+            path = os.path.join(_dictionary_dir, f"zdict.{version}")
+            with open(path + ".tmp", "wb") as f:
+                f.write(zdict)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            sync_directory(_dictionary_dir)
+        _dictionaries[version] = zdict
+        _dictionary_version = version
+        return version
+
+def _load_dictionaries(directory: str):
+    global _dictionary_version
+    _dictionaries.clear()
+    for name in os.listdir(directory):
+        prefix, _, version = name.partition(".")
+        if prefix == "zdict" and version.isdigit():
+            with open(os.path.join(directory, name), "rb") as f:
+                _dictionaries[int(version)] = f.read()
+    _dictionary_version = max(_dictionaries, default=0)
 
-def add_clipboard_item(content: str):
-    """Compresses and adds a text item to the clipboard."""
+def _retrain_dictionary():
+    global _training
     try:
-        compressed_content = zlib.compress(content.encode("utf-8", errors="ignore"))
-        clipboard_data.appendleft(ClipboardItem(compressed_content, time.monotonic()))
-        manage_memory()
+        with _lock:
+            samples = list(_dictionary_samples)
+        zdict = train_compression_dictionary(samples)
+        if zdict:
+            install_compression_dictionary(zdict)
+            _prune_dictionaries()
+    except Exception as e:
+        print(f"Error training compression dictionary: {e}")
+    finally:
+        _training = False
+
+def _prune_dictionaries():
+    """Drops the dictionary versions no live record uses, and their files.
+
+    The newest DICTIONARY_KEEP versions are always kept, since a text being
+    compressed right now may still be using one of them.
+    """
+    with _lock:
+        in_use = set(sorted(_dictionaries)[-DICTIONARY_KEEP:])
+        for head in _store().record_heads(1 + DICT_VERSION.size):
+            if head[0] == CODEC_ZLIB_DICT and len(head) > DICT_VERSION.size:
+                in_use.add(DICT_VERSION.unpack_from(head, 1)[0])
+        for version in [version for version in _dictionaries if version not in in_use]:
+            del _dictionaries[version]
+            if _dictionary_dir is not None:
+                try:
+                    os.remove(os.path.join(_dictionary_dir, f"zdict.{version}"))
+                except FileNotFoundError:
+                    pass
+
+def _collect_dictionary_sample(content: str):
+    """Keeps short texts for training and retrains in the background every so often."""
+    global _adds_since_training, _training
+    if not USE_DICTIONARY or len(content) > DICTIONARY_MAX_INPUT:
+        return
+    with _lock:
+        _dictionary_samples.append(content)
+        _adds_since_training += 1
+        if _training or _adds_since_training < DICTIONARY_RETRAIN_EVERY:
+            return
+        _adds_since_training = 0
+        _training = True
+    threading.Thread(target=_retrain_dictionary, daemon=True).start()
+
+def text_chunks(content: str):
+    """Yields the text in STREAM_CHUNK_CHARS slices."""
+    for start in range(0, len(content), STREAM_CHUNK_CHARS):
+        yield content[start:start + STREAM_CHUNK_CHARS]
+
+def encode_text_stream(chunks, max_size=None):
+    """Fingerprints and compresses text arriving in chunks; returns an EncodedText or None.
+
+    The whole text is never held: once more than STREAM_THRESHOLD bytes have
+    arrived they are fed to a zlib stream, and only a bounded head is kept for
+    the search index. Shorter texts get the small-item codecs of compress_text.
+    Text past `max_size` encoded bytes (MAX_ITEM_SIZE by default, 0 for no
+    limit) is cut off, or None is returned under the "skip" policy.
+    The digest equals content_fingerprint of the stored text.
+    """
+    max_size = MAX_ITEM_SIZE if max_size is None else max_size
+    digest = hashlib.blake2b(digest_size=16)
+    buffered = bytearray()
+    compressor = None
+    parts = []
+    head = []
+    head_chars = chars = raw_size = 0
+    blank = True
+    truncated = False
+    for chunk in chunks:
+        encoded = chunk.encode("utf-8", errors="surrogatepass")
+        if max_size and raw_size + len(encoded) > max_size:
+            if OVERSIZE_POLICY == "skip":
+                return None
+            encoded = encoded[:max_size - raw_size]
+            chunk = encoded.decode("utf-8", errors="ignore")
+            encoded = chunk.encode("utf-8", errors="surrogatepass")
+            truncated = True
+        chars += len(chunk)
+        raw_size += len(encoded)
+        digest.update(encoded)
+        blank = blank and (not chunk or chunk.isspace())
+        if head_chars < INDEX_MAX_CHARS:
+            head.append(chunk[:INDEX_MAX_CHARS - head_chars])
+            head_chars += len(head[-1])
+        if compressor is not None:
+            parts.append(compressor.compress(encoded))
+        else:
+            buffered += encoded
+            if len(buffered) > STREAM_THRESHOLD:
+                compressor = zlib.compressobj(COMPRESSION_LEVEL)
+                parts = [bytes((CODEC_ZLIB,)), compressor.compress(buffered)]
+                buffered = None
+        if truncated:
+            break
+    digest.update(chars.to_bytes(8, "little"))
+
+    if compressor is not None:
+        parts.append(compressor.flush())
+        record = b"".join(parts)
+    else:
+        record = _compress_small(bytes(buffered))
+    return EncodedText(record, raw_size, digest.digest(), "".join(head), blank, truncated)
+
+def compress_text(content: str):
+    """Encodes text into a stored record and returns (record, raw_size).
+
+    Records start with a codec byte: raw UTF-8 below MIN_COMPRESS_SIZE or when
+    compression does not help, plain zlib, or zlib with a versioned preset
+    dictionary for short texts. Texts above STREAM_THRESHOLD are encoded and
+    compressed in chunks so no full encoded copy is held.
+    """
+    encoded = encode_text_stream(text_chunks(content), max_size=0)
+    return encoded.record, encoded.raw_size
+
+def _compress_small(raw_content: bytes) -> bytes:
+    if len(raw_content) < MIN_COMPRESS_SIZE:
+        return bytes((CODEC_RAW,)) + raw_content
+
+    version = _dictionary_version if USE_DICTIONARY and len(raw_content) <= DICTIONARY_MAX_INPUT else 0
+    if version:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=_dictionaries[version])
+        record = bytes((CODEC_ZLIB_DICT,)) + DICT_VERSION.pack(version) + compressor.compress(raw_content) + compressor.flush()
+    else:
+        record = bytes((CODEC_ZLIB,)) + zlib.compress(raw_content, COMPRESSION_LEVEL)
+    if len(record) > len(raw_content):
+        return bytes((CODEC_RAW,)) + raw_content
+    return record
+
+def decompress_record(record: bytes, max_bytes: int = 0) -> bytes:
+    """Decodes a stored record, or only its first `max_bytes` bytes when given.
+
+    Records written before codec bytes were added are bare zlib streams.
+    """
+    if record[0] == CODEC_RAW:
+        return record[1:1 + max_bytes] if max_bytes else record[1:]
+    decompressor, payload = _decompressor(record)
+    return decompressor.decompress(payload, max_bytes)
+
+def _decompressor(record: bytes):
+    """Returns a zlib decompressobj for a compressed text record and the payload to feed it."""
+    codec = record[0]
+    if codec == CODEC_ZLIB:
+        return zlib.decompressobj(), memoryview(record)[1:]
+    if codec == CODEC_ZLIB_DICT:
+        version = DICT_VERSION.unpack_from(record, 1)[0]
+        return zlib.decompressobj(zdict=_dictionaries[version]), memoryview(record)[1 + DICT_VERSION.size:]
+    return zlib.decompressobj(), record
+
+def _stored_text_chunks(record: bytes, chunk_size: int):
+    """Yields the UTF-8 bytes of a stored text record, at most `chunk_size` at a time."""
+    if record[0] == CODEC_RAW:
+        with memoryview(record) as view:
+            for start in range(1, len(record), chunk_size):
+                yield view[start:start + chunk_size].tobytes()
+        return
+    decompressor, payload = _decompressor(record)
+    while payload:
+        chunk = decompressor.decompress(payload, chunk_size)
+        payload = decompressor.unconsumed_tail
+        if chunk:
+            yield chunk
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+def encode_blob(data: bytes, mime: str):
+    """Encodes binary content into a stored record and returns (record, raw_size).
+
+    The record is a codec byte, the MIME type prefixed with its length and
+    the data, zlib-compressed unless the format is already compressed.
+    """
+    header = mime.encode("ascii", errors="ignore")[:255]
+    header = bytes((len(header),)) + header
+    if mime not in PRECOMPRESSED_MIMES and len(data) >= MIN_COMPRESS_SIZE:
+        compressed = zlib.compress(data, COMPRESSION_LEVEL)
+        if len(compressed) < len(data):
+            return bytes((CODEC_BLOB_ZLIB,)) + header + compressed, len(data)
+    return bytes((CODEC_BLOB,)) + header + data, len(data)
+
+def enable_persistent_store(directory: str, max_items: int = 50000):
+    """Keeps clipboard history on disk in `directory` instead of the in-memory history.
+
+    The history in use before, in memory or in another directory, is
+    dropped with its digests, blob sizes and dictionaries: ids start over in
+    each store, so entries left over could alias items of this one.
+    """
+    global persistent_store, _dictionary_dir
+    from clipboard.persistent import PersistentClipboardStore
+    with _lock:
+        disable_persistent_store()
+        persistent_store = PersistentClipboardStore(directory, max_items=max_items, on_evict=_on_store_evict)
+        _dictionary_dir = directory
+        _load_dictionaries(directory)
+        _load_digests(persistent_store)
+    _prune_dictionaries()
+    threading.Thread(target=_rebuild_search_index, args=(persistent_store, persistent_store.item_ids()),
+                     daemon=True).start()
+    return persistent_store
+
+def disable_persistent_store():
+    """Closes the on-disk history and goes back to an empty in-memory one."""
+    global persistent_store, _dictionary_dir
+    with _lock:
+        store, persistent_store = persistent_store, None
+        _dictionary_dir = None
+        clear_clipboard()
+        if store is not None:
+            store.close()
+
+def _on_store_evict(item_id: int):
+    _stats["evicted_count"] += 1
+    _forget_item(item_id)
+
+def _forget_item(item_id: int):
+    """Drops an evicted item from the digest map, the blob budget and the search index."""
+    global _blob_memory
+    _blob_memory -= _blob_sizes.pop(item_id, 0)
+    digest = _digests_by_id.pop(item_id, None)
+    if digest is not None and _ids_by_digest.get(digest) == item_id:
+        del _ids_by_digest[digest]
+    search_index.remove(item_id)
+
+def _load_digests(store):
+    """Fills the digest maps from the digests kept in the history index, without reading any record.
+
+    Of duplicates written by older versions only the newest copy is kept.
+    Records written without a digest are fingerprinted by _rebuild_search_index.
+    """
+    from clipboard.persistent import NO_DIGEST
+    for item_id, digest in store.digests():
+        if digest == NO_DIGEST:
+            continue
+        older = _ids_by_digest.get(digest)
+        if older is not None:
+            store.discard(older)
+            del _digests_by_id[older]
+        _ids_by_digest[digest] = item_id
+        _digests_by_id[item_id] = digest
+
+def _rebuild_search_index(store, item_ids):
+    """Indexes the history loaded from disk without holding up startup.
+
+    `item_ids` are the ids present at startup, newest first. Only the head
+    of each text that the index covers is decompressed, except for records
+    written before digests were stored, which are fingerprinted in full once
+    and get their digest stored. Items are indexed oldest first into a
+    separate index that is merged in behind the items captured meanwhile,
+    whose digest mappings are newer and are kept; an old record whose
+    content was captured again is discarded.
+    """
+    rebuilt = SearchIndex()
+    digests = {}
+    for item_id in reversed(item_ids):
+        with _lock:
+            if store is not persistent_store:
+                return
+            record = store.get(item_id)
+            known = item_id in _digests_by_id
+        if record is None:
+            continue
+        item = ClipboardItem(*record)
+        try:
+            if is_binary_item(item):
+                if not known:
+                    digests[item_id] = binary_fingerprint(get_item_data(item), get_item_mime(item))
+            elif known:
+                rebuilt.add(item_id, get_decompressed_prefix(item, INDEX_MAX_CHARS * 4))
+            else:
+                digests[item_id], head = _stored_text_fingerprint(item.content)
+                rebuilt.add(item_id, head)
+        except Exception as e:
+            print(f"Error indexing clipboard item {item_id}: {e}")
+
+    with _lock:
+        if store is not persistent_store:
+            return
+        for item_id in list(rebuilt.item_grams):
+            if item_id not in store:
+                rebuilt.remove(item_id)
+        for item_id, digest in digests.items():
+            newest = _ids_by_digest.get(digest, -1)
+            if newest > item_id:
+                # Captured again while this ran, before the digest was known.
+                store.discard(item_id)
+            if newest > item_id or item_id not in store:
+                rebuilt.remove(item_id)
+                continue
+            if newest >= 0:
+                # Duplicates written by older versions: keep the newest copy only.
+                store.discard(newest)
+                del _digests_by_id[newest]
+                rebuilt.remove(newest)
+            _ids_by_digest[digest] = item_id
+            _digests_by_id[item_id] = digest
+            store.set_digest(item_id, digest)
+        search_index.merge_older(rebuilt)
+
+def _stored_text_fingerprint(record: bytes):
+    """Returns content_fingerprint of a stored text and its first INDEX_MAX_CHARS characters.
+
+    Only needed for records written before their digest was stored with them.
+
+    The record is decompressed in chunks of the index head's size, so texts
+    that fit in the head are decoded once and longer ones are hashed without
+    ever holding all of their text.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="surrogatepass")
+    head = []
+    head_chars = chars = 0
+    for chunk in _stored_text_chunks(record, INDEX_MAX_CHARS * 4):
+        digest.update(chunk)
+        text = decoder.decode(chunk)
+        chars += len(text)
+        if head_chars < INDEX_MAX_CHARS:
+            head.append(text[:INDEX_MAX_CHARS - head_chars])
+            head_chars += len(head[-1])
+    chars += len(decoder.decode(b"", final=True))
+    digest.update(chars.to_bytes(8, "little"))
+    return digest.digest(), "".join(head)
+
+def content_fingerprint(content: str) -> bytes:
+    """Returns a short digest of the text, hashed in chunks to avoid a full encoded copy.
+
+    The length goes in last so that encode_text_stream can produce the same
+    digest without knowing it up front.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for start in range(0, len(content), FINGERPRINT_CHUNK_CHARS):
+        digest.update(content[start:start + FINGERPRINT_CHUNK_CHARS].encode("utf-8", errors="surrogatepass"))
+    digest.update(len(content).to_bytes(8, "little"))
+    return digest.digest()
+
+def stream_fingerprint(chunks) -> bytes:
+    """Returns content_fingerprint of text arriving as an iterable of str chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    chars = 0
+    for chunk in chunks:
+        digest.update(chunk.encode("utf-8", errors="surrogatepass"))
+        chars += len(chunk)
+    digest.update(chars.to_bytes(8, "little"))
+    return digest.digest()
+
+def binary_fingerprint(data: bytes, mime: str) -> bytes:
+    """Returns a short digest of binary content and its MIME type."""
+    digest = hashlib.blake2b(digest_size=16, person=b"clipboard-blob")
+    digest.update(mime.encode("ascii", errors="ignore") + b"\0")
+    digest.update(data)
+    return digest.digest()
+
+def add_clipboard_item(content: str, fingerprint: bytes = None):
+    """Compresses and adds a text item to the clipboard.
+
+    Items are keyed by content digest: copying text that is already in the
+    history moves that entry to the top with a fresh timestamp instead of
+    compressing and storing it again. `fingerprint` may be passed when the
+    caller already has content_fingerprint(content).
+    """
+    try:
+        # Every character is at least one byte, so this catches most oversized text unhashed.
+        if OVERSIZE_POLICY == "skip" and MAX_ITEM_SIZE and len(content) > MAX_ITEM_SIZE:
+            _skip_oversized("text")
+            return
+        digest = fingerprint or content_fingerprint(content)
+        with _lock:
+            if _move_existing_to_top(digest):
+                manage_memory()
+                return
+
+        started = time.perf_counter() if metrics.enabled else None
+        encoded = encode_text_stream(text_chunks(content))
+        if started is not None:
+            metrics.COMPRESS.observe(time.perf_counter() - started)
+        if encoded is None:
+            _skip_oversized("text")
+            return
+        _store_encoded_text(digest, encoded)
+    except Exception as e:
+        print(f"Error compressing clipboard text: {e}")
+
+def add_clipboard_stream(chunks) -> bool:
+    """Adds text that arrives as an iterable of str chunks without ever holding all of it.
+
+    Returns False if nothing was stored because the text was empty, blank or
+    skipped for being over MAX_ITEM_SIZE.
+    """
+    try:
+        started = time.perf_counter() if metrics.enabled else None
+        encoded = encode_text_stream(chunks)
+        if started is not None:
+            metrics.COMPRESS.observe(time.perf_counter() - started)
+        if encoded is None:
+            _skip_oversized("text")
+            return False
+        if encoded.blank:
+            return False
+        _store_encoded_text(encoded.digest, encoded)
+        return True
     except Exception as e:
         print(f"Error compressing clipboard text: {e}")
+        return False
+
+def _store_encoded_text(digest: bytes, encoded: EncodedText):
+    grams = index_grams(encoded.head)
+    with _lock:
+        if _move_existing_to_top(digest):
+            manage_memory()
+            return
+        item_id = _insert_record(digest, encoded.record, encoded.raw_size)
+        if encoded.truncated:
+            _stats["truncated"] += 1
+        # Under the lock, so an eviction or move of this id cannot run before it is indexed.
+        search_index.add_grams(item_id, grams)
+    if not encoded.truncated and encoded.raw_size <= DICTIONARY_MAX_INPUT:
+        _collect_dictionary_sample(encoded.head)
+    manage_memory()
+
+def _skip_oversized(kind: str):
+    _stats["skipped"] += 1
+    print(f"Skipping {kind} clipboard item larger than {MAX_ITEM_SIZE} bytes")
+
+def add_clipboard_blob(data: bytes, mime: str, fingerprint: bytes = None):
+    """Adds binary content such as an image to the clipboard.
+
+    Blobs are deduplicated like text but are not searchable. In memory they
+    also count against MAX_BLOB_MEMORY with their stored (encoded) size, and
+    a blob whose record is larger than that budget is not stored at all.
+    """
+    global _blob_memory
+    try:
+        if MAX_ITEM_SIZE and len(data) > MAX_ITEM_SIZE:
+            _skip_oversized(mime)
+            return
+        digest = fingerprint or binary_fingerprint(data, mime)
+        with _lock:
+            if _move_existing_to_top(digest):
+                manage_memory()
+                return
+
+        started = time.perf_counter() if metrics.enabled else None
+        record, raw_size = encode_blob(data, mime)
+        if started is not None:
+            metrics.COMPRESS.observe(time.perf_counter() - started)
+        if persistent_store is None and len(record) > MAX_BLOB_MEMORY:
+            print(f"Skipping {mime} clipboard item of {len(record)} bytes: larger than the blob budget")
+            return
+        with _lock:
+            if _move_existing_to_top(digest):
+                manage_memory()
+                return
+            item_id = _insert_record(digest, record, raw_size)
+            if persistent_store is None:
+                _blob_sizes[item_id] = len(record)
+                _blob_memory += len(record)
+        manage_memory()
+    except Exception as e:
+        print(f"Error storing binary clipboard item: {e}")
+
+def _insert_record(digest: bytes, record: bytes, raw_size: int) -> int:
+    if persistent_store is not None:
+        item_id = persistent_store.append(record, time.time(), digest)
+    else:
+        item_id = clipboard_data.append(record, time.time())
+    _ids_by_digest[digest] = item_id
+    _digests_by_id[item_id] = digest
+    _stats["added"] += 1
+    _stats["raw_bytes_added"] += raw_size
+    _stats["stored_bytes_added"] += len(record)
+    if metrics.enabled:
+        metrics.COMPRESSION_RATIO.observe(raw_size / len(record))
+    return item_id
+
+def _move_existing_to_top(digest: bytes) -> bool:
+    """Refreshes the entry holding this content; returns False if there is none.
+
+    The append-only persistent store re-appends the stored payload so the
+    text is not compressed again, and tombstones the old record.
+    """
+    item_id = _ids_by_digest.get(digest)
+    if item_id is None:
+        return False
+    if persistent_store is not None:
+        record = persistent_store.get(item_id)
+        if record is None:
+            return False
+        # Discard first so the append cannot evict the record it supersedes.
+        persistent_store.discard(item_id)
+        new_id = persistent_store.append(record[0], time.time(), digest)
+        del _digests_by_id[item_id]
+        _ids_by_digest[digest] = new_id
+        _digests_by_id[new_id] = digest
+        if item_id in search_index or record[0][0] in (CODEC_BLOB, CODEC_BLOB_ZLIB):
+            search_index.move(item_id, new_id)
+        else:
+            # Not reached by the startup rebuild yet, which skips the discarded old id.
+            search_index.add(new_id, get_decompressed_prefix(ClipboardItem(*record), INDEX_MAX_CHARS * 4))
+    elif _move_to_top(item_id) is None:
+        return False
+    _stats["deduplicated"] += 1
+    return True
+
+def _move_to_top(item_id: int):
+    """Re-files an in-memory item as the newest under a new id and returns that id."""
+    new_id = clipboard_data.move_to_top(item_id, time.time())
+    if new_id is not None:
+        digest = _digests_by_id.pop(item_id)
+        _ids_by_digest[digest] = new_id
+        _digests_by_id[new_id] = digest
+        if item_id in _blob_sizes:
+            _blob_sizes[new_id] = _blob_sizes.pop(item_id)
+        search_index.move(item_id, new_id)
+    return new_id
+
+def _store():
+    return persistent_store if persistent_store is not None else clipboard_data
+
+def is_binary_item(item: ClipboardItem) -> bool:
+    """Returns True for images and other non-text items."""
+    return item.content[0] in (CODEC_BLOB, CODEC_BLOB_ZLIB)
+
+def get_item_mime(item: ClipboardItem) -> str:
+    """Returns the MIME type of an item; text items are text/plain."""
+    if not is_binary_item(item):
+        return "text/plain"
+    return item.content[2:2 + item.content[1]].decode("ascii")
+
+def get_item_data(item: ClipboardItem) -> bytes:
+    """Returns the raw bytes of an item: the binary data, or the text as UTF-8."""
+    if not is_binary_item(item):
+        return decompress_record(item.content)
+    data = memoryview(item.content)[2 + item.content[1]:]
+    return zlib.decompress(data) if item.content[0] == CODEC_BLOB_ZLIB else bytes(data)
 
 def get_decompressed_text(item: ClipboardItem) -> str:
     """Decompresses and returns text, or empty string if it's an image."""
+    if is_binary_item(item):
+        return ""
     try:
-        return zlib.decompress(item.content).decode("utf-8", errors="ignore")
+        started = time.perf_counter() if metrics.enabled else None
+        text = decompress_record(item.content).decode("utf-8", errors="ignore")
+        if started is not None:
+            metrics.DECOMPRESS.observe(time.perf_counter() - started)
+        return text
     except Exception as e:
         print(f"Error decompressing text: {e}")
         return ""
     
-def get_clipboard_items():
-    """Returns all clipboard items."""
-    return list(clipboard_data)
+def get_decompressed_prefix(item: ClipboardItem, max_bytes: int) -> str:
+    """Decompresses only the first `max_bytes` bytes of an item's text."""
+    if is_binary_item(item):
+        return ""
+    try:
+        return decompress_record(item.content, max_bytes).decode("utf-8", errors="ignore")
+    except Exception as e:
+        print(f"Error decompressing text: {e}")
+        return ""
+
+def get_clipboard_items(limit=None):
+    """Returns clipboard items, newest first, optionally only the first `limit`."""
+    with _lock:
+        return [ClipboardItem(*record) for record in _store().items(limit)]
+
+def get_clipboard_item_ids(limit=None):
+    """Returns the ids of the clipboard items, newest first, without copying their contents."""
+    with _lock:
+        return _store().item_ids(limit)
+
+def get_clipboard_item(item_id: int):
+    """Returns the clipboard item with the given id, or None if it was evicted."""
+    with _lock:
+        record = _store().get(item_id)
+        return ClipboardItem(*record) if record is not None else None
+
+def mark_clipboard_item_used(item_id: int):
+    """Moves a pasted item to the top so LRU eviction treats it as recently used.
+
+    Returns the item's new id, or None if it stayed where it was. Items in the
+    append-only persistent store keep their position.
+    """
+    with _lock:
+        if not LRU_ON_PASTE or persistent_store is not None:
+            return None
+        return _move_to_top(item_id)
+
+def search_clipboard_items(query: str, mode: str = "substring", limit: int = 20):
+    """Returns clipboard items matching the query, best match first."""
+    items = (get_clipboard_item(item_id) for item_id in search_index.search(query, mode, limit))
+    return [item for item in items if item is not None]
 
 def clear_clipboard():
     """Clears all clipboard items."""
-    clipboard_data.clear()
+    global _blob_memory
+    with _lock:
+        if persistent_store is not None:
+            persistent_store.clear()
+        clipboard_data.clear()
+        _blob_sizes.clear()
+        _blob_memory = 0
+        _ids_by_digest.clear()
+        _digests_by_id.clear()
+        search_index.clear()
 
 def get_clipboard_memory_usage():
     """Returns total memory used by clipboard items."""
-    return sum(len(item.content) for item in clipboard_data)
+    return _store().memory_usage()
+
+def get_clipboard_stats():
+    """Returns counters for sizing the eviction budgets."""
+    with _lock:
+        stats = dict(_stats)
+        stats["items"] = len(_store())
+        stats["bytes"] = get_clipboard_memory_usage()
+        stats["blob_items"] = len(_blob_sizes)
+        stats["blob_bytes"] = _blob_memory
+        stats["evictions"] = (stats["evicted_count"] + stats["evicted_bytes"] + stats["evicted_age"]
+                              + stats["evicted_blob"])
+        stats["compression_ratio"] = (stats["raw_bytes_added"] / stats["stored_bytes_added"]
+                                      if stats["stored_bytes_added"] else None)
+        return stats
+
+def _pop_oldest():
+    """Evicts the least recently used item and returns its id."""
+    return _store().pop_oldest()
+
+def _oldest_timestamp():
+    return _store().oldest_timestamp()
 
 def manage_memory():
-    """Removes the oldest clipboard items if memory limit is exceeded."""
-    while get_clipboard_memory_usage() > MAX_MEMORY_USAGE and clipboard_data:
-        clipboard_data.pop()
\ No newline at end of file
+    """Removes the least recently used items while any eviction cap is exceeded.
+
+    Blobs over MAX_BLOB_MEMORY are evicted oldest first before the other caps
+    apply, so a few screenshots do not push out many text items.
+    """
+    started = time.perf_counter() if metrics.enabled else None
+    with _lock:
+        removed = []
+        evicted_blobs = 0
+        while _blob_memory > MAX_BLOB_MEMORY:
+            # Forgotten right away, since that is what frees the blob budget this loop waits on.
+            item_id = next(iter(_blob_sizes))
+            clipboard_data.discard(item_id)
+            _forget_item(item_id)
+            evicted_blobs += 1
+            _stats["evicted_blob"] += 1
+        while get_clipboard_memory_usage() > MAX_MEMORY_USAGE and _history_length():
+            removed.append(_pop_oldest())
+            _stats["evicted_bytes"] += 1
+        while persistent_store is None and len(clipboard_data) > MAX_ITEMS:
+            removed.append(_pop_oldest())
+            _stats["evicted_count"] += 1
+        if MAX_ITEM_AGE is not None:
+            expiry = time.time() - MAX_ITEM_AGE
+            while _history_length() and _oldest_timestamp() < expiry:
+                removed.append(_pop_oldest())
+                _stats["evicted_age"] += 1
+        for item_id in removed:
+            _forget_item(item_id)
+    if started is not None:
+        metrics.MANAGE_MEMORY.observe(time.perf_counter() - started)
+        if removed or evicted_blobs:
+            metrics.EVICTIONS.observe(len(removed) + evicted_blobs)
+
+def _history_length():
+    return len(_store())
@@ -1,11 +1,518 @@
-import pyperclip
+import codecs
+import ctypes
+import ctypes.util
+import hashlib
+import io
+import os
+import select
+import shutil
+import subprocess
+import sys
+import threading
 import time
-from clipboard.inmemory import add_clipboard_item
+from typing import NamedTuple
+import pyperclip
+from clipboard import metrics
+from clipboard.inmemory import (add_clipboard_blob, add_clipboard_item, add_clipboard_stream, binary_fingerprint,
+                                content_fingerprint, stream_fingerprint)
+
+BINARY_TARGETS = ("image/png", "image/jpeg", "image/webp", "image/gif", "image/bmp", "image/tiff")
+PASTE_TIMEOUT = 2.0
+SELF_WRITE_WINDOW = 1.0
+STREAM_READ_BYTES = 1024 * 1024
+
+
+class BinaryContent(NamedTuple):
+    mime: str
+    data: bytes
+
+
+class StreamedText(NamedTuple):
+    """Clipboard text that is read in chunks when `read()` is called instead of all at once."""
+    read: object
+
+
+def _clipboard_command(action, target=None):
+    """Returns the wl-clipboard or xclip command line for reading targets or reading/writing data."""
+    if os.environ.get("WAYLAND_DISPLAY") and shutil.which("wl-paste"):
+        if action == "targets":
+            return ["wl-paste", "--list-types"]
+        if action == "text":
+            return ["wl-paste", "--no-newline", "--type", "text"]
+        if action == "read":
+            return ["wl-paste", "--no-newline", "--type", target]
+        return ["wl-copy", "--type", target]
+    if os.environ.get("DISPLAY") and shutil.which("xclip"):
+        if action == "targets":
+            return ["xclip", "-selection", "clipboard", "-t", "TARGETS", "-o"]
+        if action == "text":
+            return ["xclip", "-selection", "clipboard", "-t", "UTF8_STRING", "-o"]
+        if action == "read":
+            return ["xclip", "-selection", "clipboard", "-t", target, "-o"]
+        return ["xclip", "-selection", "clipboard", "-t", target, "-i"]
+    return None
+
+
+_last_grab = None
+
+
+def paste_binary():
+    """Return the clipboard's image content as BinaryContent, or None if it holds none.
+
+    Linux asks wl-paste or xclip for the first offered target in
+    BINARY_TARGETS. Elsewhere Pillow's ImageGrab is used and the image is
+    stored as PNG; the PNG is only encoded again when the grabbed pixels change.
+    """
+    global _last_grab
+    try:
+        if sys.platform.startswith("linux"):
+            command = _clipboard_command("targets")
+            if command is None:
+                return None
+            offered = subprocess.run(command, capture_output=True, timeout=PASTE_TIMEOUT).stdout.decode(errors="ignore").split()
+            target = next((target for target in BINARY_TARGETS if target in offered), None)
+            if target is None:
+                return None
+            data = subprocess.run(_clipboard_command("read", target), capture_output=True, timeout=PASTE_TIMEOUT).stdout
+            return BinaryContent(target, data) if data else None
+
+        from PIL import Image, ImageGrab
+        image = ImageGrab.grabclipboard()
+        if not isinstance(image, Image.Image):
+            return None
+        digest = hashlib.blake2b(image.tobytes(), digest_size=16)
+        digest.update(f"{image.mode} {image.size}".encode())
+        if _last_grab is not None and _last_grab[0] == digest.digest():
+            return _last_grab[1]
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        _last_grab = (digest.digest(), BinaryContent("image/png", buffer.getvalue()))
+        return _last_grab[1]
+    except Exception as e:
+        print(f"Error reading binary clipboard content: {e}")
+        return None
+
+
+def native_change_counter():
+    """Return a function reading the platform's clipboard change counter, or None without one.
+
+    Windows has GetClipboardSequenceNumber and macOS NSPasteboard's
+    changeCount. Both are cheap reads that change whenever the clipboard does,
+    so a poll can skip reading content that has not changed.
+    """
+    try:
+        if sys.platform == "win32":
+            sequence_number = ctypes.windll.user32.GetClipboardSequenceNumber
+            sequence_number.restype = ctypes.c_uint32
+            sequence_number.argtypes = []
+            return sequence_number
+        if sys.platform == "darwin":
+            objc = ctypes.CDLL(ctypes.util.find_library("objc"))
+            ctypes.CDLL(ctypes.util.find_library("AppKit"))
+            objc.objc_getClass.restype = ctypes.c_void_p
+            objc.objc_getClass.argtypes = [ctypes.c_char_p]
+            objc.sel_registerName.restype = ctypes.c_void_p
+            objc.sel_registerName.argtypes = [ctypes.c_char_p]
+            send_for_object = ctypes.CFUNCTYPE(ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p)(
+                ("objc_msgSend", objc))
+            send_for_integer = ctypes.CFUNCTYPE(ctypes.c_long, ctypes.c_void_p, ctypes.c_void_p)(
+                ("objc_msgSend", objc))
+            pasteboard = send_for_object(objc.objc_getClass(b"NSPasteboard"), objc.sel_registerName(b"generalPasteboard"))
+            if not pasteboard:
+                return None
+            change_count = objc.sel_registerName(b"changeCount")
+            return lambda: send_for_integer(pasteboard, change_count)
+    except Exception as e:
+        print(f"Clipboard change counter unavailable: {e}")
+    return None
+
+
+def stream_text(chunk_size=STREAM_READ_BYTES):
+    """Yield the clipboard text in decoded chunks as wl-paste or xclip writes it.
+
+    Nothing is yielded if the clipboard holds no text.
+    """
+    process = subprocess.Popen(_clipboard_command("text"), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    try:
+        while chunk := process.stdout.read(chunk_size):
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+
+def can_copy_binary():
+    """Return True if copy_binary has wl-copy or xclip to write with."""
+    return _clipboard_command("write", BINARY_TARGETS[0]) is not None
+
+
+def copy_binary(mime, data):
+    """Put binary content on the clipboard; only supported through wl-copy or xclip."""
+    command = _clipboard_command("write", mime)
+    if command is None:
+        raise OSError(f"Cannot copy {mime} to the clipboard on this platform")
+    # xclip and wl-copy fork a child to serve the selection; the launched process
+    # exits once it has handed over, so a paste can follow as soon as it returns.
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    process.communicate(data, timeout=PASTE_TIMEOUT)
+
+
+def copy_text(text):
+    """Put text on the clipboard through pyperclip's native backend, without a Tk round trip."""
+    pyperclip.copy(text)
+
+
+_self_writes = []
+_self_writes_lock = threading.Lock()
+
+
+def tag_self_write(content):
+    """Record that the app is about to put `content` on the clipboard, so the monitor skips it.
+
+    Tags expire after SELF_WRITE_WINDOW seconds in case the change is never seen.
+    Returns the tag for untag_self_write.
+    """
+    tag = (change_token(content), time.monotonic() + SELF_WRITE_WINDOW)
+    with _self_writes_lock:
+        _self_writes.append(tag)
+    return tag
+
+
+def untag_self_write(tag):
+    """Withdraw a tag whose write failed, so it cannot hide a later copy of the same content."""
+    with _self_writes_lock:
+        if tag in _self_writes:
+            _self_writes.remove(tag)
+
+
+def _is_self_write(content, token):
+    """Consume the tag matching a change, if the app wrote it.
+
+    Streamed text is read once just to fingerprint it. That only happens
+    while a tag is live, i.e. right after the app wrote to the clipboard.
+    """
+    if isinstance(content, StreamedText):
+        fingerprint = stream_fingerprint(content.read())
+    else:
+        fingerprint = token if isinstance(token, bytes) else change_token(content)
+    now = time.monotonic()
+    with _self_writes_lock:
+        _self_writes[:] = [tag for tag in _self_writes if tag[1] >= now]
+        for index, (tagged, _) in enumerate(_self_writes):
+            if tagged == fingerprint:
+                del _self_writes[index]
+                return True
+    return False
+
+
+def change_token(content):
+    """Return the fingerprint used to tell one clipboard content from another."""
+    if isinstance(content, BinaryContent):
+        return binary_fingerprint(content.data, content.mime)
+    if isinstance(content, StreamedText):
+        # A stream can only be fingerprinted by reading it; deduplication catches repeats.
+        return object()
+    return content_fingerprint(content)
+
+
+def _is_blank(content):
+    if isinstance(content, BinaryContent):
+        return not content.data
+    if isinstance(content, StreamedText):
+        return False
+    return not content or content.isspace()
+
+
+class PollingChangeSource:
+    """Polls the clipboard, backing off while its content stays the same.
+
+    When the clipboard holds no text, `paste_binary` is asked for image content.
+    With a `change_count` function (see native_change_counter) the content is
+    only read once the counter moves.
+    """
+
+    def __init__(self, paste=None, paste_binary=None, min_interval=0.1, max_interval=2.0, backoff=1.5,
+                 change_count=None):
+        self.paste = paste or pyperclip.paste
+        self.paste_binary = paste_binary
+        self.change_count = change_count
+        self.last_count = None
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self.wakeups = 0
+        self.last_token = None
+
+    def wait_for_change(self):
+        """Block until the clipboard content changes and return it."""
+        while True:
+            self.wakeups += 1
+            started = time.perf_counter() if metrics.enabled else None
+            content = None
+            # A counter of 0 means it could not be read, e.g. without clipboard access.
+            count = self.change_count() if self.change_count is not None else None
+            if not count or count != self.last_count:
+                self.last_count = count
+                try:
+                    content = self.paste()
+                except Exception as e:
+                    print(f"Error reading clipboard: {e}")
+                if content == "" and self.paste_binary is not None:
+                    content = self.paste_binary() or content
+            if started is not None:
+                metrics.POLL.observe(time.perf_counter() - started)
+            if content is not None:
+                token = change_token(content)
+                if token != self.last_token:
+                    self.last_token = token
+                    self.interval = self.min_interval
+                    return content
+            time.sleep(self.interval)
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+
+    def close(self):
+        """Nothing to release for the poller."""
+
+
+class _XFixesSelectionNotifyEvent(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("serial", ctypes.c_ulong),
+        ("send_event", ctypes.c_int),
+        ("display", ctypes.c_void_p),
+        ("window", ctypes.c_ulong),
+        ("subtype", ctypes.c_int),
+        ("owner", ctypes.c_ulong),
+        ("selection", ctypes.c_ulong),
+        ("timestamp", ctypes.c_ulong),
+        ("selection_timestamp", ctypes.c_ulong),
+    ]
+
+
+class _XEvent(ctypes.Union):
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("xfixes_selection", _XFixesSelectionNotifyEvent),
+        ("pad", ctypes.c_long * 24),
+    ]
+
+
+class XFixesChangeSource:
+    """Blocks on X11 XFixes selection-owner notifications instead of polling.
+
+    With `paste_stream`, changes are returned as StreamedText so that large
+    selections are never read into one string.
+    """
+
+    SET_SELECTION_OWNER_NOTIFY_MASK = 1
+    SELECTION_NOTIFY = 0
+
+    def __init__(self, paste=None, paste_binary=None, paste_stream=None, selection="CLIPBOARD"):
+        self.paste = paste or pyperclip.paste
+        self.paste_binary = paste_binary
+        self.paste_stream = paste_stream
+        self.wakeups = 0
+        self.last_token = None
+        self._lock = threading.Lock()
+        self._waiting = False
+        self._closed = False
+        self._wake_read = self._wake_write = None
+
+        xlib_path = ctypes.util.find_library("X11")
+        xfixes_path = ctypes.util.find_library("Xfixes")
+        if not xlib_path or not xfixes_path:
+            raise OSError("libX11/libXfixes not found")
+
+        self._xlib = ctypes.CDLL(xlib_path)
+        self._xfixes = ctypes.CDLL(xfixes_path)
+        self._xlib.XOpenDisplay.restype = ctypes.c_void_p
+        self._xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        self._xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+        self._xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        self._xlib.XInternAtom.restype = ctypes.c_ulong
+        self._xlib.XInternAtom.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int]
+        self._xlib.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XEvent)]
+        self._xlib.XPending.argtypes = [ctypes.c_void_p]
+        self._xlib.XConnectionNumber.argtypes = [ctypes.c_void_p]
+        self._xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        self._xfixes.XFixesQueryExtension.argtypes = [
+            ctypes.c_void_p, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int)]
+        self._xfixes.XFixesSelectSelectionInput.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_ulong]
+
+        self._display = self._xlib.XOpenDisplay(None)
+        if not self._display:
+            raise OSError("Cannot open X display")
+
+        event_base = ctypes.c_int()
+        error_base = ctypes.c_int()
+        if not self._xfixes.XFixesQueryExtension(self._display, ctypes.byref(event_base), ctypes.byref(error_base)):
+            self._close_display()
+            raise OSError("XFixes extension not available")
+        self._notify_type = event_base.value + self.SELECTION_NOTIFY
+
+        root = self._xlib.XDefaultRootWindow(self._display)
+        atom = self._xlib.XInternAtom(self._display, selection.encode(), 0)
+        self._xfixes.XFixesSelectSelectionInput(self._display, root, atom, self.SET_SELECTION_OWNER_NOTIFY_MASK)
+        self._connection = self._xlib.XConnectionNumber(self._display)
+        # close() writes here to wake a waiter blocked in select().
+        self._wake_read, self._wake_write = os.pipe()
+
+    def wait_for_change(self):
+        """Block until the selection owner changes and return the new content; None once closed.
+
+        Xlib is only used by the thread waiting here (there is no
+        XInitThreads), so the wait is a select() on the display connection
+        and the wake-up pipe, and the display is closed by this thread after
+        close() wakes it.
+        """
+        with self._lock:
+            if self._closed:
+                return None
+            self._waiting = True
+        try:
+            return self._wait_for_change()
+        finally:
+            with self._lock:
+                self._waiting = False
+                if self._closed:
+                    self._close_display()
+
+    def _wait_for_change(self):
+        event = _XEvent()
+        while True:
+            # Events already read into Xlib's queue do not make the connection readable.
+            while not self._xlib.XPending(self._display):
+                readable, _, _ = select.select([self._connection, self._wake_read], [], [])
+                if self._wake_read in readable:
+                    return None
+            self._xlib.XNextEvent(self._display, ctypes.byref(event))
+            self.wakeups += 1
+            if event.type == self._notify_type:
+                notify = event.xfixes_selection
+                self.last_token = (notify.owner, notify.selection_timestamp)
+                if self.paste_stream is not None:
+                    return StreamedText(self.paste_stream)
+                started = time.perf_counter() if metrics.enabled else None
+                try:
+                    content = self.paste()
+                except Exception as e:
+                    print(f"Error reading clipboard: {e}")
+                    continue
+                if not content and self.paste_binary is not None:
+                    content = self.paste_binary() or content
+                if started is not None:
+                    metrics.POLL.observe(time.perf_counter() - started)
+                return content
+
+    def close(self):
+        """Stop waiting for changes; safe to call from any thread.
+
+        A blocked wait_for_change is woken to close the display itself.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._waiting:
+                os.write(self._wake_write, b"\0")
+                return
+            self._close_display()
+
+    def _close_display(self):
+        if self._display:
+            self._xlib.XCloseDisplay(self._display)
+            self._display = None
+        for fd in (self._wake_read, self._wake_write):
+            if fd is not None:
+                os.close(fd)
+        self._wake_read = self._wake_write = None
+
+
+class ScriptedChangeSource:
+    """Replays (delay, content) pairs in place of a real clipboard for tests and benchmarks.
+
+    Content is text or BinaryContent, so the script doubles as a fake image clipboard.
+    """
+
+    def __init__(self, script, clock=time.perf_counter):
+        self.script = list(script)
+        self.clock = clock
+        self.wakeups = 0
+        self.last_token = None
+        self.latencies = []
+        self._content = ""
+        self._index = 0
+        self._deadlines = None
+        self._changed_at = None
+        self._closed = threading.Event()
+
+    def _start(self):
+        now = self.clock()
+        self._deadlines = []
+        for delay, _ in self.script:
+            now += delay
+            self._deadlines.append(now)
+
+    def paste(self):
+        """Return the content that the script has placed on the clipboard by now."""
+        if self._deadlines is None:
+            self._start()
+        now = self.clock()
+        while self._index < len(self.script) and self._deadlines[self._index] <= now:
+            self._content = self.script[self._index][1]
+            self._changed_at = self._deadlines[self._index]
+            self._index += 1
+        return self._content
+
+    def wait_for_change(self):
+        """Sleep until the next scripted copy and return its content."""
+        if self._deadlines is None:
+            self._start()
+        if self._index >= len(self.script):
+            self._closed.wait()
+            return None
+        if self._closed.wait(max(0.0, self._deadlines[self._index] - self.clock())):
+            return None
+        self.wakeups += 1
+        return self.paste()
+
+    def record_capture(self):
+        """Record the latency between the scripted copy and its capture."""
+        if self._changed_at is not None:
+            self.latencies.append(self.clock() - self._changed_at)
+            self._changed_at = None
+
+    @property
+    def exhausted(self):
+        return self._index >= len(self.script)
+
+    def close(self):
+        """Wake any blocked waiter and stop replaying."""
+        self._closed.set()
+
+
+def create_change_source():
+    """Return the best change source for this platform, falling back to polling."""
+    if sys.platform.startswith("linux") and os.environ.get("DISPLAY"):
+        try:
+            paste_stream = stream_text if _clipboard_command("text") else None
+            return XFixesChangeSource(paste_binary=paste_binary, paste_stream=paste_stream)
+        except Exception as e:
+            print(f"XFixes unavailable, falling back to polling: {e}")
+    return PollingChangeSource(paste_binary=paste_binary, change_count=native_change_counter())
+
 
 class ClipboardMonitor:
-    def __init__(self):
-        self.prev_content = ""
+    def __init__(self, source=None):
+        self.prev_token = None
         self.listeners = []
+        self.source = source
+        self.running = False
 
     def add_listener(self, listener):
         """Register a UI listener to be notified of clipboard changes."""
@@ -17,11 +524,44 @@ class ClipboardMonitor:
             listener.update_items()
 
     def start_monitoring(self):
-        """Continuously monitor clipboard changes."""
-        while True:
-            content = pyperclip.paste()
-            if content != self.prev_content and content.strip():
-                self.prev_content = content
-                add_clipboard_item(content)
-                self.notify_listeners()
-            time.sleep(0.3)
\ No newline at end of file
+        """Wait for clipboard changes from the change source and store them."""
+        if self.source is None:
+            self.source = create_change_source()
+        self.running = True
+        while self.running:
+            self.capture(self.source.wait_for_change())
+
+    def capture(self, content):
+        """Store the content if its change token differs from the last capture."""
+        if content is None or _is_blank(content):
+            return
+        started = time.perf_counter() if metrics.enabled else None
+        token = getattr(self.source, "last_token", None) or change_token(content)
+        if token != self.prev_token:
+            self.prev_token = token
+            if _self_writes and _is_self_write(content, token):
+                # The app pasted this item itself; it is already at the top of the history.
+                return
+            fingerprint = token if isinstance(token, bytes) else None
+            if isinstance(content, StreamedText) and not add_clipboard_stream(content.read()):
+                # No text was offered; the selection may hold an image instead.
+                paste_binary = getattr(self.source, "paste_binary", None)
+                content = paste_binary() if paste_binary else None
+                if content is None or _self_writes and _is_self_write(content, None):
+                    return
+            if isinstance(content, BinaryContent):
+                add_clipboard_blob(content.data, content.mime, fingerprint=fingerprint)
+            elif isinstance(content, str):
+                add_clipboard_item(content, fingerprint=fingerprint)
+            if started is not None:
+                metrics.CAPTURE_TO_STORE.observe(time.perf_counter() - started)
+            record_capture = getattr(self.source, "record_capture", None)
+            if record_capture:
+                record_capture()
+            self.notify_listeners()
+
+    def stop_monitoring(self):
+        """Stop the monitoring loop and release the change source."""
+        self.running = False
+        if self.source is not None:
+            self.source.close()
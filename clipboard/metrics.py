@@ -0,0 +1,250 @@
+"""Opt-in histograms for the hot paths, with JSON/Prometheus export and profiling hooks.
+
+Call sites guard their timing with `metrics.enabled`, so while metrics are
+off the cost is one attribute check and no clock reads:
+
+    started = time.perf_counter() if metrics.enabled else None
+    ...
+    if started is not None:
+        metrics.COMPRESS.observe(time.perf_counter() - started)
+"""
+from bisect import bisect_left
+import json
+import math
+import os
+import tempfile
+import threading
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RATIO_BUCKETS = (1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 20.0, 50.0, 100.0, 1000.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 1000)
+
+enabled = False
+_histograms = {}
+_collectors = []
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def _finite(value):
+    """`value`, or None for infinities and NaN, which JSON cannot represent."""
+    return value if value is None or math.isfinite(value) else None
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given quantile; None when empty."""
+        with self.lock:
+            if not self.count:
+                return None
+            target = fraction * self.count
+            seen = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                seen += count
+                if seen >= target:
+                    return bound
+
+    def snapshot(self):
+        with self.lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+        cumulative = []
+        seen = 0
+        for count_in_bucket in counts:
+            seen += count_in_bucket
+            cumulative.append(seen)
+        return {"count": count, "sum": total, "buckets": dict(zip(map(str, self.buckets + ("+Inf",)), cumulative)),
+                "p50": _finite(self.quantile(0.5)), "p90": _finite(self.quantile(0.9)),
+                "p99": _finite(self.quantile(0.99))}
+
+    def reset(self):
+        with self.lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.sum = 0.0
+
+
+def histogram(name, help_text, buckets=LATENCY_BUCKETS):
+    """Return the histogram registered under `name`, creating it on first use."""
+    if name not in _histograms:
+        _histograms[name] = Histogram(name, help_text, buckets)
+    return _histograms[name]
+
+
+POLL = histogram("clipboard_poll_seconds", "Time to read the clipboard on a poll or change notification")
+CAPTURE_TO_STORE = histogram("clipboard_capture_to_store_seconds", "Time from a clipboard change being read to it being stored")
+COMPRESS = histogram("clipboard_compress_seconds", "Time to fingerprint and compress a new item")
+COMPRESSION_RATIO = histogram("clipboard_compression_ratio", "Raw size over stored size of new items", RATIO_BUCKETS)
+MANAGE_MEMORY = histogram("clipboard_manage_memory_seconds", "Time spent enforcing the eviction caps")
+EVICTIONS = histogram("clipboard_evictions_per_pass", "Items evicted by one eviction pass that evicted any", COUNT_BUCKETS)
+DECOMPRESS = histogram("clipboard_decompress_seconds", "Time to decompress the full text of an item")
+POPUP_RENDER = histogram("clipboard_popup_render_seconds", "Time to bind history items to the popup cards")
+HOTKEY_TO_PAINT = histogram("clipboard_hotkey_to_paint_seconds", "Time from the hotkey press to the popup being mapped")
+CLICK_TO_PASTE = histogram("clipboard_click_to_paste_seconds", "Time from clicking an item to the paste chord being sent")
+
+
+def enable(on=True):
+    """Turn recording on or off."""
+    global enabled
+    enabled = on
+
+
+def add_collector(collect):
+    """Register a callable returning a dict of numbers to export as gauges, e.g. history stats."""
+    _collectors.append(collect)
+
+
+def _gauges():
+    """Collector values by metric name.
+
+    Names get the clipboard_ prefix; one that would clash with a histogram's
+    series (e.g. the compression_ratio stat) is exported as clipboard_store_*.
+    """
+    histogram_series = {f"{name}{suffix}" for name in _histograms for suffix in ("", "_bucket", "_sum", "_count")}
+    gauges = {}
+    for collect in _collectors:
+        try:
+            values = collect()
+        except Exception as e:
+            print(f"Error collecting metrics: {e}")
+            continue
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                name = key if key.startswith("clipboard_") else f"clipboard_{key}"
+                if name in histogram_series:
+                    name = f"clipboard_store_{name[len('clipboard_'):]}"
+                gauges[name] = value
+    return gauges
+
+
+def snapshot():
+    """Return every histogram and gauge as a JSON-ready dict."""
+    return {"enabled": enabled,
+            "histograms": {name: metric.snapshot() for name, metric in _histograms.items()},
+            "gauges": {name: _finite(value) for name, value in _gauges().items()}}
+
+
+def to_json():
+    return json.dumps(snapshot(), indent=2)
+
+
+def _prometheus_number(value):
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(value)
+
+
+def to_prometheus():
+    """Render every histogram and gauge in the Prometheus text exposition format."""
+    lines = []
+    for name, metric in _histograms.items():
+        data = metric.snapshot()
+        lines.append(f"# HELP {name} {metric.help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for bound, count in data["buckets"].items():
+            lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+        lines.append(f"{name}_sum {data['sum']}")
+        lines.append(f"{name}_count {data['count']}")
+    for name, value in _gauges().items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {_prometheus_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def render(fmt="json"):
+    """Return the metrics as "json" or "prometheus" text."""
+    return to_prometheus() if fmt == "prometheus" else to_json()
+
+
+class MetricsExporter:
+    """Rewrites a metrics file every `interval` seconds, replacing it atomically.
+
+    The Prometheus format suits node_exporter's textfile collector.
+    """
+
+    def __init__(self, path, fmt="json", interval=15.0):
+        self.path = path
+        self.fmt = fmt
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def write(self):
+        try:
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w") as f:
+                f.write(render(self.fmt))
+            os.replace(temporary, self.path)
+        except Exception as e:
+            print(f"Error writing metrics: {e}")
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.write()
+
+    def start(self):
+        threading.Thread(target=self._run, name="clipboard-metrics", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self.write()
+
+
+def _default_path(suffix):
+    return os.path.join(tempfile.gettempdir(), f"clipboard-{os.getpid()}.{suffix}")
+
+
+def toggle_profiler(path=None):
+    """Start cProfile in the calling thread, or stop it and write the stats; returns a status message.
+
+    cProfile only sees the thread it runs in, so the UI routes this call to
+    the Tk thread.
+    """
+    global _profiler
+    import cProfile
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = cProfile.Profile()
+            _profiler.enable()
+            return f"cProfile started in {threading.current_thread().name}"
+        profiler, _profiler = _profiler, None
+    profiler.disable()
+    path = path or _default_path("prof")
+    profiler.dump_stats(path)
+    return f"cProfile stats written to {path}"
+
+
+def toggle_tracemalloc(path=None, top=30):
+    """Start tracemalloc, or stop it and write the top allocation sites; returns a status message."""
+    import tracemalloc
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(10)
+        return "tracemalloc started"
+    current, peak = tracemalloc.get_traced_memory()
+    statistics = tracemalloc.take_snapshot().statistics("lineno")
+    tracemalloc.stop()
+    path = path or _default_path("tracemalloc.txt")
+    with open(path, "w") as f:
+        f.write(f"current {current} bytes, peak {peak} bytes\n")
+        for statistic in statistics[:top]:
+            f.write(f"{statistic}\n")
+    return f"tracemalloc top {top} written to {path}"
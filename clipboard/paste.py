@@ -0,0 +1,61 @@
+from collections import deque
+import time
+from clipboard import metrics
+from clipboard.manager import BinaryContent, copy_binary, copy_text, tag_self_write, untag_self_write
+
+
+class PasteEngine:
+    """Puts content on the clipboard and sends the paste chord straight away.
+
+    The selection is set through a native backend (`write_text`,
+    `write_binary`) instead of Tk, and the chord goes through pynput's
+    keyboard Controller, which adds no pauses of its own. Writes are tagged
+    first so the monitor does not store the pasted item again. Any of the
+    backends can be replaced, e.g. by stand-ins in benchmarks.
+    """
+
+    def __init__(self, write_text=None, write_binary=None, keyboard=None, modifier=None, key="v",
+                 clock=time.perf_counter):
+        self.write_text = write_text or copy_text
+        self.write_binary = write_binary or copy_binary
+        self._keyboard = keyboard
+        self._modifier = modifier
+        self.key = key
+        self.clock = clock
+        self.latencies = deque(maxlen=100)
+
+    def warm_up(self):
+        """Create the keyboard controller ahead of the first paste."""
+        if self._keyboard is None or self._modifier is None:
+            from pynput.keyboard import Controller, Key
+            self._keyboard = self._keyboard or Controller()
+            self._modifier = self._modifier or Key.ctrl
+
+    def send_chord(self):
+        self.warm_up()
+        keyboard, modifier = self._keyboard, self._modifier
+        keyboard.press(modifier)
+        try:
+            keyboard.press(self.key)
+            keyboard.release(self.key)
+        finally:
+            keyboard.release(modifier)
+
+    def paste(self, content, requested_at=None):
+        """Put text or BinaryContent on the clipboard and paste it; returns seconds from request to key injection."""
+        started = requested_at if requested_at is not None else self.clock()
+        tag = tag_self_write(content)
+        try:
+            if isinstance(content, BinaryContent):
+                self.write_binary(content.mime, content.data)
+            else:
+                self.write_text(content)
+        except Exception:
+            untag_self_write(tag)
+            raise
+        self.send_chord()
+        latency = self.clock() - started
+        self.latencies.append(latency)
+        if metrics.enabled:
+            metrics.CLICK_TO_PASTE.observe(latency)
+        return latency
@@ -0,0 +1,489 @@
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+SEGMENT_RECORD = struct.Struct("<4sIId")
+SEGMENT_MAGIC = b"CLPR"
+INDEX_HEADER = struct.Struct("<4sIQQQ")
+INDEX_MAGIC = b"CLPI"
+INDEX_ENTRY = struct.Struct("<QId16s")
+INDEX_VERSION = 2
+# Version 1 entries have no digest; such an index is upgraded on open with NO_DIGEST in every entry.
+INDEX_ENTRY_V1 = struct.Struct("<QId")
+NO_DIGEST = bytes(16)
+# Set in an index entry's length for a record that was superseded or discarded.
+DEAD_FLAG = 1 << 31
+LENGTH_FIELD = struct.Struct("<I")
+LENGTH_OFFSET = 8
+DIGEST_OFFSET = 20
+COMPACT_MIN_DEAD_BYTES = 1024 * 1024
+CURRENT_FILE = "CURRENT"
+
+
+def sync_directory(directory):
+    """Make renames and new files in `directory` durable; a no-op where directories cannot be opened."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class _MappedFile:
+    """An append-only file with a read-only mmap that is remapped as the file grows."""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self.size = os.fstat(self.fd).st_size
+        self._map = None
+        self._mapped_size = 0
+
+    def view(self, end):
+        """Return a mapping that covers at least the first `end` bytes."""
+        if end > self._mapped_size:
+            self._unmap()
+            self._map = mmap.mmap(self.fd, self.size, access=mmap.ACCESS_READ)
+            self._mapped_size = self.size
+        return self._map
+
+    def _unmap(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._mapped_size = 0
+
+    def append(self, data):
+        """Append data and return the offset it was written at."""
+        offset = self.size
+        os.pwrite(self.fd, data, offset)
+        self.size += len(data)
+        return offset
+
+    def write_at(self, offset, data):
+        """Overwrite bytes in place; the shared mapping sees the change."""
+        os.pwrite(self.fd, data, offset)
+
+    def truncate(self, size):
+        """Cut the file back to `size` bytes."""
+        self._unmap()
+        os.ftruncate(self.fd, size)
+        self.size = size
+
+    def sync(self):
+        os.fsync(self.fd)
+
+    def close(self):
+        self._unmap()
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class PersistentClipboardStore:
+    """Clipboard history kept in an append-only segment file with an mmap'd offset index.
+
+    Each record in the segment is a small header (magic, length, crc32, timestamp)
+    followed by the compressed payload. The index holds one fixed-size entry per
+    record, with the content digest the caller passed to `append`, so startup
+    only maps the files instead of decoding the history. Items
+    before `live_start` are dead (cleared or evicted); items after it can be
+    tombstoned one by one with DEAD_FLAG in their index entry. Both are
+    reclaimed by a background compaction that writes a new generation of both
+    files. Compaction keeps an empty record for each tombstone so ids, which
+    are positions in the index, do not change.
+    """
+
+    def __init__(self, directory, max_items=50000, compact_min_dead=1000, on_evict=None):
+        self.directory = directory
+        self.max_items = max_items
+        self.on_evict = on_evict
+        self.compact_min_dead = compact_min_dead
+        self.lock = threading.RLock()
+        self._compacting = False
+        self._compactor = None
+        self._discarded_while_compacting = []
+        os.makedirs(directory, exist_ok=True)
+        self._open(self._read_generation())
+        self._remove_stale_files()
+
+    def _read_generation(self):
+        try:
+            with open(os.path.join(self.directory, CURRENT_FILE)) as f:
+                current = f.read().strip()
+        except FileNotFoundError:
+            return 0
+        # Files of every other generation are deleted at open, so an unreadable CURRENT must not pass for 0.
+        if not current.isdigit():
+            raise ValueError(f"Unreadable clipboard history generation in {CURRENT_FILE}: {current!r}")
+        return int(current)
+
+    def _remove_stale_files(self):
+        """Delete history files of generations other than the one CURRENT names.
+
+        They are left behind by a compaction that crashed before or after
+        switching CURRENT.
+        """
+        live = {os.path.basename(path) for path in self._paths(self.generation)}
+        for name in os.listdir(self.directory):
+            prefix, _, rest = name.partition(".")
+            generation, _, suffix = rest.partition(".")
+            stale = (prefix == "history" and generation.isdigit() and suffix in ("seg", "idx")
+                     or name == CURRENT_FILE + ".tmp")
+            if stale and name not in live:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError as e:
+                    print(f"Error removing stale clipboard history file {name}: {e}")
+
+    def _paths(self, generation):
+        base = os.path.join(self.directory, f"history.{generation}")
+        return base + ".seg", base + ".idx"
+
+    def _open(self, generation):
+        self.generation = generation
+        segment_path, index_path = self._paths(generation)
+        self.segment = _MappedFile(segment_path)
+        self.index = _MappedFile(index_path)
+
+        if self.index.size < INDEX_HEADER.size:
+            self.index.truncate(0)
+            self.index.append(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, 0, 0))
+        magic, version, self.base_id, self.live_start, self.live_bytes = INDEX_HEADER.unpack_from(
+            self.index.view(INDEX_HEADER.size), 0)
+        if magic == INDEX_MAGIC and version == 1:
+            self._upgrade_index(index_path)
+        elif magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"Unsupported clipboard history index: {index_path}")
+
+        self._recover_tail()
+
+    def _upgrade_index(self, index_path):
+        """Rewrite a version 1 index in the current format, with NO_DIGEST in every entry."""
+        end = INDEX_HEADER.size + (self.index.size - INDEX_HEADER.size) // INDEX_ENTRY_V1.size * INDEX_ENTRY_V1.size
+        entries = self.index.view(end)[INDEX_HEADER.size:end]
+        upgraded = _MappedFile(index_path + ".tmp")
+        try:
+            upgraded.truncate(0)
+            upgraded.append(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.base_id, self.live_start,
+                                              self.live_bytes))
+            upgraded.append(b"".join(INDEX_ENTRY.pack(*entry, NO_DIGEST)
+                                     for entry in INDEX_ENTRY_V1.iter_unpack(entries)))
+            upgraded.sync()
+        finally:
+            upgraded.close()
+        self.index.close()
+        os.replace(index_path + ".tmp", index_path)
+        self.index = _MappedFile(index_path)
+
+    def _recover_tail(self):
+        """Drop index entries and segment bytes left behind by an interrupted append."""
+        entries = (self.index.size - INDEX_HEADER.size) // INDEX_ENTRY.size
+        self.index.truncate(INDEX_HEADER.size + entries * INDEX_ENTRY.size)
+        while entries and not self._record_is_valid(entries - 1):
+            entries -= 1
+        self.count = entries
+        self.index.truncate(INDEX_HEADER.size + entries * INDEX_ENTRY.size)
+
+        segment_end = 0
+        if entries:
+            offset, length, _ = self._entry(entries - 1)
+            segment_end = offset + SEGMENT_RECORD.size + length
+        if self.segment.size != segment_end:
+            self.segment.truncate(segment_end)
+
+        # The header is written after the entry it accounts for, so after a crash
+        # its byte count can be off even when no record was dropped.
+        self.live_start = min(self.live_start, self.count)
+        self._scan_live()
+        self._write_header()
+
+    def _scan_live(self):
+        """Recount the live bytes and the tombstones after `live_start` from the index."""
+        self.live_bytes = self.dead = self.dead_bytes = 0
+        start = INDEX_HEADER.size + self.live_start * INDEX_ENTRY.size
+        end = INDEX_HEADER.size + self.count * INDEX_ENTRY.size
+        if start == end:
+            return
+        for _, length, _, _ in INDEX_ENTRY.iter_unpack(self.index.view(end)[start:end]):
+            if length & DEAD_FLAG:
+                self.dead += 1
+                self.dead_bytes += length & ~DEAD_FLAG
+            else:
+                self.live_bytes += length
+
+    def _raw_entry(self, position):
+        offset = INDEX_HEADER.size + position * INDEX_ENTRY.size
+        return INDEX_ENTRY.unpack_from(self.index.view(offset + INDEX_ENTRY.size), offset)
+
+    def _entry(self, position):
+        offset, length, timestamp, _ = self._raw_entry(position)
+        return offset, length & ~DEAD_FLAG, timestamp
+
+    def _is_dead(self, position):
+        return bool(self._raw_entry(position)[1] & DEAD_FLAG)
+
+    def _record_is_valid(self, position):
+        offset, length, _ = self._entry(position)
+        end = offset + SEGMENT_RECORD.size + length
+        if end > self.segment.size:
+            return False
+        view = self.segment.view(end)
+        magic, record_length, crc, _ = SEGMENT_RECORD.unpack_from(view, offset)
+        payload = view[offset + SEGMENT_RECORD.size:end]
+        return magic == SEGMENT_MAGIC and record_length == length and zlib.crc32(payload) == crc
+
+    def _write_header(self):
+        self.index.write_at(0, INDEX_HEADER.pack(
+            INDEX_MAGIC, INDEX_VERSION, self.base_id, self.live_start, self.live_bytes))
+
+    def _read_payload(self, position):
+        offset, length, timestamp = self._entry(position)
+        start = offset + SEGMENT_RECORD.size
+        return self.segment.view(start + length)[start:start + length], timestamp
+
+    def __len__(self):
+        return self.count - self.live_start - self.dead
+
+    def append(self, payload: bytes, timestamp: float, digest: bytes = NO_DIGEST) -> int:
+        """Append a compressed payload with the 16-byte digest of its content and return its item id."""
+        if len(payload) >= DEAD_FLAG:
+            raise ValueError(f"Clipboard record of {len(payload)} bytes is too large for the history index")
+        with self.lock:
+            record = SEGMENT_RECORD.pack(SEGMENT_MAGIC, len(payload), zlib.crc32(payload), timestamp)
+            offset = self.segment.append(record + payload)
+            self.index.append(INDEX_ENTRY.pack(offset, len(payload), timestamp, digest))
+            self.count += 1
+            self.live_bytes += len(payload)
+            while len(self) > self.max_items:
+                evicted_id = self._evict_oldest()
+                if self.on_evict is not None:
+                    self.on_evict(evicted_id)
+            self._write_header()
+            item_id = self.base_id + self.count - 1
+        self._maybe_compact()
+        return item_id
+
+    def items(self, limit=None):
+        """Return (payload, timestamp, item_id) tuples, newest first."""
+        with self.lock:
+            records = []
+            for position in range(self.count - 1, self.live_start - 1, -1):
+                if limit is not None and len(records) >= limit:
+                    break
+                if not self._is_dead(position):
+                    records.append(self._read_payload(position) + (self.base_id + position,))
+            return records
+
+    def item_ids(self, limit=None):
+        """Return the ids of the live items, newest first, without reading their payloads."""
+        with self.lock:
+            ids = []
+            for position in range(self.count - 1, self.live_start - 1, -1):
+                if limit is not None and len(ids) >= limit:
+                    break
+                if not self._is_dead(position):
+                    ids.append(self.base_id + position)
+            return ids
+
+    def record_heads(self, size):
+        """Return the first `size` bytes of every live payload, oldest first."""
+        with self.lock:
+            heads = []
+            for position in range(self.live_start, self.count):
+                if self._is_dead(position):
+                    continue
+                offset, length, _ = self._entry(position)
+                start = offset + SEGMENT_RECORD.size
+                end = start + min(size, length)
+                heads.append(self.segment.view(end)[start:end])
+            return heads
+
+    def digests(self):
+        """Return (item_id, digest) for every live item, oldest first, reading only the index."""
+        with self.lock:
+            start = INDEX_HEADER.size + self.live_start * INDEX_ENTRY.size
+            end = INDEX_HEADER.size + self.count * INDEX_ENTRY.size
+            if start == end:
+                return []
+            entries = INDEX_ENTRY.iter_unpack(self.index.view(end)[start:end])
+            return [(self.base_id + self.live_start + number, digest)
+                    for number, (_, length, _, digest) in enumerate(entries) if not length & DEAD_FLAG]
+
+    def set_digest(self, item_id, digest):
+        """Store the digest of an item that was written without one."""
+        with self.lock:
+            position = self._live_position(item_id)
+            if position is not None:
+                self.index.write_at(INDEX_HEADER.size + position * INDEX_ENTRY.size + DIGEST_OFFSET, digest)
+
+    def _live_position(self, item_id):
+        position = item_id - self.base_id
+        if self.live_start <= position < self.count and not self._is_dead(position):
+            return position
+        return None
+
+    def __contains__(self, item_id):
+        with self.lock:
+            return self._live_position(item_id) is not None
+
+    def get(self, item_id):
+        """Return the (payload, timestamp, item_id) tuple for an id, or None if it is gone."""
+        with self.lock:
+            position = self._live_position(item_id)
+            return self._read_payload(position) + (item_id,) if position is not None else None
+
+    def oldest_timestamp(self):
+        """Returns the timestamp of the oldest live item, or None if empty."""
+        with self.lock:
+            self._skip_dead()
+            if not len(self):
+                return None
+            return self._entry(self.live_start)[2]
+
+    def memory_usage(self):
+        """Returns the compressed size of the live items."""
+        return self.live_bytes
+
+    def _skip_dead(self):
+        while self.dead and self._is_dead(self.live_start):
+            self.dead -= 1
+            self.dead_bytes -= self._entry(self.live_start)[1]
+            self.live_start += 1
+
+    def _evict_oldest(self):
+        self._skip_dead()
+        _, length, _ = self._entry(self.live_start)
+        self.live_start += 1
+        self.live_bytes -= length
+        return self.base_id + self.live_start - 1
+
+    def pop_oldest(self):
+        """Mark the oldest live item as dead and return its id."""
+        item_id = None
+        with self.lock:
+            if len(self):
+                item_id = self._evict_oldest()
+                self._write_header()
+        self._maybe_compact()
+        return item_id
+
+    def discard(self, item_id):
+        """Tombstone one item wherever it is in the history; returns False if it was already gone."""
+        with self.lock:
+            position = self._live_position(item_id)
+            if position is None:
+                return False
+            _, length, _ = self._entry(position)
+            self.index.write_at(INDEX_HEADER.size + position * INDEX_ENTRY.size + LENGTH_OFFSET,
+                                LENGTH_FIELD.pack(length | DEAD_FLAG))
+            self.live_bytes -= length
+            self.dead += 1
+            self.dead_bytes += length
+            if self._compacting:
+                self._discarded_while_compacting.append(position)
+            self._write_header()
+        self._maybe_compact()
+        return True
+
+    def clear(self):
+        """Mark every item as dead; the space is reclaimed by compaction."""
+        with self.lock:
+            self.live_start = self.count
+            self.live_bytes = self.dead = self.dead_bytes = 0
+            self._write_header()
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        with self.lock:
+            if self._compacting:
+                return
+            if (self.live_start < self.compact_min_dead
+                    and self.dead_bytes < max(COMPACT_MIN_DEAD_BYTES, self.live_bytes)):
+                return
+            self._compacting = True
+            self._compactor = threading.Thread(target=self.compact, daemon=True)
+            self._compactor.start()
+
+    def compact(self):
+        """Rewrite the live records into a new generation and switch to it."""
+        with self.lock:
+            self._compacting = True
+            self._discarded_while_compacting = []
+            self._skip_dead()
+            snapshot_start, snapshot_count = self.live_start, self.count
+            generation = self.generation + 1
+        segment_path, index_path = self._paths(generation)
+        for path in (segment_path, index_path):
+            if os.path.exists(path):
+                os.remove(path)
+        segment = _MappedFile(segment_path)
+        index = _MappedFile(index_path)
+        try:
+            index.append(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, 0, 0))
+            self._copy_records(segment, index, snapshot_start, snapshot_count)
+            with self.lock:
+                self._copy_records(segment, index, snapshot_count, self.count)
+                # Items tombstoned after the first pass copied them are tombstoned in the copy too.
+                for position in self._discarded_while_compacting:
+                    if snapshot_start <= position < snapshot_count:
+                        entry_offset = INDEX_HEADER.size + (position - snapshot_start) * INDEX_ENTRY.size
+                        length = INDEX_ENTRY.unpack_from(index.view(entry_offset + INDEX_ENTRY.size), entry_offset)[1]
+                        index.write_at(entry_offset + LENGTH_OFFSET, LENGTH_FIELD.pack(length | DEAD_FLAG))
+                base_id = self.base_id + snapshot_start
+                live_start = self.live_start - snapshot_start
+                index.write_at(0, INDEX_HEADER.pack(
+                    INDEX_MAGIC, INDEX_VERSION, base_id, live_start, self.live_bytes))
+                segment.sync()
+                index.sync()
+                segment.close()
+                index.close()
+
+                current_tmp = os.path.join(self.directory, CURRENT_FILE + ".tmp")
+                with open(current_tmp, "w") as f:
+                    f.write(str(generation))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(current_tmp, os.path.join(self.directory, CURRENT_FILE))
+                sync_directory(self.directory)
+
+                old_paths = self._paths(self.generation)
+                self.segment.close()
+                self.index.close()
+                self._open(generation)
+                for path in old_paths:
+                    os.remove(path)
+        except Exception as e:
+            print(f"Error compacting clipboard history: {e}")
+            segment.close()
+            index.close()
+        finally:
+            with self.lock:
+                self._compacting = False
+
+    def _copy_records(self, segment, index, start, stop):
+        for position in range(start, stop):
+            with self.lock:
+                dead = self._is_dead(position)
+                digest = self._raw_entry(position)[3]
+                payload, timestamp = self._read_payload(position)
+            if dead:
+                payload = b""
+            offset = segment.append(
+                SEGMENT_RECORD.pack(SEGMENT_MAGIC, len(payload), zlib.crc32(payload), timestamp) + payload)
+            index.append(INDEX_ENTRY.pack(offset, len(payload) | (DEAD_FLAG if dead else 0), timestamp, digest))
+
+    def close(self):
+        """Wait for a running compaction, then flush and close the history files."""
+        if self._compactor is not None:
+            self._compactor.join()
+        with self.lock:
+            self.segment.sync()
+            self.index.sync()
+            self.segment.close()
+            self.index.close()
@@ -0,0 +1,135 @@
+import os
+import socket
+import stat
+import struct
+from typing import NamedTuple
+
+# Every frame is a header (opcode in requests, status in replies; payload length) and the payload.
+HEADER = struct.Struct("<BI")
+MAX_PAYLOAD = 256 * 1024 * 1024
+
+OP_LIST = 1
+OP_GET = 2
+OP_SEARCH = 3
+OP_PUSH = 4
+OP_CLEAR = 5
+OP_STATS = 6
+OP_TOGGLE = 7
+OP_METRICS = 8
+OP_PROFILE = 9
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+STATUS_NOT_FOUND = 2
+
+LIST_REQUEST = struct.Struct("<II")
+GET_REQUEST = struct.Struct("<Q")
+SEARCH_REQUEST = struct.Struct("<BII")
+PUSH_REQUEST = struct.Struct("<B")
+ITEM = struct.Struct("<QdBI")
+ITEM_COUNT = struct.Struct("<I")
+SEARCH_MODES = ("substring", "prefix", "fuzzy")
+METRICS_FORMATS = ("json", "prometheus")
+PROFILERS = ("cprofile", "tracemalloc")
+SMALL_FRAME = 64 * 1024
+# The local API runs over a Unix socket; without one (Windows) there is no single-instance mode.
+UNIX_SOCKETS = hasattr(socket, "AF_UNIX")
+# struct ucred from SO_PEERCRED: pid, uid, gid.
+PEER_CREDENTIALS = struct.Struct("3i")
+
+
+class ProtocolError(Exception):
+    """Raised for malformed frames and for errors reported by the other side."""
+
+
+class RemoteItem(NamedTuple):
+    item_id: int
+    timestamp: float
+    mime: str
+    data: bytes
+
+
+def check_socket_owner(path):
+    """Raise PermissionError unless `path` is a socket owned by this user.
+
+    Called before connecting to or removing the socket, since in a shared
+    directory another user could have put something else there.
+    """
+    st = os.lstat(path)
+    if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a socket owned by this user")
+
+
+def check_peer(sock):
+    """Raise PermissionError unless the other end of a connected Unix socket runs as this user.
+
+    Only checked where SO_PEERCRED exists (Linux).
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return
+    _, uid, _ = PEER_CREDENTIALS.unpack(sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                                          PEER_CREDENTIALS.size))
+    if uid != os.getuid():
+        raise PermissionError(f"Clipboard manager socket peer runs as uid {uid}")
+
+
+def send_frame(sock, code: int, payload: bytes = b""):
+    """Write one frame; small frames go out in a single send."""
+    header = HEADER.pack(code, len(payload))
+    if len(payload) <= SMALL_FRAME:
+        sock.sendall(header + payload)
+    else:
+        sock.sendall(header)
+        sock.sendall(payload)
+
+
+def _recv_exact(sock, size: int):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            return None
+        received += count
+    return buffer
+
+
+def recv_frame(sock):
+    """Read one frame and return (code, payload), or None if the peer closed the connection."""
+    header = _recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    code, length = HEADER.unpack(header)
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"Frame of {length} bytes exceeds the {MAX_PAYLOAD} byte limit")
+    payload = _recv_exact(sock, length) if length else bytearray()
+    if payload is None:
+        raise ProtocolError("Connection closed in the middle of a frame")
+    return code, bytes(payload)
+
+
+def pack_items(items) -> bytes:
+    """Encode RemoteItems as a count followed by (header, mime, data) records."""
+    parts = [ITEM_COUNT.pack(len(items))]
+    for item in items:
+        mime = item.mime.encode("ascii")
+        parts.append(ITEM.pack(item.item_id, item.timestamp, len(mime), len(item.data)))
+        parts.append(mime)
+        parts.append(item.data)
+    return b"".join(parts)
+
+
+def unpack_items(payload: bytes) -> list:
+    """Decode the output of pack_items."""
+    (count,) = ITEM_COUNT.unpack_from(payload, 0)
+    offset = ITEM_COUNT.size
+    items = []
+    for _ in range(count):
+        item_id, timestamp, mime_length, data_length = ITEM.unpack_from(payload, offset)
+        offset += ITEM.size
+        mime = payload[offset:offset + mime_length].decode("ascii")
+        offset += mime_length
+        items.append(RemoteItem(item_id, timestamp, mime, payload[offset:offset + data_length]))
+        offset += data_length
+    return items
@@ -0,0 +1,188 @@
+from collections import OrderedDict
+from textwrap import wrap
+import io
+import os
+import re
+import threading
+import customtkinter as ctk
+from PIL import Image
+from clipboard.inmemory import ClipboardItem, get_decompressed_prefix, get_item_data, get_item_mime, is_binary_item
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+PREVIEW_MAX_BYTES = 1024 * 1024
+# The end of a word: textwrap splits only at these ASCII whitespace characters.
+WORD_END = re.compile(r"[^\t\n\x0b\x0c\r ](?=[\t\n\x0b\x0c\r ])")
+LAST_WORD_END = re.compile(r"(?s).*[^\t\n\x0b\x0c\r ](?=[\t\n\x0b\x0c\r ])")
+
+
+def wrap_head(text, max_lines=3, width=40, complete=True):
+    """Wrap only as much of `text` as its first `max_lines` lines need.
+
+    The text is cut at the end of a word, where textwrap splits the prefix
+    into the same chunks as the full text, so every wrapped line but the
+    last is final. More than `max_lines` lines back therefore means the
+    first `max_lines` are those of wrap(text); otherwise all of `text` was
+    wrapped. Pass complete=False for a text that is itself cut short: it is
+    then only wrapped up to its last word end.
+    """
+    size = (max_lines + 1) * (width + 1)
+    while True:
+        word_end = WORD_END.search(text, size)
+        if word_end is None:
+            break
+        lines = wrap(text[:word_end.end()], width=width)
+        if len(lines) > max_lines:
+            return lines
+        size = word_end.end() * 2
+    if not complete:
+        last = LAST_WORD_END.match(text)
+        text = text[:last.end()] if last else ""
+    return wrap(text, width=width)
+
+
+def truncate_lines(wrapped_lines, max_lines=3):
+    """Join the first `max_lines` lines, ending with "..." if the text goes on."""
+    if len(wrapped_lines) < max_lines:
+        return "\n".join(wrapped_lines)
+
+    wrapped_lines = wrapped_lines[:max_lines] or [""]
+    wrapped_lines[-1] = wrapped_lines[-1][:-3] + "..."
+
+    return "\n".join(wrapped_lines)
+
+
+def limit_text_to_lines(text, max_lines=3, width=40):
+    """Limit text to fit a specific number of lines with truncation.
+
+    Gives the same result as wrapping the whole text, but only wraps a
+    prefix long enough for `max_lines` lines, so the cost does not grow with
+    the size of the text.
+    """
+    return truncate_lines(wrap_head(text, max_lines, width), max_lines)
+
+
+def format_size(size):
+    """Format a byte count for display."""
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def is_image_item(item: ClipboardItem) -> bool:
+    """Return True for items that get a thumbnail."""
+    return is_binary_item(item) and get_item_mime(item).startswith("image/")
+
+
+class RenderCache:
+    """Icons loaded once and bounded LRUs of card previews and image thumbnails keyed by item id.
+
+    Thumbnails are decoded and scaled by `thumbnail` on a worker thread; the
+    Tk thread only wraps the small result in a CTkImage.
+    """
+
+    def __init__(self, max_previews=512, max_lines=3, width=40, max_thumbnails=64, thumbnail_size=(280, 60)):
+        self.max_previews = max_previews
+        self.max_lines = max_lines
+        self.width = width
+        self.max_thumbnails = max_thumbnails
+        self.thumbnail_size = thumbnail_size
+        self.icons = {}
+        self.previews = OrderedDict()
+        self.thumbnails = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def icon(self, name, size):
+        """Return a CTkImage for an icon in the package directory, loading it only once."""
+        key = (name, size)
+        if key not in self.icons:
+            image = Image.open(os.path.join(ASSET_DIR, name))
+            image = image.resize((size, size), Image.Resampling.LANCZOS)
+            self.icons[key] = ctk.CTkImage(light_image=image, size=(size, size))
+        return self.icons[key]
+
+    def cached_preview(self, item_id: int):
+        """Return the cached preview for an item id, or None without computing it."""
+        with self.lock:
+            preview = self.previews.get(item_id)
+            if preview is not None:
+                self.previews.move_to_end(item_id)
+                self.hits += 1
+            return preview
+
+    def preview(self, item: ClipboardItem) -> str:
+        """Return the truncated card text for an item, decompressing only its head."""
+        with self.lock:
+            preview = self.previews.get(item.item_id)
+            if preview is not None:
+                self.previews.move_to_end(item.item_id)
+                self.hits += 1
+                return preview
+            self.misses += 1
+
+        if is_binary_item(item):
+            preview = f"{get_item_mime(item)}\n{format_size(len(item.content))}"
+        else:
+            # A prefix that decodes to fewer than max_bytes - 3 bytes is the whole text.
+            max_bytes = (self.max_lines + 1) * self.width * 4
+            while True:
+                text = get_decompressed_prefix(item, max_bytes)
+                complete = len(text.encode()) < max_bytes - 3 or max_bytes >= PREVIEW_MAX_BYTES
+                wrapped_lines = wrap_head(text, self.max_lines, self.width, complete)
+                if complete or len(wrapped_lines) > self.max_lines:
+                    break
+                max_bytes *= 4
+            preview = truncate_lines(wrapped_lines, self.max_lines)
+
+        with self.lock:
+            self.previews[item.item_id] = preview
+            while len(self.previews) > self.max_previews:
+                self.previews.popitem(last=False)
+        return preview
+
+    def thumbnail(self, item: ClipboardItem):
+        """Decode and scale an image item to card size; call from a worker thread.
+
+        The thumbnail is cached as a PIL image, or as False if the data could
+        not be decoded so that it is not retried.
+        """
+        with self.lock:
+            if item.item_id in self.thumbnails:
+                return
+        try:
+            image = Image.open(io.BytesIO(get_item_data(item)))
+            # Lets JPEG decode at a reduced scale instead of full size.
+            image.draft("RGB", self.thumbnail_size)
+            image.thumbnail(self.thumbnail_size)
+            thumbnail = image.convert("RGBA")
+        except Exception as e:
+            print(f"Error building thumbnail: {e}")
+            thumbnail = False
+        with self.lock:
+            self.thumbnails[item.item_id] = thumbnail
+            while len(self.thumbnails) > self.max_thumbnails:
+                self.thumbnails.popitem(last=False)
+
+    def cached_thumbnail(self, item_id: int):
+        """Return a CTkImage for a built thumbnail, False if it failed, or None if not built yet.
+
+        Call from the Tk thread; the CTkImage is created on first use and kept.
+        """
+        with self.lock:
+            thumbnail = self.thumbnails.get(item_id)
+            if thumbnail is None or thumbnail is False:
+                return thumbnail
+            self.thumbnails.move_to_end(item_id)
+            if not isinstance(thumbnail, ctk.CTkImage):
+                thumbnail = ctk.CTkImage(light_image=thumbnail, size=thumbnail.size)
+                self.thumbnails[item_id] = thumbnail
+            return thumbnail
+
+    def clear(self):
+        """Forget all cached previews and thumbnails."""
+        with self.lock:
+            self.previews.clear()
+            self.thumbnails.clear()
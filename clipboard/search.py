@@ -0,0 +1,173 @@
+from collections import defaultdict
+import heapq
+import math
+import threading
+
+INDEX_MAX_CHARS = 32 * 1024
+FUZZY_MIN_SCORE = 0.5
+FUZZY_SCAN_LIMIT = 5000
+VERIFY_BATCH = 200
+
+
+def normalize_text(text: str) -> str:
+    """Lowercases the text and collapses whitespace, padding it so word starts are ' x' grams."""
+    return " " + " ".join(text[:INDEX_MAX_CHARS].lower().split()) + " "
+
+
+def text_grams(normalized: str) -> set:
+    """Returns the trigrams of the normalized text plus a ' x' gram for every word start."""
+    grams = {normalized[i:i + 3] for i in range(len(normalized) - 2)}
+    grams.update(" " + word[0] for word in normalized.split())
+    return grams
+
+
+def index_grams(text: str) -> tuple:
+    """Returns the grams an item with this text is indexed under."""
+    return tuple(text_grams(normalize_text(text)))
+
+
+class SearchIndex:
+    """Incremental trigram index over clipboard history.
+
+    Each gram maps to an insertion-ordered dict of item ids. Ids grow
+    monotonically, so walking a posting in reverse yields the newest items
+    first and a query can stop as soon as it has `limit` results instead of
+    touching every posting. Only candidates that the grams alone cannot
+    confirm are passed to `get_text`, so non-matching items are never
+    decompressed.
+    """
+
+    def __init__(self, get_text=None):
+        self.get_text = get_text
+        self.postings = defaultdict(dict)
+        self.item_grams = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.item_grams)
+
+    def __contains__(self, item_id):
+        return item_id in self.item_grams
+
+    def add(self, item_id: int, text: str):
+        """Index the text of a new item."""
+        self.add_grams(item_id, index_grams(text))
+
+    def add_grams(self, item_id: int, grams: tuple):
+        """Index a new item under grams from index_grams."""
+        with self.lock:
+            self.item_grams[item_id] = grams
+            for gram in grams:
+                self.postings[gram][item_id] = None
+
+    def remove(self, item_id: int):
+        """Drop an evicted item from the index."""
+        with self.lock:
+            for gram in self.item_grams.pop(item_id, ()):
+                posting = self.postings[gram]
+                posting.pop(item_id, None)
+                if not posting:
+                    del self.postings[gram]
+
+    def move(self, old_id: int, new_id: int):
+        """Re-file an item under a new, newer id without re-reading its text."""
+        with self.lock:
+            grams = self.item_grams.pop(old_id, None)
+            if grams is None:
+                return
+            self.item_grams[new_id] = grams
+            for gram in grams:
+                posting = self.postings[gram]
+                posting.pop(old_id, None)
+                posting[new_id] = None
+
+    def merge_older(self, other: "SearchIndex"):
+        """Fold in an index whose items are all older than the ones indexed here.
+
+        Postings stay in id order, so the newest-first walk in `search` holds.
+        `other` must not be used afterwards.
+        """
+        with self.lock:
+            for gram, older in other.postings.items():
+                newer = self.postings.get(gram)
+                if newer:
+                    older.update(newer)
+                self.postings[gram] = older
+            self.item_grams.update(other.item_grams)
+
+    def clear(self):
+        """Forget every indexed item."""
+        with self.lock:
+            self.postings.clear()
+            self.item_grams.clear()
+
+    def search(self, query: str, mode: str = "substring", limit: int = 20) -> list:
+        """Returns matching item ids, best first.
+
+        `mode` is "prefix" (a word starting with the query), "substring" or
+        "fuzzy" (items sharing at least half of the query trigrams). Substring
+        queries shorter than three characters match word prefixes.
+        Exact matches are ranked by recency, fuzzy ones by score then recency.
+        Candidates the grams cannot confirm are checked against their text
+        VERIFY_BATCH at a time until `limit` match, and fuzzy queries score at
+        most FUZZY_SCAN_LIMIT candidates.
+        """
+        normalized = " ".join(query.lower().split())
+        if not normalized:
+            return []
+        if mode == "prefix":
+            normalized = " " + normalized
+        elif mode == "fuzzy":
+            return self._search_fuzzy(" " + normalized + " ", limit)
+        elif mode != "substring":
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        if len(normalized) < 3 and mode == "substring":
+            normalized = " " + normalized
+        grams = {normalized[i:i + 3] for i in range(len(normalized) - 2)} or {normalized}
+        needs_check = len(normalized) > 3 and self.get_text is not None
+
+        with self.lock:
+            postings = sorted((self.postings.get(gram, {}) for gram in grams), key=len)
+            rarest = list(postings[0])
+        # Candidates are collected newest first, a batch at a time, and checked outside the lock.
+        results = []
+        position = len(rarest)
+        while position and len(results) < limit:
+            batch = []
+            with self.lock:
+                while position and len(batch) < (VERIFY_BATCH if needs_check else limit - len(results)):
+                    position -= 1
+                    item_id = rarest[position]
+                    if all(item_id in posting for posting in postings[1:]):
+                        batch.append(item_id)
+            if not needs_check:
+                results.extend(batch)
+                continue
+            for item_id in batch:
+                text = self.get_text(item_id)
+                if text is not None and normalized in normalize_text(text):
+                    results.append(item_id)
+                    if len(results) >= limit:
+                        break
+        return results
+
+    def _search_fuzzy(self, padded: str, limit: int) -> list:
+        grams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+        needed = math.ceil(len(grams) * FUZZY_MIN_SCORE)
+        with self.lock:
+            postings = sorted((self.postings.get(gram, {}) for gram in grams), key=len)
+            # An item matching `needed` grams must contain one of the rarest len - needed + 1.
+            rarest = [reversed(posting) for posting in postings[:len(postings) - needed + 1]]
+            scored = []
+            previous = None
+            for scanned, item_id in enumerate(heapq.merge(*rarest, reverse=True)):
+                if scanned >= FUZZY_SCAN_LIMIT:
+                    break
+                if item_id == previous:
+                    continue
+                previous = item_id
+                hits = sum(1 for posting in postings if item_id in posting)
+                if hits >= needed:
+                    scored.append((hits, item_id))
+        return [item_id for _, item_id in heapq.nlargest(limit, scored)]
@@ -1,63 +1,261 @@
 import tkinter as tk
-from clipboard.inmemory import ClipboardItem, get_clipboard_items, clear_clipboard, get_decompressed_text
-import pyautogui
-import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import wraps
+import threading
+import time
+from clipboard.inmemory import (ClipboardItem, get_clipboard_item, get_clipboard_item_ids, clear_clipboard,
+                                get_decompressed_text, get_item_data, get_item_mime, is_binary_item,
+                                mark_clipboard_item_used)
+from clipboard.manager import BinaryContent, can_copy_binary, copy_text
+from clipboard.paste import PasteEngine
+from clipboard.render_cache import RenderCache, is_image_item, limit_text_to_lines
+from clipboard import metrics
+from clipboard.dispatcher import UIDispatcher, PreviewReady, ClipboardChanged, RunOnUIThread, TogglePopup
 import customtkinter as ctk
-from PIL import Image
-from textwrap import wrap
-from functools import partial
-
-ctk.set_appearance_mode("dark")
-ctk.set_default_color_theme("dark-blue")
+import pyperclip
+
+POPUP_WIDTH = 400
+POPUP_HEIGHT = 450
+CARD_WIDTH = POPUP_WIDTH - 20
+CARD_HEIGHT = 80
+BUTTON_WIDTH_HEIGHT = 48
+TEXT_WIDTH = CARD_WIDTH - BUTTON_WIDTH_HEIGHT - 20
+ICON_SIZE = 18
+VISIBLE_CARDS = 4
+LIST_LIMIT = 5000
+PREVIEW_WORKERS = 2
+PREVIEW_PLACEHOLDER = "…"
+FADE_STEPS = 15
+FADE_FRAME_MS = 16
+
+
+def main_thread_timed(method):
+    """Add the time spent in a Tk callback to the blocked time of the current popup open."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._timing_depth += 1
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._timing_depth -= 1
+            if not self._timing_depth:
+                self.blocked_time += time.perf_counter() - started
+                self._finish_open_timing()
+    return wrapper
+
+
+class HistoryCard:
+    """A card widget that is created once per popup and rebound to items as the list scrolls."""
+
+    def __init__(self, ui, parent, copy_icon):
+        self.ui = ui
+        self.item = None
+
+        self.frame = ctk.CTkFrame(parent,
+                                  width=CARD_WIDTH,
+                                  height=CARD_HEIGHT,
+                                  corner_radius=10,
+                                  fg_color="#2C2C2C",
+                                  bg_color="transparent")
+        self.frame.pack_propagate(False)
+
+        self.text_frame = ctk.CTkFrame(self.frame, width=TEXT_WIDTH, height=CARD_HEIGHT, fg_color="#2C2C2C", bg_color="transparent")
+        self.text_frame.pack(side="left", fill="y", padx=5, pady=5)
+        self.text_frame.pack_propagate(False)
+
+        self.text_label = ctk.CTkLabel(
+            self.text_frame,
+            text="",
+            wraplength=TEXT_WIDTH,
+            anchor="w",
+            justify="left",
+            text_color="white",
+            font=("Noto Color Emoji", 14)
+        )
+        self.text_label.pack(side="left", fill="both", expand=True, padx=5, pady=5)
+
+        self.button_frame = ctk.CTkFrame(self.frame,
+                                         width=BUTTON_WIDTH_HEIGHT-5,
+                                         height=BUTTON_WIDTH_HEIGHT,
+                                         fg_color="#2C2C2C",
+                                         bg_color="transparent")
+        self.button_frame.pack(side="right", fill="both", padx=5, pady=5, anchor="center")
+        self.button_frame.pack_propagate(False)
+
+        self.copy_button = ctk.CTkButton(self.button_frame,
+                                         image=copy_icon,
+                                         height=30,
+                                         text="",
+                                         hover_color="#666",
+                                         command=self.copy,
+                                         fg_color="transparent",
+                                         border_color="#444",
+                                         border_width=2,
+                                         anchor="center",
+                                         bg_color="transparent"
+                                         )
+        self.copy_button.image = copy_icon
+        self.copy_button.pack(side="right", fill="x", expand=True, padx=(0, 5), pady=5, anchor="center")
+
+        ui.bind_hover_events(self.frame, self.frame)
+
+    def widgets(self):
+        """Return the card's widgets that should receive scroll events."""
+        return [self.frame, self.text_frame, self.text_label, self.button_frame, self.copy_button]
+
+    def bind_item(self, item, preview, thumbnail=None):
+        """Show a different clipboard item on this card."""
+        self.item = item
+        self.set_preview(preview, thumbnail)
+        # Images can only be pasted through wl-copy or xclip; elsewhere the button is disabled.
+        pastable = self.ui.can_paste_binary or not is_binary_item(item)
+        self.copy_button.configure(state="normal" if pastable else "disabled")
+        if not self.frame.winfo_manager():
+            self.frame.pack(padx=5, pady=5, fill="x")
+
+    def set_preview(self, preview, thumbnail=None):
+        """Replace the placeholder text and image once the preview is ready."""
+        self.text_label.configure(text=preview, image=thumbnail, compound="left")
+
+    def unbind_item(self):
+        """Hide the card when there is no item for it."""
+        self.item = None
+        if self.frame.winfo_manager():
+            self.frame.pack_forget()
+
+    def copy(self):
+        if self.item is not None:
+            self.ui.copy_to_clipboard(self.item)
 
 class ClipboardManagerUI:
     def __init__(self, clipboard_monitor, action_queue):
         self.clipboard_monitor = clipboard_monitor
         self.action_queue = action_queue
         self.popup = None
-        self.clipboard_items = []
+        self.item_ids = []
+
+        ctk.set_appearance_mode("dark")
+        ctk.set_default_color_theme("dark-blue")
 
         self.root = tk.Tk()
         self.root.withdraw()
 
+        self.render_cache = RenderCache(thumbnail_size=(TEXT_WIDTH // 2, CARD_HEIGHT - 20))
+        self.copy_icon = self.render_cache.icon("copy_icon.png", ICON_SIZE)
+        self.preview_pool = ThreadPoolExecutor(max_workers=PREVIEW_WORKERS, thread_name_prefix="clipboard-preview")
+        self.pending_previews = set()
+
+        self.blocked_time = 0.0
+        self.open_blocked_times = deque(maxlen=100)
+        self._timing_depth = 0
+        self._timing_open = False
+        self._open_populated = False
+        self.toggle_latencies = deque(maxlen=100)
+        self._toggle_requested_at = None
+        self.popup_visible = False
+        self._fade_job = None
+
+        self.dispatcher = UIDispatcher(self.root, self.action_queue, self.process_message, self.refresh_items)
         self.clipboard_monitor.add_listener(self)
-        self.process_queue()
         self.bind_hotkey()
-
-    def process_queue(self):
-        """Process actions from the queue to update the GUI."""
+        self.paste_engine = PasteEngine(write_text=self._write_text)
+        self.can_paste_binary = can_copy_binary()
+        self.root.after_idle(self._warm_up)
+
+    def _warm_up(self):
+        """Build the popup and load the paste automation once the main loop is running."""
+        if self.popup is None:
+            self.build_popup()
+        threading.Thread(target=self.paste_engine.warm_up, daemon=True).start()
+
+    def _write_text(self, text):
+        """Set the clipboard text natively, falling back to Tk where pyperclip has no backend."""
         try:
-            while not self.action_queue.empty():
-                action = self.action_queue.get_nowait()
-                if action == "TOGGLE_POPUP":
-                    self._toggle_popup()
-        except Exception as e:
-            print(f"Error processing queue: {e}")
-        finally:
-            self.root.after(100, self.process_queue)
-
-    def toggle_popup(self):
-        """Put a toggle popup action into the queue."""
-        self.action_queue.put("TOGGLE_POPUP")
-
-    def _toggle_popup(self):
+            copy_text(text)
+        except pyperclip.PyperclipException:
+            self.popup.clipboard_clear()
+            self.popup.clipboard_append(text)
+            self.popup.update_idletasks()
+
+    def process_message(self, message):
+        """Handle a message from another thread on the Tk thread."""
+        if isinstance(message, TogglePopup):
+            self._toggle_popup(message.requested_at)
+        elif isinstance(message, PreviewReady):
+            self._apply_preview(message.item_id)
+        elif isinstance(message, RunOnUIThread):
+            if message.future.set_running_or_notify_cancel():
+                try:
+                    message.future.set_result(message.function())
+                except Exception as e:
+                    message.future.set_exception(e)
+
+    def toggle_popup(self, requested_at=None):
+        """Ask the Tk thread to toggle the popup; safe to call from any thread.
+
+        The hotkey listener passes the time of the key press so the
+        hotkey-to-paint latency includes the hop to the Tk thread.
+        """
+        self.dispatcher.post(TogglePopup(requested_at if requested_at is not None else time.perf_counter()))
+
+    def run_on_ui(self, function, timeout=10.0):
+        """Run `function` on the Tk thread and return its result; call from other threads only."""
+        future = Future()
+        self.dispatcher.post(RunOnUIThread(function, future))
+        return future.result(timeout)
+
+    def _toggle_popup(self, requested_at=None):
         """Toggle the clipboard manager popup window."""
-        if self.popup is None or not self.popup.winfo_exists():
+        if not self.popup_visible:
+            self._toggle_requested_at = requested_at
             self.show_popup()
         else:
             self.close_popup()
 
-    def fade_in(self):
-        """Apply fade-in animation to the popup window with less transparency."""
-        for i in range(15):
-            self.popup.attributes("-alpha", 0.7 + (i / 50))
-            self.root.after(20, self.root.update_idletasks)
+    def _on_popup_map(self, event):
+        """Record hotkey-to-visible latency the first time the popup is mapped."""
+        if event.widget is self.popup and self._toggle_requested_at is not None:
+            latency = time.perf_counter() - self._toggle_requested_at
+            self.toggle_latencies.append(latency)
+            if metrics.enabled:
+                metrics.HOTKEY_TO_PAINT.observe(latency)
+            self._toggle_requested_at = None
+
+    def fade_in(self, step=0):
+        """Fade the popup in one step per frame without blocking the event loop."""
+        self._fade_job = None
+        if not self.popup_visible:
+            return
+        self.popup.attributes("-alpha", 0.7 + (step / 50))
+        if step < FADE_STEPS - 1:
+            self._fade_job = self.root.after(FADE_FRAME_MS, self.fade_in, step + 1)
 
     def show_popup(self):
         """Show the popup window with an opening animation."""
-        if self.popup is not None and self.popup.winfo_exists():
+        if self.popup_visible:
             return
+        self.blocked_time = 0.0
+        self._timing_open = True
+        self._open_populated = False
+        self._show_popup()
+
+    @main_thread_timed
+    def _show_popup(self):
+        """Map the pre-built popup, refresh its list and start the fade-in."""
+        if self.popup is None or not self.popup.winfo_exists():
+            self.build_popup()
+        self.popup_visible = True
+        self.first_index = 0
+        self.popup.attributes("-alpha", 0)
+        self.popup.deiconify()
+        self.popup.lift()
+        self.refresh_items()
+        self.fade_in()
 
+    def build_popup(self):
+        """Build the popup window once; it is hidden and shown instead of rebuilt."""
         self.popup = ctk.CTkToplevel(self.root)
         self.popup.wm_attributes("-topmost", True)
         self.popup.attributes("-alpha", 0)
@@ -87,11 +285,12 @@ class ClipboardManagerUI:
         footer = ctk.CTkLabel(self.popup, text="© Dhruvin Dhameliya", fg_color="#1C1C1C", text_color="white", font=("Segoe UI", 11))
         footer.pack(side="bottom", fill="x", pady=0)
 
+        self.popup.bind("<Map>", self._on_popup_map, add="+")
         self.popup.bind("<Button-1>", self.check_close_popup)
         self.popup.bind("<KeyPress-Escape>", lambda e: self.close_popup())
 
         self.setup_ui()
-        self.fade_in()
+        self.popup.withdraw()
 
     def start_move(self, event):
         """Start moving the popup window."""
@@ -105,208 +304,207 @@ class ClipboardManagerUI:
         self.popup.geometry(f"+{x}+{y}")
         
     def setup_ui(self):
-        """Set up the UI elements in the popup."""
-        self.canvas = ctk.CTkCanvas(self.popup, bg="#1C1C1C", highlightthickness=0, bd=0)
-        self.scrollbar = ctk.CTkScrollbar(self.popup, orientation="vertical", command=self.canvas.yview, width=12, bg_color="transparent", fg_color="transparent")
-        self.scrollable_frame = ctk.CTkFrame(self.canvas, fg_color="transparent", bg_color="transparent", corner_radius=10)
-
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
-
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
+        """Set up the recycled card pool and scrollbar in the popup."""
+        self.scrollable_frame = ctk.CTkFrame(self.popup, fg_color="transparent", bg_color="transparent", corner_radius=10)
+        self.scrollbar = ctk.CTkScrollbar(self.popup, orientation="vertical", command=self._on_scrollbar, width=12, bg_color="transparent", fg_color="transparent")
 
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
-
-        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollable_frame.pack(side="left", fill="both", expand=True)
         self.scrollbar.pack(side="right", fill="y")
-
-        self.canvas.configure(yscrollcommand="")
         self.scrollbar.pack_forget()
-        self.canvas.unbind_all("<MouseWheel>")
 
-        self.root.after(100, self.update_items)
+        self.empty_box = self._create_empty_box()
+        self.cards = [HistoryCard(self, self.scrollable_frame, self.copy_icon) for _ in range(VISIBLE_CARDS)]
+        self.first_index = 0
+        self._bind_mousewheel()
+
+    def _create_empty_box(self):
+        """Build the placeholder shown when the history is empty."""
+        empty_box = ctk.CTkFrame(self.scrollable_frame, width=POPUP_WIDTH, height=POPUP_HEIGHT, fg_color="transparent", bg_color="transparent")
+        empty_box.pack_propagate(False)
+
+        empty_box.grid_rowconfigure(0, weight=1)
+        empty_box.grid_rowconfigure(1, weight=1)
+        empty_box.grid_columnconfigure(0, weight=1)
+
+        empty_title = ctk.CTkLabel(
+            empty_box,
+            text="Nothing here",
+            text_color="white",
+            font=("Segoe UI", 16, "bold"),
+            anchor="center",
+            wraplength=350,
+            width=POPUP_WIDTH,
+            bg_color="transparent",
+            fg_color="transparent"
+        )
+        empty_title.grid(row=0, column=0, pady=(20,0))
+        empty_message = ctk.CTkLabel(
+            empty_box,
+            text="You'll see your clipboard history here once\nyou've copied something.",
+            text_color="white",
+            font=("Segoe UI", 14),
+            anchor="center",
+            wraplength=350,
+            fg_color="transparent",
+            bg_color="transparent"
+        )
+        empty_message.grid(row=1, column=0, pady=(5, 20))
+        return empty_box
 
     def _bind_mousewheel(self):
-        """Bind mouse wheel scrolling to the canvas."""
-        if self.root.tk.call('tk', 'windowingsystem') == 'x11':
-            self.popup.bind("<Button-4>", self._on_mousewheel_linux)
-            self.popup.bind("<Button-5>", self._on_mousewheel_linux)
-            self.canvas.bind("<Button-4>", self._on_mousewheel_linux)
-            self.canvas.bind("<Button-5>", self._on_mousewheel_linux)
-        else:
-            self.popup.bind("<MouseWheel>", self._on_mousewheel)
-            self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        """Bind mouse wheel scrolling to the popup and every recycled card."""
+        widgets = [self.popup, self.scrollable_frame]
+        for card in self.cards:
+            widgets.extend(card.widgets())
+        for widget in widgets:
+            if self.root.tk.call('tk', 'windowingsystem') == 'x11':
+                widget.bind("<Button-4>", self._on_mousewheel_linux)
+                widget.bind("<Button-5>", self._on_mousewheel_linux)
+            else:
+                widget.bind("<MouseWheel>", self._on_mousewheel)
 
     def _on_mousewheel(self, event):
         """Handle mouse wheel scrolling for Windows/macOS."""
-        self.canvas.yview_scroll(-1 * (event.delta // 120), "units")
+        self.scroll_to(self.first_index - (event.delta // 120))
 
     def _on_mousewheel_linux(self, event):
         """Handle mouse wheel scrolling for Linux (X11)."""
         if event.num == 4:
-            self.canvas.yview_scroll(-1, "units")
+            self.scroll_to(self.first_index - 1)
         elif event.num == 5:
-            self.canvas.yview_scroll(1, "units")
+            self.scroll_to(self.first_index + 1)
+
+    def _on_scrollbar(self, *args):
+        """Translate scrollbar drags and clicks into a new first visible item."""
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * len(self.item_ids)))
+        elif args[0] == "scroll":
+            step = VISIBLE_CARDS if args[2] == "pages" else 1
+            self.scroll_to(self.first_index + int(args[1]) * step)
+        else:
+            self.scroll_to(round(float(args[0]) * len(self.item_ids)))
 
-    def update_items(self):
-        """Update the listbox with the latest clipboard items."""
-        if not self.popup or not self.popup.winfo_exists():
-            return
-        
-        if not self.scrollable_frame.winfo_exists():
+    def scroll_to(self, index):
+        """Show the history starting at `index` by rebinding the card pool."""
+        if not self.popup_visible:
             return
+        index = max(0, min(index, len(self.item_ids) - VISIBLE_CARDS))
+        if index != self.first_index:
+            self.first_index = index
+            self.populate_items()
+
+    def update_items(self):
+        """Clipboard listener hook; called from the monitor thread."""
+        self.dispatcher.post(ClipboardChanged())
 
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
+    def refresh_items(self):
+        """Refresh the list with the latest clipboard items while the popup is shown."""
+        if not self.popup_visible:
+            return
 
-        self.root.after(0, self.fetch_clipboard_items)
+        self.fetch_clipboard_items()
 
+    @main_thread_timed
     def fetch_clipboard_items(self):
-        """Fetch clipboard items and update the UI."""
-        self.clipboard_items = get_clipboard_items()[:10]
+        """Fetch the ids of the clipboard items, keeping the scrolled-to item in view as new ones arrive on top.
+
+        Item contents are loaded in populate_items, for the visible cards only.
+        """
+        anchor = None
+        if 0 < self.first_index < len(self.item_ids):
+            anchor = self.item_ids[self.first_index]
+        self.item_ids = get_clipboard_item_ids(limit=LIST_LIMIT)
+        if anchor is not None:
+            self.first_index = next((index for index, item_id in enumerate(self.item_ids) if item_id == anchor), self.first_index)
         self.populate_items()
 
+    @main_thread_timed
     def populate_items(self):
-        """Populate the UI with clipboard items."""
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        copy_icon_path = os.path.join(base_dir, "copy_icon.png")
-        pil_copy_icon = Image.open(copy_icon_path)
-
-        icon_size = 18
-
-        pil_copy_icon = pil_copy_icon.resize((icon_size, icon_size), Image.Resampling.LANCZOS)
-        copy_icon = ctk.CTkImage(light_image=pil_copy_icon, size=(icon_size, icon_size))
-        self.copy_icon = copy_icon
-
-        popup_width = 400
-        popup_height = 450
-        card_width = popup_width - 20
-        card_height = 80
-        button_width_height = 48
-        text_width = card_width - button_width_height - 20
-
-        self.canvas.configure(yscrollcommand="")
-        self.scrollbar.pack_forget()
-        self.canvas.unbind_all("<MouseWheel>")
-
-        self.popup.geometry(f"{popup_width}x{popup_height}")
-
-        if not self.clipboard_items:
-            self.scrollable_frame.grid_rowconfigure(0, weight=1)
-            self.scrollable_frame.grid_columnconfigure(0, weight=1)
-
-            empty_box = ctk.CTkFrame(self.scrollable_frame, width=popup_width, height=popup_height, fg_color="transparent", bg_color="transparent")
-            empty_box.grid(row=0, column=0, sticky="nsew", pady=(116, 0))
-            empty_box.pack_propagate(False)
-
-            empty_box.grid_rowconfigure(0, weight=1)
-            empty_box.grid_rowconfigure(1, weight=1)
-            empty_box.grid_columnconfigure(0, weight=1)
-
-            empty_title = ctk.CTkLabel(
-                empty_box,
-                text="Nothing here",
-                text_color="white",
-                font=("Segoe UI", 16, "bold"),
-                anchor="center",
-                wraplength=350,
-                width=popup_width,
-                bg_color="transparent",
-                fg_color="transparent"
-            )
-            empty_title.grid(row=0, column=0, pady=(20,0))
-            empty_message = ctk.CTkLabel(
-                empty_box,
-                text="You'll see your clipboard history here once\nyou've copied something.",
-                text_color="white",
-                font=("Segoe UI", 14),
-                anchor="center",
-                wraplength=350,
-                fg_color="transparent",
-                bg_color="transparent"
-            )
-            empty_message.grid(row=1, column=0, pady=(5, 20))
+        """Bind the visible window of clipboard items to the recycled cards.
+
+        Cards still showing the same item are left untouched, so an insert at
+        the top or an eviction at the bottom only reconfigures the cards whose
+        item actually changed. Previews that are not cached yet show a
+        placeholder and are built by the preview workers.
+        """
+        started = time.perf_counter() if metrics.enabled else None
+        self._bind_visible_items()
+        if started is not None:
+            metrics.POPUP_RENDER.observe(time.perf_counter() - started)
+
+    def _bind_visible_items(self):
+        if not self.item_ids:
+            for card in self.cards:
+                card.unbind_item()
+            self.scrollbar.pack_forget()
+            if not self.empty_box.winfo_manager():
+                self.empty_box.pack(fill="both", expand=True, pady=(116, 0))
+            self._open_populated = True
             return
 
-        for index, item in enumerate(self.clipboard_items):
-            card = ctk.CTkFrame(self.scrollable_frame,
-                                width=card_width, 
-                                height=card_height, 
-                                corner_radius=10,
-                                fg_color="#2C2C2C", 
-                                bg_color="transparent")
-            card.pack(padx=5, pady=5, fill="x")
-            card.pack_propagate(False)
-
-            self.bind_hover_events(card, card)
-
-            if len(self.clipboard_items) > 4:
-                self.canvas.configure(yscrollcommand=self.scrollbar.set)
-                self.scrollbar.pack(side="right", fill="y")
-                self.canvas.bind_all("<MouseWheel>", self._on_mousewheel)
-                self._bind_mousewheel()
+        if self.empty_box.winfo_manager():
+            self.empty_box.pack_forget()
+
+        self.first_index = max(0, min(self.first_index, len(self.item_ids) - VISIBLE_CARDS))
+        for offset, card in enumerate(self.cards):
+            index = self.first_index + offset
+            item = None
+            if index < len(self.item_ids):
+                if card.item is not None and card.item.item_id == self.item_ids[index]:
+                    continue
+                # None if it was evicted since the ids were fetched; the next refresh drops it.
+                item = get_clipboard_item(self.item_ids[index])
+            if item is not None:
+                preview = self.render_cache.cached_preview(item.item_id)
+                thumbnail = self.render_cache.cached_thumbnail(item.item_id) if is_image_item(item) else False
+                card.bind_item(item, preview if preview is not None else PREVIEW_PLACEHOLDER, thumbnail or None)
+                if preview is None or thumbnail is None:
+                    self._request_preview(item)
             else:
-                self.canvas.configure(yscrollcommand="")
-                self.scrollbar.pack_forget()
-                self.canvas.unbind_all("<MouseWheel>")
-
-            text_frame = ctk.CTkFrame(card, width=text_width, height=card_height, fg_color="#2C2C2C", bg_color="transparent")
-            text_frame.pack(side="left", fill="y", padx=5, pady=5)
-            text_frame.pack_propagate(False)
-
-            text_data = get_decompressed_text(item)
-            limited_text = self.limit_text_to_lines(text_data, max_lines=3)
-
-            text_label = ctk.CTkLabel(
-                text_frame,
-                text=limited_text,
-                wraplength=text_width,
-                anchor="w",
-                justify="left",
-                text_color="white",
-                font=("Noto Color Emoji", 14)
-            )
-            text_label.pack(side="left", fill="both", expand=True, padx=5, pady=5)
-
-            text_label.bind("<Enter>", lambda e, w=card: self.on_hover(w, True))
-            text_label.bind("<Leave>", lambda e, w=card: self.on_hover(w, False))
-
-            button_frame = ctk.CTkFrame(card, 
-                                        width=button_width_height-5, 
-                                        height=button_width_height, 
-                                        fg_color="#2C2C2C",
-                                        bg_color="transparent")
-            button_frame.pack(side="right", fill="both", padx=5, pady=5, anchor="center")
-            button_frame.pack_propagate(False)
-
-            copy_button = ctk.CTkButton(button_frame, 
-                                        image=copy_icon,
-                                        height=30,
-                                        text="",                                        
-                                        hover_color="#666",
-                                        command=partial(self.copy_to_clipboard, item),
-                                        fg_color="transparent", 
-                                        border_color="#444",
-                                        border_width=2,
-                                        anchor="center",
-                                        bg_color="transparent"
-                                        )
-            copy_button.image = copy_icon
-            copy_button.pack(side="right", fill="x", expand=True, padx=(0, 5), pady=5, anchor="center")
-            
-            card.bind("<Enter>", lambda e, w=card: self.on_hover(w, True))
-            card.bind("<Leave>", lambda e, w=card: self.on_hover(w, False))
+                card.unbind_item()
 
-            text_frame.bind("<Enter>", lambda e, w=card: self.on_hover(w, True))
-            text_frame.bind("<Leave>", lambda e, w=card: self.on_hover(w, False))
+        total = len(self.item_ids)
+        if total > VISIBLE_CARDS:
+            if not self.scrollbar.winfo_manager():
+                self.scrollbar.pack(side="right", fill="y", before=self.scrollable_frame)
+            self.scrollbar.set(self.first_index / total, (self.first_index + VISIBLE_CARDS) / total)
+        else:
+            self.scrollbar.pack_forget()
+        self._open_populated = True
 
-            text_label.bind("<Enter>", lambda e, w=card: self.on_hover(w, True))
-            text_label.bind("<Leave>", lambda e, w=card: self.on_hover(w, False))
+    def _request_preview(self, item):
+        """Build an item's preview on a worker thread unless one is already on the way."""
+        if item.item_id in self.pending_previews:
+            return
+        self.pending_previews.add(item.item_id)
+        self.preview_pool.submit(self._build_preview, item)
 
-            button_frame.bind("<Enter>", lambda e, w=card: self.on_hover(w, True))
-            button_frame.bind("<Leave>", lambda e, w=card: self.on_hover(w, False))
+    def _build_preview(self, item):
+        """Worker thread: build the preview and any thumbnail, then hand them to the Tk thread."""
+        try:
+            self.render_cache.preview(item)
+            if is_image_item(item):
+                self.render_cache.thumbnail(item)
+        except Exception as e:
+            print(f"Error building preview: {e}")
+        self.dispatcher.post(PreviewReady(item.item_id))
+
+    @main_thread_timed
+    def _apply_preview(self, item_id):
+        """Fill in the cards that are waiting for this item's preview."""
+        self.pending_previews.discard(item_id)
+        preview = self.render_cache.cached_preview(item_id)
+        if preview is not None:
+            for card in self.cards:
+                if card.item is not None and card.item.item_id == item_id:
+                    thumbnail = self.render_cache.cached_thumbnail(item_id) if is_image_item(card.item) else None
+                    card.set_preview(preview, thumbnail or None)
+
+    def _finish_open_timing(self):
+        """Record the main-thread time of a popup open once its previews are all filled in."""
+        if self._timing_open and self._open_populated and not self.pending_previews:
+            self._timing_open = False
+            self.open_blocked_times.append(self.blocked_time)
 
     def bind_hover_events(self, widget, card):
         """Bind hover events to a widget and its children."""
@@ -325,24 +523,18 @@ class ClipboardManagerUI:
 
     def limit_text_to_lines(self, text, max_lines=3, width=40):
         """Limit text to fit a specific number of lines with truncation."""
-        wrapped_lines = wrap(text, width=width)
-
-        if len(wrapped_lines) < max_lines:
-            return "\n".join(wrapped_lines)
-
-        wrapped_lines = wrapped_lines[:max_lines]
-        wrapped_lines[-1] = wrapped_lines[-1][:-3] + "..."
-
-        return "\n".join(wrapped_lines)
+        return limit_text_to_lines(text, max_lines, width)
 
     def copy_to_clipboard(self, clipboard_item: ClipboardItem):
-        """Copy text (including emojis) to clipboard and paste it into the active input field."""
+        """Copy an item (text including emojis, or an image) to the clipboard and paste it into the active input field."""
+        clicked_at = time.perf_counter()
         try:
-            self.popup.clipboard_clear()
-            txt = get_decompressed_text(clipboard_item)
-            self.popup.clipboard_append(txt)
-            self.popup.update()
-            pyautogui.hotkey('ctrl', 'v')
+            if is_binary_item(clipboard_item):
+                content = BinaryContent(get_item_mime(clipboard_item), get_item_data(clipboard_item))
+            else:
+                content = get_decompressed_text(clipboard_item)
+            self.paste_engine.paste(content, clicked_at)
+            mark_clipboard_item_used(clipboard_item.item_id)
             self.close_popup()
 
         except Exception as e:
@@ -350,25 +542,26 @@ class ClipboardManagerUI:
 
     def clear_all(self):
         """Clear all clipboard history."""
-        if not self.clipboard_items:
+        if not self.item_ids:
             return
         clear_clipboard()
-        self.clipboard_items = []
-        self.update_items()
-        self.canvas.configure(yscrollcommand="")
-        self.scrollbar.pack_forget()
-        self.canvas.unbind_all("<MouseWheel>")
+        self.render_cache.clear()
+        self.item_ids = []
+        self.first_index = 0
+        self.populate_items()
 
     def close_popup(self):
-        """Close the popup window."""
-        if self.popup is not None and self.popup.winfo_exists():
-            self.popup.destroy()
-            self.popup = None  
-            self.scrollable_frame = None
+        """Hide the popup window; it is kept for the next open."""
+        if self.popup_visible:
+            self.popup_visible = False
+            if self._fade_job is not None:
+                self.root.after_cancel(self._fade_job)
+                self._fade_job = None
+            self.popup.withdraw()
 
     def check_close_popup(self, event):
         """Check if the click is outside the popup and close it if necessary."""
-        if self.popup and self.popup.winfo_exists():
+        if self.popup_visible:
             x_root, y_root = event.x_root, event.y_root
             
             if not (self.popup.winfo_x() <= x_root <= self.popup.winfo_x() + self.popup.winfo_width() and
@@ -382,5 +575,5 @@ class ClipboardManagerUI:
     def key_press_handler(self, event):
         """Handle key press events to open the popup on Win+c."""
         if event.state & 0x0008 and event.keysym.lower() == 'o':
-            if self.popup is None or not self.popup.winfo_exists():
+            if not self.popup_visible:
                 self.show_popup()
\ No newline at end of file
@@ -1,20 +1,99 @@
 import os
 os.environ["LIBGL_ALWAYS_SOFTWARE"] = "1"
+import argparse
 from queue import Queue
 import threading
-from clipboard.ui import ClipboardManagerUI
 from clipboard.manager import ClipboardMonitor
+from clipboard import metrics
 from clipboard.hotkey import HotkeyListener
+from clipboard.protocol import UNIX_SOCKETS
+from clipboard.inmemory import (configure_compression, configure_eviction, configure_ingestion, enable_persistent_store,
+                                get_clipboard_stats)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Clipboard history manager")
+    parser.add_argument("--history-dir", help="keep clipboard history on disk in this directory")
+    parser.add_argument("--history-max-items", type=int, default=50000, help="maximum items kept on disk")
+    parser.add_argument("--max-items", type=int, help="maximum items kept in memory")
+    parser.add_argument("--max-bytes", type=int, help="maximum compressed bytes kept in history")
+    parser.add_argument("--max-age", type=float, help="evict items not copied or pasted for this many seconds")
+    parser.add_argument("--max-image-bytes", type=int, help="maximum bytes of images and other binary items kept in memory")
+    parser.add_argument("--no-lru", action="store_true", help="do not move pasted items to the top")
+    parser.add_argument("--max-item-size", type=int, help="largest clipboard item in bytes, 0 for no limit (default 64 MiB)")
+    parser.add_argument("--oversize", choices=("truncate", "skip"), help="what to do with text over --max-item-size")
+    parser.add_argument("--compression-level", type=int, choices=range(0, 10), metavar="0-9",
+                        help="zlib level for stored history (default 6)")
+    parser.add_argument("--no-dictionary", action="store_true", help="do not train a compression dictionary")
+    parser.add_argument("--socket", help="Unix socket for the local API (default: per user, in XDG_RUNTIME_DIR or the "
+                                         "temp dir; not available on Windows)")
+    parser.add_argument("--metrics", action="store_true",
+                        help="record latency histograms (read them with `python -m clipboard.cli metrics`)")
+    parser.add_argument("--metrics-file", help="also write the metrics to this file periodically; implies --metrics")
+    parser.add_argument("--metrics-format", choices=("json", "prometheus"), default="json", help="format of --metrics-file")
+    parser.add_argument("--metrics-interval", type=float, default=15.0, help="seconds between --metrics-file writes")
+    parser.add_argument("--headless", action="store_true", help="run only the monitor and the local API, without the popup")
+    return parser.parse_args()
+
+def start_server(args, monitor, on_toggle=None, run_on_ui=None):
+    """Serve the local API on args.socket; without Unix sockets (Windows) there is none."""
+    if not UNIX_SOCKETS:
+        return
+    from clipboard.daemon import ClipboardServer
+    try:
+        ClipboardServer(args.socket, monitor=monitor, on_toggle=on_toggle, run_on_ui=run_on_ui).start()
+    except OSError as e:
+        print(f"Error starting the local API on {args.socket}: {e}")
 
 def main():
+    args = parse_args()
+    if UNIX_SOCKETS:
+        from clipboard.daemon import default_socket_path, instance_running
+        try:
+            args.socket = args.socket or default_socket_path()
+        except OSError as e:
+            print(f"Error setting up the local API socket: {e}")
+            return
+        if instance_running(args.socket):
+            # One instance owns the monitor and the history; a second launch just shows its popup.
+            print(f"Clipboard manager already running on {args.socket}")
+            if not args.headless:
+                from clipboard.client import ClipboardClient
+                from clipboard.protocol import ProtocolError
+                try:
+                    with ClipboardClient(args.socket) as client:
+                        client.toggle()
+                except (OSError, ProtocolError) as e:
+                    print(f"Could not show the running instance's popup: {e}")
+            return
+
+    if args.history_dir:
+        enable_persistent_store(os.path.expanduser(args.history_dir), max_items=args.history_max_items)
+    configure_eviction(max_items=args.max_items, max_bytes=args.max_bytes, max_age=args.max_age,
+                       lru_on_paste=False if args.no_lru else None, max_blob_bytes=args.max_image_bytes)
+    configure_ingestion(max_item_size=args.max_item_size, oversize_policy=args.oversize)
+    configure_compression(level=args.compression_level, use_dictionary=False if args.no_dictionary else None)
+    if args.metrics or args.metrics_file:
+        metrics.enable()
+        metrics.add_collector(get_clipboard_stats)
+        if args.metrics_file:
+            metrics.MetricsExporter(os.path.expanduser(args.metrics_file), args.metrics_format, args.metrics_interval).start()
+
     action_queue = Queue()
     clipboard_monitor = ClipboardMonitor()
 
+    if args.headless:
+        start_server(args, clipboard_monitor)
+        clipboard_monitor.start_monitoring()
+        return
+
     monitor_thread = threading.Thread(target=clipboard_monitor.start_monitoring, daemon=True)
     monitor_thread.start()
 
+    # The GUI toolkit is imported only once clipboard capture is already running.
+    from clipboard.ui import ClipboardManagerUI
     clipboard_ui = ClipboardManagerUI(clipboard_monitor, action_queue)
     clipboard_ui.bind_hotkey()
+    start_server(args, clipboard_monitor, on_toggle=clipboard_ui.toggle_popup, run_on_ui=clipboard_ui.run_on_ui)
 
     hotkey_listener = HotkeyListener(on_activate_callback=clipboard_ui.toggle_popup)
     hotkey_thread = threading.Thread(target=hotkey_listener.start, daemon=True)
@@ -0,0 +1,112 @@
+import pytest
+from clipboard import inmemory
+
+
+@pytest.fixture(autouse=True)
+def history():
+    saved = (inmemory.MAX_ITEMS, inmemory.MAX_MEMORY_USAGE, inmemory.MAX_ITEM_SIZE, inmemory.OVERSIZE_POLICY)
+    inmemory.clear_clipboard()
+    for counter in inmemory._stats:
+        inmemory._stats[counter] = 0
+    yield
+    inmemory.disable_persistent_store()
+    inmemory.MAX_ITEMS, inmemory.MAX_MEMORY_USAGE, inmemory.MAX_ITEM_SIZE, inmemory.OVERSIZE_POLICY = saved
+    inmemory.clear_clipboard()
+
+
+@pytest.fixture
+def persistent(tmp_path):
+    inmemory.enable_persistent_store(str(tmp_path))
+    return tmp_path
+
+
+def texts():
+    return [inmemory.get_decompressed_text(item) for item in inmemory.get_clipboard_items()]
+
+
+def test_copying_stored_text_again_is_deduplicated():
+    inmemory.add_clipboard_item("first")
+    inmemory.add_clipboard_item("second")
+    inmemory.add_clipboard_item("first")
+    stats = inmemory.get_clipboard_stats()
+    assert (stats["added"], stats["deduplicated"], stats["items"]) == (2, 1, 2)
+
+
+def test_duplicate_moves_to_the_top():
+    for text in ("first", "second", "third"):
+        inmemory.add_clipboard_item(text)
+    inmemory.add_clipboard_item("first")
+    assert texts() == ["first", "third", "second"]
+    assert inmemory.search_clipboard_items("first")[0].item_id == inmemory.get_clipboard_item_ids()[0]
+
+
+def test_duplicate_blob_moves_to_the_top():
+    inmemory.add_clipboard_blob(b"\x89PNG image", "image/png")
+    inmemory.add_clipboard_item("text")
+    inmemory.add_clipboard_blob(b"\x89PNG image", "image/png")
+    newest = inmemory.get_clipboard_items()[0]
+    assert inmemory.get_item_mime(newest) == "image/png"
+    assert inmemory.get_clipboard_stats()["items"] == 2
+
+
+def test_eviction_forgets_both_digest_maps():
+    inmemory.configure_eviction(max_items=3)
+    for number in range(10):
+        inmemory.add_clipboard_item(f"item {number}")
+    live = set(inmemory.get_clipboard_item_ids())
+    assert set(inmemory._digests_by_id) == live
+    assert set(inmemory._ids_by_digest.values()) == live
+    inmemory.add_clipboard_item("item 0")
+    assert inmemory.get_clipboard_stats()["deduplicated"] == 0
+
+
+def test_persistent_duplicate_moves_to_the_top(persistent):
+    inmemory.add_clipboard_item("first")
+    inmemory.add_clipboard_item("second")
+    inmemory.add_clipboard_item("first")
+    assert texts() == ["first", "second"]
+    assert set(inmemory._digests_by_id) == set(inmemory.get_clipboard_item_ids())
+
+
+def test_duplicate_after_restart_moves_to_the_top(persistent):
+    inmemory.add_clipboard_item("first")
+    inmemory.add_clipboard_item("second")
+    inmemory.disable_persistent_store()
+    inmemory.enable_persistent_store(str(persistent))
+    inmemory.add_clipboard_item("first")
+    assert texts() == ["first", "second"]
+    assert inmemory.get_clipboard_stats()["deduplicated"] == 1
+
+
+def test_truncated_text_after_restart_moves_to_the_top(persistent):
+    inmemory.configure_ingestion(max_item_size=1000, oversize_policy="truncate")
+    large = "large text " * 1000
+    inmemory.add_clipboard_item(large)
+    inmemory.add_clipboard_item("second")
+    inmemory.disable_persistent_store()
+    inmemory.enable_persistent_store(str(persistent))
+    inmemory.add_clipboard_item(large)
+    assert inmemory.get_clipboard_stats()["items"] == 2
+    assert texts()[0] == large[:1000]
+
+
+def test_switching_stores_forgets_the_previous_history(tmp_path):
+    inmemory.add_clipboard_blob(b"\x89PNG image", "image/png")
+    inmemory.add_clipboard_item("in memory")
+    inmemory.enable_persistent_store(str(tmp_path / "first"))
+    assert (inmemory._ids_by_digest, inmemory._digests_by_id, inmemory._blob_sizes) == ({}, {}, {})
+    assert inmemory.get_clipboard_stats()["blob_bytes"] == 0
+    inmemory.add_clipboard_item("on disk")
+    inmemory.enable_persistent_store(str(tmp_path / "second"))
+    inmemory.add_clipboard_item("in memory")
+    inmemory.add_clipboard_item("on disk")
+    assert texts() == ["on disk", "in memory"]
+    assert inmemory.get_clipboard_stats()["deduplicated"] == 0
+
+
+def test_reopening_the_same_directory_keeps_its_history(persistent):
+    inmemory.add_clipboard_item("first")
+    inmemory.enable_persistent_store(str(persistent))
+    inmemory.add_clipboard_item("first")
+    assert texts() == ["first"]
+    assert inmemory.get_clipboard_stats()["deduplicated"] == 1
@@ -0,0 +1,122 @@
+import os
+import pytest
+from clipboard import inmemory, metrics
+from clipboard.manager import (BinaryContent, ClipboardMonitor, PollingChangeSource, ScriptedChangeSource,
+                               StreamedText)
+
+PNG = BinaryContent("image/png", b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4)
+
+
+@pytest.fixture(autouse=True)
+def history():
+    saved = (inmemory.MAX_BLOB_MEMORY, metrics.enabled)
+    inmemory.clear_clipboard()
+    for counter in inmemory._stats:
+        inmemory._stats[counter] = 0
+    yield
+    inmemory.disable_persistent_store()
+    inmemory.MAX_BLOB_MEMORY, metrics.enabled = saved
+    inmemory.clear_clipboard()
+
+
+class FakeClipboard:
+    """Hands out scripted clipboard reads and counts them."""
+
+    def __init__(self, texts, counts=None, binary=None):
+        self.texts = list(texts)
+        self.counts = list(counts or [])
+        self.binary = binary
+        self.reads = 0
+
+    def paste(self):
+        self.reads += 1
+        return self.texts.pop(0)
+
+    def paste_binary(self):
+        return self.binary
+
+    def change_count(self):
+        return self.counts.pop(0)
+
+
+def polling_source(clipboard, **kwargs):
+    return PollingChangeSource(paste=clipboard.paste, min_interval=0.0, max_interval=0.0, **kwargs)
+
+
+def test_change_counter_skips_reads_while_idle():
+    clipboard = FakeClipboard(["first", "second"], counts=[7, 7, 7, 7, 8])
+    source = polling_source(clipboard, change_count=clipboard.change_count)
+    assert source.wait_for_change() == "first"
+    assert source.wait_for_change() == "second"
+    assert (clipboard.reads, source.wakeups) == (2, 5)
+
+
+def test_unreadable_change_counter_reads_every_poll():
+    clipboard = FakeClipboard(["first", "first", "second"], counts=[0, 0, 0])
+    source = polling_source(clipboard, change_count=clipboard.change_count)
+    assert source.wait_for_change() == "first"
+    assert source.wait_for_change() == "second"
+    assert clipboard.reads == 3
+
+
+def test_polled_image_round_trips_through_the_history():
+    clipboard = FakeClipboard([""], binary=PNG)
+    monitor = ClipboardMonitor(polling_source(clipboard, paste_binary=clipboard.paste_binary))
+    monitor.capture(monitor.source.wait_for_change())
+    item = inmemory.get_clipboard_items()[0]
+    assert inmemory.is_binary_item(item)
+    assert (inmemory.get_item_mime(item), inmemory.get_item_data(item)) == PNG
+
+
+def test_scripted_image_round_trips_through_the_persistent_history(tmp_path):
+    inmemory.enable_persistent_store(str(tmp_path))
+    monitor = ClipboardMonitor(ScriptedChangeSource([(0, "text"), (0.05, PNG)]))
+    monitor.capture(monitor.source.wait_for_change())
+    monitor.capture(monitor.source.wait_for_change())
+    inmemory.disable_persistent_store()
+    inmemory.enable_persistent_store(str(tmp_path))
+    newest, oldest = inmemory.get_clipboard_items()
+    assert (inmemory.get_item_mime(newest), inmemory.get_item_data(newest)) == PNG
+    assert inmemory.get_decompressed_text(oldest) == "text"
+
+
+def test_empty_text_stream_falls_back_to_the_image():
+    clipboard = FakeClipboard([], binary=PNG)
+    monitor = ClipboardMonitor(clipboard)
+    monitor.capture(StreamedText(lambda: iter(())))
+    assert inmemory.get_item_data(inmemory.get_clipboard_items()[0]) == PNG.data
+
+
+def test_blob_budget_evicts_oldest_blobs_once(monkeypatch):
+    forgotten = []
+    forget_item = inmemory._forget_item
+    monkeypatch.setattr(inmemory, "_forget_item", lambda item_id: forgotten.append(item_id) or forget_item(item_id))
+    metrics.enable()
+    metrics.EVICTIONS.reset()
+    blobs = [os.urandom(1000) for _ in range(5)]
+    record_size = len(inmemory.encode_blob(blobs[0], "image/png")[0])
+    inmemory.configure_eviction(max_blob_bytes=2 * record_size + record_size // 2)
+    inmemory.add_clipboard_item("text survives")
+    blob_ids = []
+    for data in blobs:
+        inmemory.add_clipboard_blob(data, "image/png")
+        blob_ids.append(inmemory.get_clipboard_item_ids()[0])
+
+    stats = inmemory.get_clipboard_stats()
+    assert (stats["evicted_blob"], stats["blob_items"], stats["items"]) == (3, 2, 3)
+    assert stats["blob_bytes"] == 2 * record_size
+    assert forgotten == blob_ids[:3]
+    assert (metrics.EVICTIONS.count, metrics.EVICTIONS.sum) == (3, 3)
+    assert [inmemory.get_item_data(item) for item in inmemory.get_clipboard_items()[:2]] == blobs[:2:-1]
+    live = set(inmemory.get_clipboard_item_ids())
+    assert set(inmemory._digests_by_id) == live
+
+    inmemory.add_clipboard_blob(blobs[0], "image/png")
+    assert inmemory.get_clipboard_stats()["deduplicated"] == 0
+
+
+def test_blob_over_the_budget_is_not_stored():
+    inmemory.configure_eviction(max_blob_bytes=100)
+    inmemory.add_clipboard_blob(os.urandom(1000), "image/png")
+    stats = inmemory.get_clipboard_stats()
+    assert (stats["items"], stats["blob_bytes"], stats["evicted_blob"]) == (0, 0, 0)
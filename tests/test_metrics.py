@@ -0,0 +1,32 @@
+import json
+from collections import Counter
+import pytest
+from clipboard import metrics
+
+
+@pytest.fixture
+def collector():
+    stats = {"compression_ratio": 2.5, "items": 3, "unbounded": float("inf")}
+    metrics.add_collector(lambda: stats)
+    yield stats
+    metrics._collectors.clear()
+    metrics.COMPRESSION_RATIO.reset()
+
+
+def test_prometheus_output_declares_each_metric_once(collector):
+    metrics.COMPRESSION_RATIO.observe(2.0)
+    types = Counter(line.split()[2] for line in metrics.to_prometheus().splitlines() if line.startswith("# TYPE"))
+    assert max(types.values()) == 1
+    assert "clipboard_store_compression_ratio" in types
+
+
+def test_prometheus_writes_infinity_as_inf(collector):
+    assert "clipboard_unbounded +Inf" in metrics.to_prometheus().splitlines()
+
+
+def test_json_output_is_strict_json(collector):
+    metrics.COMPRESSION_RATIO.observe(1e9)
+    snapshot = json.loads(metrics.to_json(), parse_constant=lambda constant: pytest.fail(constant))
+    assert snapshot["histograms"]["clipboard_compression_ratio"]["p99"] is None
+    assert snapshot["gauges"]["clipboard_store_compression_ratio"] == 2.5
+    assert snapshot["gauges"]["clipboard_unbounded"] is None
@@ -0,0 +1,114 @@
+import statistics
+import time
+import pytest
+from clipboard import inmemory, manager
+from clipboard.manager import BinaryContent, ClipboardMonitor, PollingChangeSource, StreamedText, tag_self_write
+from clipboard.paste import PasteEngine
+
+PNG = BinaryContent("image/png", b"\x89PNG\r\n\x1a\n" + bytes(range(256)))
+
+
+@pytest.fixture(autouse=True)
+def history():
+    inmemory.clear_clipboard()
+    for counter in inmemory._stats:
+        inmemory._stats[counter] = 0
+    manager._self_writes.clear()
+    yield
+    manager._self_writes.clear()
+    inmemory.clear_clipboard()
+
+
+class StandInKeyboard:
+    """Records the time the paste key goes down, like a pynput Controller would send it."""
+
+    def __init__(self):
+        self.injected_at = None
+
+    def press(self, key):
+        if key == "v":
+            self.injected_at = time.perf_counter()
+
+    def release(self, key):
+        pass
+
+
+class StandInClipboard:
+    def __init__(self):
+        self.content = ""
+
+    def write_text(self, text):
+        self.content = text
+
+    def write_binary(self, mime, data):
+        self.content = BinaryContent(mime, data)
+
+    def paste(self):
+        return self.content if isinstance(self.content, str) else ""
+
+    def paste_binary(self):
+        return self.content if isinstance(self.content, BinaryContent) else None
+
+
+def stand_in_engine(clipboard, keyboard):
+    return PasteEngine(write_text=clipboard.write_text, write_binary=clipboard.write_binary, keyboard=keyboard,
+                       modifier="ctrl")
+
+
+@pytest.mark.parametrize("size", [40, 1024 * 1024])
+def test_click_to_key_injection_is_fast(size):
+    keyboard = StandInKeyboard()
+    engine = stand_in_engine(StandInClipboard(), keyboard)
+    text = "x" * size
+    latencies = []
+    for _ in range(50):
+        clicked_at = time.perf_counter()
+        engine.paste(text, clicked_at)
+        latencies.append(keyboard.injected_at - clicked_at)
+    # pyautogui's default pause alone was 0.1 s per call.
+    assert statistics.median(latencies) < 0.05
+
+
+def test_pasted_items_are_not_stored_again():
+    for number in range(5):
+        inmemory.add_clipboard_item(f"item {number}")
+    clipboard = StandInClipboard()
+    engine = stand_in_engine(clipboard, StandInKeyboard())
+    source = PollingChangeSource(paste=clipboard.paste, paste_binary=clipboard.paste_binary, min_interval=0,
+                                 max_interval=0)
+    monitor = ClipboardMonitor(source)
+    for item in inmemory.get_clipboard_items()[:0:-1]:
+        engine.paste(inmemory.get_decompressed_text(item))
+        monitor.capture(source.wait_for_change())
+    engine.paste(PNG)
+    monitor.capture(source.wait_for_change())
+    stats = inmemory.get_clipboard_stats()
+    assert (stats["added"], stats["deduplicated"]) == (5, 0)
+
+
+def test_streamed_copy_after_a_paste_is_stored():
+    monitor = ClipboardMonitor(StandInClipboard())
+    tag_self_write("pasted")
+    monitor.capture(StreamedText(lambda: iter(["cop", "ied"])))
+    assert [inmemory.get_decompressed_text(item) for item in inmemory.get_clipboard_items()] == ["copied"]
+    monitor.capture(StreamedText(lambda: iter(["pas", "ted"])))
+    assert inmemory.get_clipboard_stats()["items"] == 1
+    assert not manager._self_writes
+
+
+def test_streamed_image_paste_is_skipped():
+    clipboard = StandInClipboard()
+    clipboard.write_binary(*PNG)
+    tag_self_write(PNG)
+    ClipboardMonitor(clipboard).capture(StreamedText(lambda: iter(())))
+    assert inmemory.get_clipboard_stats()["items"] == 0
+
+
+def test_failed_write_withdraws_its_tag():
+    def unsupported(mime, data):
+        raise OSError(f"Cannot copy {mime} to the clipboard on this platform")
+
+    engine = PasteEngine(write_binary=unsupported, keyboard=StandInKeyboard(), modifier="ctrl")
+    with pytest.raises(OSError):
+        engine.paste(PNG)
+    assert not manager._self_writes
@@ -0,0 +1,34 @@
+import os
+import pytest
+from clipboard.persistent import CURRENT_FILE, PersistentClipboardStore
+
+
+def test_compaction_keeps_items_and_ids(tmp_path):
+    store = PersistentClipboardStore(str(tmp_path), compact_min_dead=1)
+    ids = [store.append(f"item {number}".encode(), float(number)) for number in range(5)]
+    store.discard(ids[1])
+    store.compact()
+    assert store.generation == 1
+    assert [store.get(item_id)[0] for item_id in store.item_ids()] == [b"item 4", b"item 3", b"item 2", b"item 0"]
+    store.close()
+
+
+def test_open_deletes_files_of_other_generations(tmp_path):
+    store = PersistentClipboardStore(str(tmp_path))
+    store.append(b"kept", 1.0)
+    store.close()
+    # A compaction that crashed before switching CURRENT, and one that crashed before removing the old files.
+    for name in ("history.1.seg", "history.1.idx", "CURRENT.tmp"):
+        (tmp_path / name).write_bytes(b"partial")
+    store = PersistentClipboardStore(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["history.0.idx", "history.0.seg"]
+    assert [store.get(item_id)[0] for item_id in store.item_ids()] == [b"kept"]
+    store.close()
+
+
+def test_unreadable_current_file_is_an_error(tmp_path):
+    PersistentClipboardStore(str(tmp_path)).close()
+    (tmp_path / CURRENT_FILE).write_text("garbage")
+    with pytest.raises(ValueError):
+        PersistentClipboardStore(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == [CURRENT_FILE, "history.0.idx", "history.0.seg"]
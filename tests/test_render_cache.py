@@ -0,0 +1,76 @@
+import random
+from textwrap import wrap
+import pytest
+from clipboard import inmemory
+from clipboard.render_cache import RenderCache, limit_text_to_lines, truncate_lines, wrap_head
+
+
+def wrap_full_text(text, max_lines=3, width=40):
+    """The preview as built before previews were bounded: wrap everything, then truncate."""
+    wrapped_lines = wrap(text, width=width)
+    if len(wrapped_lines) < max_lines:
+        return "\n".join(wrapped_lines)
+    wrapped_lines = wrapped_lines[:max_lines]
+    wrapped_lines[-1] = wrapped_lines[-1][:-3] + "..."
+    return "\n".join(wrapped_lines)
+
+
+CASES = [
+    "",
+    "short",
+    "    def foo(self):\n        return self.bar + 1\n" * 20,
+    "\tindented\twith\ttabs " * 30,
+    " " * 5000 + "words after a long run of spaces " * 10,
+    "\n" * 300 + "text after blank lines",
+    "word\xa0joined\xa0by\xa0no-break\xa0spaces " * 40,
+    "\xa0" * 80 + " " + "\xa0 " * 80 + "end",
+    "x" * 500 + " " + "y" * 90,
+    "a hyphen-ated long-winded well-known phrase -- with dashes " * 20,
+    "\r\n".join("line %d" % i for i in range(200)),
+]
+
+
+@pytest.mark.parametrize("text", CASES)
+@pytest.mark.parametrize("max_lines, width", [(3, 40), (1, 10), (4, 7)])
+def test_matches_wrapping_the_full_text(text, max_lines, width):
+    assert limit_text_to_lines(text, max_lines, width) == wrap_full_text(text, max_lines, width)
+
+
+def test_keeps_the_indent_of_the_first_line():
+    text = "    def foo(self):\n        return self.bar + 1\n" * 3
+    assert limit_text_to_lines(text).startswith("    def foo(self):")
+
+
+def test_matches_wrapping_random_whitespace_heavy_text():
+    rng = random.Random(8)
+    pieces = [" ", "  ", "\t", "\n", "\r\n", "\x0b", "\xa0", " ", "-", "--", "a", "word", "hyphen-ated",
+              "x" * 45, " " * 50, "\t\t"]
+    for _ in range(5000):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 150)))
+        max_lines, width = rng.choice([(3, 40), (1, 10), (2, 5)])
+        assert limit_text_to_lines(text, max_lines, width) == wrap_full_text(text, max_lines, width), repr(text)
+
+
+def test_cut_short_text_only_decides_lines_it_holds_in_full():
+    rng = random.Random(9)
+    text = " ".join("word" * rng.randint(1, 15) for _ in range(400))
+    for cut in range(0, 600, 7):
+        wrapped_lines = wrap_head(text[:cut], complete=False)
+        if len(wrapped_lines) > 3:
+            assert truncate_lines(wrapped_lines) == wrap_full_text(text)
+
+
+def test_wraps_only_a_prefix_of_long_text():
+    text = "word " * 1_000_000
+    wrapped_lines = wrap_head(text)
+    assert 3 < len(wrapped_lines) < 10
+    assert limit_text_to_lines(text) == wrap_full_text(text[:1000])
+
+
+@pytest.mark.parametrize("text", CASES + [" " * 200_000 + "words " * 50, "é" * 300 + " tail " * 40])
+def test_preview_of_stored_text_matches_wrapping_the_full_text(text):
+    inmemory.clear_clipboard()
+    inmemory.add_clipboard_item(text + " unique")
+    item = inmemory.get_clipboard_items()[0]
+    assert RenderCache().preview(item) == wrap_full_text(text + " unique")
+    inmemory.clear_clipboard()